@@ -34,6 +34,52 @@ def _next_username(prefix: str = "user") -> str:
     return f"{prefix}_{_user_counter}"
 
 
+# ---------------------------------------------------------------------------
+# Isolation
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """
+    Start every test with an empty cache.
+
+    Pricing schedules and other per-object cache entries are keyed by
+    primary key, which the test database reuses between tests.
+    """
+    from django.core.cache import cache
+
+    from apps.website.models.settings import clear_local_snapshots
+
+    cache.clear()
+    clear_local_snapshots()
+    yield
+    cache.clear()
+    clear_local_snapshots()
+
+
+@pytest.fixture()
+def task_worker(monkeypatch):
+    """
+    Run Django-Q2 tasks in-process when they are queued, as a cluster
+    worker would (combine with ``django_capture_on_commit_callbacks`` for
+    tasks queued on commit).
+    """
+    from django_q.conf import Conf
+
+    monkeypatch.setattr(Conf, "SYNC", True)
+
+
+@pytest.fixture(autouse=True)
+def _reset_paypal_clients():
+    """Drop pooled PayPal clients (and their cached tokens) between tests."""
+    from apps.events.payment import reset_paypal_clients
+
+    reset_paypal_clients()
+    yield
+    reset_paypal_clients()
+
+
 # ---------------------------------------------------------------------------
 # User fixtures
 # ---------------------------------------------------------------------------
@@ -9,6 +9,7 @@ Feeds:
 
 from datetime import datetime, time
 
+from django.conf import settings
 from django.contrib.syndication.views import Feed
 from django.utils import timezone
 from django.utils.feedgenerator import Atom1Feed
@@ -116,15 +117,21 @@ class UpcomingEventsFeed(Feed):
 
     def items(self):
         try:
+            from apps.events.utils import price_events
             from apps.website.models.pages import EventDetailPage
 
             now = timezone.now()
-            return (
+            events = list(
                 EventDetailPage.objects.live()
                 .public()
                 .filter(start_date__gte=now)
                 .order_by("start_date")[:20]
             )
+            # Public feed: anonymous (non-member) prices
+            prices = price_events(events)
+            for event in events:
+                event.pricing = prices[event.pk]
+            return events
         except Exception:
             return []
 
@@ -142,6 +149,10 @@ class UpcomingEventsFeed(Feed):
         start = getattr(item, "start_date", None)
         if start:
             parts.append(f"Date: {start.strftime('%d/%m/%Y %H:%M')}")
+        pricing = getattr(item, "pricing", None)
+        if pricing and pricing["base_fee"]:
+            currency = getattr(settings, "EVENT_CURRENCY", "EUR")
+            parts.append(f"Price: {pricing['final_price']:.2f} {currency}")
         return " | ".join(parts) if parts else ""
 
     def item_pubdate(self, item):
@@ -16,6 +16,7 @@ Provides:
 import json
 from datetime import date, datetime
 
+from django.conf import settings
 from django.utils.safestring import mark_safe
 
 
@@ -295,7 +296,7 @@ def get_event_schema(page, request, site_settings=None):
         schema["offers"] = {
             "@type": "Offer",
             "price": str(base_fee),
-            "priceCurrency": "EUR",
+            "priceCurrency": getattr(settings, "EVENT_CURRENCY", "EUR"),
             "availability": (
                 "https://schema.org/InStock"
                 if getattr(page, "is_registration_open", False)
@@ -2,12 +2,24 @@
 Wagtail admin integration for the events app.
 
 Registers EventRegistration via a Wagtail ModelViewSet with
-list/filter/search capabilities for the Wagtail admin sidebar.
+list/filter/search capabilities for the Wagtail admin sidebar, and
+provides the bank statement reconciliation view.
 """
 
-from wagtail.admin.panels import FieldPanel, MultiFieldPanel, TabbedInterface, ObjectList
+from django.core.exceptions import PermissionDenied
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from django.views.generic import FormView
+from wagtail.admin.panels import (
+    FieldPanel,
+    MultiFieldPanel,
+    ObjectList,
+    TabbedInterface,
+)
+from wagtail.admin.views.generic import WagtailAdminTemplateMixin
 from wagtail.admin.viewsets.model import ModelViewSet
 
+from apps.events.forms import BankStatementForm
 from apps.events.models import EventRegistration
 
 
@@ -34,6 +46,7 @@ class EventRegistrationViewSet(ModelViewSet):
         "payment_status",
         "payment_provider",
         "registered_at",
+        "checked_in_at",
     ]
     list_filter = [
         "status",
@@ -55,6 +68,7 @@ class EventRegistrationViewSet(ModelViewSet):
         FieldPanel("event"),
         FieldPanel("user"),
         FieldPanel("status"),
+        FieldPanel("checked_in_at"),
         FieldPanel("guests"),
         FieldPanel("guest_names"),
         FieldPanel("notes"),
@@ -100,3 +114,44 @@ class EventRegistrationViewSet(ModelViewSet):
 
 
 event_registration_viewset = EventRegistrationViewSet("eventregistrations")
+
+
+class BankReconciliationView(WagtailAdminTemplateMixin, FormView):
+    """
+    Upload a bank statement and mark matching bank transfers paid.
+
+    Requires permission to change event registrations.
+    """
+
+    form_class = BankStatementForm
+    template_name = "events/admin/reconcile.html"
+    page_title = _("Bank reconciliation")
+    header_icon = "doc-full"
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.has_perm("events.change_eventregistration"):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_breadcrumbs_items(self):
+        return self.breadcrumbs_items + [
+            {"url": reverse("events_reconcile"), "label": self.get_page_title()}
+        ]
+
+    def form_valid(self, form):
+        from apps.events.reconciliation import iter_statement, reconcile
+
+        upload = form.cleaned_data["statement"]
+        try:
+            report = reconcile(
+                iter_statement(
+                    upload.file,
+                    form.cleaned_data["format"],
+                    form.cleaned_data["encoding"],
+                ),
+                dry_run=form.cleaned_data["dry_run"],
+            )
+        except (ValueError, SyntaxError, LookupError) as exc:
+            form.add_error("statement", _("Could not read statement: %s") % exc)
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(form=form, report=report))
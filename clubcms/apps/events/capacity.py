@@ -0,0 +1,313 @@
+"""
+Denormalized capacity counters for events.
+
+``EventCapacity`` keeps per-event totals of seat-holding registrations,
+waitlisted registrations and passengers.  Every registration change is
+translated into a counter delta applied with ``F()`` expressions in the
+same transaction, so reads are a single primary-key lookup instead of a
+``COUNT(*)`` over ``EventRegistration``.
+
+``reserve_seat`` decides between a seat and the waitlist with one
+conditional ``UPDATE`` on the capacity row, so concurrent sign-ups never
+lock registration rows.
+
+``rebuild_capacity`` recomputes the counters from the registrations
+table and is used both to materialize missing rows and by the
+``rebuild_event_capacity`` management command.
+"""
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from apps.events.checkin import invalidate_checkin_caches
+from apps.events.models import (
+    ACTIVE_REGISTRATION_STATUSES,
+    EventCapacity,
+    EventRegistration,
+)
+
+COUNTER_FIELDS = ["confirmed_count", "waitlist_count", "passenger_count"]
+
+
+# ---------------------------------------------------------------------------
+# 1. Reading
+# ---------------------------------------------------------------------------
+
+
+def get_capacity(event_page, for_update=False):
+    """
+    Return the ``EventCapacity`` row for *event_page*.
+
+    Uses the instance cache when the row was loaded with
+    ``select_related("capacity")``.  A missing row is rebuilt from the
+    registrations table.  With ``for_update=True`` the row is locked
+    (``SELECT ... FOR UPDATE``) and must be called inside a transaction.
+    """
+    if for_update:
+        capacity = (
+            EventCapacity.objects.select_for_update()
+            .filter(event_id=event_page.pk)
+            .first()
+        )
+        if capacity is None:
+            rebuild_capacity([event_page.pk])
+            capacity = EventCapacity.objects.select_for_update().get(
+                event_id=event_page.pk
+            )
+        return capacity
+
+    try:
+        return event_page.capacity
+    except EventCapacity.DoesNotExist:
+        return rebuild_capacity([event_page.pk])[0]
+
+
+# ---------------------------------------------------------------------------
+# 2. Incremental maintenance
+# ---------------------------------------------------------------------------
+
+
+def _state_counters(state):
+    """Return the counter contributions of a ``capacity_state`` triple."""
+    counters = dict.fromkeys(COUNTER_FIELDS, 0)
+    if not state:
+        return counters
+    _event_id, bucket, has_passenger = state
+    if bucket == "confirmed":
+        counters["confirmed_count"] = 1
+        if has_passenger:
+            counters["passenger_count"] = 1
+    elif bucket == "waitlist":
+        counters["waitlist_count"] = 1
+    return counters
+
+
+def adjust_capacity(event_id, **deltas):
+    """
+    Apply counter deltas (e.g. ``confirmed_count=-1``) to one event.
+
+    Runs a single ``UPDATE ... SET col = col + delta``.  Events without
+    a capacity row are left alone: the row is built from the
+    registrations table on first read, which already reflects the change.
+    """
+    updates = {
+        field: F(field) + delta for field, delta in deltas.items() if delta
+    }
+    if not updates:
+        return
+    updates["updated_at"] = timezone.now()
+    EventCapacity.objects.filter(event_id=event_id).update(**updates)
+
+
+def apply_transition(old_state, new_state):
+    """
+    Update the counters for a registration moving from *old_state* to
+    *new_state* (both ``capacity_state`` triples or ``None``).
+    """
+    if old_state == new_state:
+        return
+    old_event = old_state[0] if old_state else None
+    new_event = new_state[0] if new_state else None
+    old_counters = _state_counters(old_state)
+    new_counters = _state_counters(new_state)
+
+    if old_event == new_event:
+        adjust_capacity(
+            new_event,
+            **{f: new_counters[f] - old_counters[f] for f in COUNTER_FIELDS},
+        )
+        return
+
+    # Registration moved between events (admin edit)
+    if old_event is not None:
+        adjust_capacity(old_event, **{f: -v for f, v in old_counters.items()})
+    if new_event is not None:
+        adjust_capacity(new_event, **new_counters)
+
+
+def sync_registration_capacity(registration, deleted=False):
+    """
+    Bring the counters in line with *registration* after a save/delete.
+
+    Called from the ``post_save`` / ``post_delete`` handlers in
+    ``apps.events.signals``.
+    """
+    old_state = registration._capacity_state
+    new_state = None if deleted else registration.capacity_state
+
+    if old_state == "unknown":
+        # Loaded with deferred fields: we cannot diff, recount instead.
+        if not deleted:
+            rebuild_capacity([registration.event_id])
+    else:
+        apply_transition(old_state, new_state)
+
+    registration._capacity_state = new_state
+
+
+def apply_bulk_status(registrations, status):
+    """
+    Set *status* on already-updated *registrations* and fix the counters.
+
+    ``QuerySet.update()`` bypasses ``post_save``, so set-based callers
+    pass the affected instances here afterwards.  Deltas are summed per
+    event so each event gets a single ``UPDATE``; the events' cached
+    check-in sheets and roster snapshots are dropped.
+
+    Returns a dict mapping event id to its applied counter deltas.
+    """
+    deltas = {}
+    for registration in registrations:
+        old_state = registration._capacity_state
+        registration.status = status
+        new_state = registration.capacity_state
+        registration._capacity_state = new_state
+        if old_state == "unknown":
+            deltas.setdefault(registration.event_id, None)
+            continue
+        for state, sign in ((old_state, -1), (new_state, 1)):
+            if not state:
+                continue
+            event_deltas = deltas.get(state[0])
+            if event_deltas is None:
+                event_deltas = deltas[state[0]] = dict.fromkeys(COUNTER_FIELDS, 0)
+            for field, value in _state_counters(state).items():
+                event_deltas[field] += sign * value
+
+    stale = [event_id for event_id, d in deltas.items() if d is None]
+    if stale:
+        rebuild_capacity(stale)
+    for event_id, event_deltas in deltas.items():
+        if event_deltas is not None:
+            adjust_capacity(event_id, **event_deltas)
+    invalidate_checkin_caches(deltas)
+    return {event_id: d for event_id, d in deltas.items() if d is not None}
+
+
+# ---------------------------------------------------------------------------
+# 3. Seat reservation
+# ---------------------------------------------------------------------------
+
+
+def reserve_seat(registration, max_attendees):
+    """
+    Claim a seat or a waitlist slot for an unsaved *registration*.
+
+    The decision is a single conditional ``UPDATE`` on the event's
+    capacity row: a seat is taken only while ``confirmed_count`` is below
+    *max_attendees* and nobody is waiting, so concurrent sign-ups can
+    neither overbook nor jump ahead of the waitlist.  No registration
+    rows are locked.
+
+    The statement runs in its own (autocommit) transaction so the row
+    lock is held for one statement only; callers must ``release_seat``
+    if saving the registration fails afterwards.
+
+    Sets ``registration.status`` and returns it.
+    """
+    if not max_attendees:
+        registration.status = "registered"
+        return registration.status
+
+    event_id = registration.event_id
+    passenger = 1 if registration.has_passenger else 0
+
+    for _attempt in range(2):
+        now = timezone.now()
+        taken = EventCapacity.objects.filter(
+            event_id=event_id,
+            confirmed_count__lt=max_attendees,
+            waitlist_count=0,
+        ).update(
+            confirmed_count=F("confirmed_count") + 1,
+            passenger_count=F("passenger_count") + passenger,
+            updated_at=now,
+        )
+        if taken:
+            registration.status = "registered"
+            break
+        if EventCapacity.objects.filter(event_id=event_id).update(
+            waitlist_count=F("waitlist_count") + 1,
+            updated_at=now,
+        ):
+            registration.status = "waitlist"
+            break
+        # Legacy event without a capacity row: build it and retry.
+        rebuild_capacity([event_id])
+    else:
+        # Counters unavailable; let post_save count the registration.
+        registration.status = "waitlist"
+        return registration.status
+
+    registration._capacity_state = registration.capacity_state
+    return registration.status
+
+
+def release_seat(registration):
+    """Give back what ``reserve_seat`` claimed for an unsaved registration."""
+    apply_transition(registration._capacity_state, None)
+    registration._capacity_state = None
+
+
+# ---------------------------------------------------------------------------
+# 4. Rebuild / reconcile
+# ---------------------------------------------------------------------------
+
+
+def rebuild_capacity(event_ids=None):
+    """
+    Recompute capacity counters from ``EventRegistration``.
+
+    Args:
+        event_ids: Iterable of EventDetailPage PKs, or None for all events.
+
+    Returns:
+        list[EventCapacity]: The rebuilt rows, in ``event_ids`` order.
+    """
+    from apps.website.models.pages import EventDetailPage
+
+    events = EventDetailPage.objects.all()
+    registrations = EventRegistration.objects.all()
+    if event_ids is not None:
+        event_ids = list(event_ids)
+        events = events.filter(pk__in=event_ids)
+        registrations = registrations.filter(event_id__in=event_ids)
+
+    active = Q(status__in=ACTIVE_REGISTRATION_STATUSES)
+    totals = {
+        row["event_id"]: row
+        for row in registrations.order_by()
+        .values("event_id")
+        .annotate(
+            confirmed=Count("pk", filter=active),
+            waitlist=Count("pk", filter=Q(status="waitlist")),
+            passengers=Count("pk", filter=active & Q(has_passenger=True)),
+        )
+    }
+
+    now = timezone.now()
+    rows = []
+    for event_id in events.values_list("pk", flat=True):
+        row = totals.get(event_id, {})
+        rows.append(
+            EventCapacity(
+                event_id=event_id,
+                confirmed_count=row.get("confirmed", 0),
+                waitlist_count=row.get("waitlist", 0),
+                passenger_count=row.get("passengers", 0),
+                updated_at=now,
+            )
+        )
+
+    EventCapacity.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["event"],
+        update_fields=COUNTER_FIELDS + ["updated_at"],
+    )
+
+    if event_ids is not None:
+        order = {pk: i for i, pk in enumerate(event_ids)}
+        rows.sort(key=lambda r: order.get(r.event_id, len(order)))
+    return rows
@@ -0,0 +1,264 @@
+"""
+Event-day check-in with signed QR tickets.
+
+Each active registration has a ticket string of the form
+``CHK-{pk}-{signature}``, where the signature is an HMAC of the event,
+registration and sign-up time keyed with ``SECRET_KEY``.  Tickets
+cannot be forged without the key, change if the registration is moved
+to another event and survive payment changes (a new payment reference
+must not void a QR code the rider already saved).
+
+Scanners validate tickets offline against a roster snapshot: a compact
+JSON index keyed by a truncated SHA-256 of each ticket, downloaded once
+before the gate opens.  The snapshot does not contain the tickets
+themselves, so a leaked snapshot cannot be turned back into valid
+QR codes.  Scans are queued on the device and uploaded in batches with
+``apply_checkins``.
+"""
+
+import hashlib
+import hmac
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.events.exports import (
+    invalidate_checkin_sheets,
+    registrant_details,
+    roster_queryset,
+)
+from apps.events.models import ACTIVE_REGISTRATION_STATUSES, EventRegistration
+
+TICKET_PREFIX = "CHK"
+
+# Hex characters kept from the HMAC signature and the roster digest
+SIGNATURE_LENGTH = 16
+DIGEST_LENGTH = 16
+
+# Scans accepted per sync request
+SYNC_BATCH_SIZE = 500
+
+ROSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# ---------------------------------------------------------------------------
+# 1. Tickets
+# ---------------------------------------------------------------------------
+
+
+def _sign(event_id, registration_id, registered_at):
+    # Whole seconds: the stored value may be less precise than in memory
+    issued = int(registered_at.timestamp())
+    message = f"events.checkin:{event_id}:{registration_id}:{issued}"
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        message.encode(),
+        hashlib.sha256,
+    ).hexdigest()[:SIGNATURE_LENGTH].upper()
+
+
+def make_ticket(registration):
+    """
+    Return the QR ticket string of *registration*.
+
+    Format: CHK-{pk}-{signature}
+    Example: CHK-123-9F2C41D0A7B3E655
+    """
+    signature = _sign(
+        registration.event_id, registration.pk, registration.registered_at
+    )
+    return f"{TICKET_PREFIX}-{registration.pk}-{signature}"
+
+
+def parse_ticket(ticket):
+    """Return ``(registration_pk, signature)`` from *ticket*, or None."""
+    parts = ticket.strip().upper().split("-")
+    if len(parts) != 3 or parts[0] != TICKET_PREFIX or not parts[1].isdigit():
+        return None
+    return int(parts[1]), parts[2]
+
+
+def ticket_digest(ticket):
+    """Roster index key of *ticket* (the scanner computes the same digest)."""
+    return hashlib.sha256(ticket.encode()).hexdigest()[:DIGEST_LENGTH]
+
+
+def make_ticket_qr(registration):
+    """
+    Return the ticket of *registration* as PNG bytes, or None if the
+    qrcode library is not installed.
+    """
+    try:
+        import qrcode
+    except ImportError:
+        return None
+
+    from io import BytesIO
+
+    img = qrcode.make(
+        make_ticket(registration), error_correction=qrcode.constants.ERROR_CORRECT_M
+    )
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# 2. Roster snapshot (offline validation)
+# ---------------------------------------------------------------------------
+
+
+def _roster_cache_key(event_id):
+    return f"events_checkin_roster_{event_id}"
+
+
+def build_roster_snapshot(event):
+    """
+    Build the offline roster of *event*.
+
+    ``tickets`` maps each ticket digest to
+    ``[pk, name, guests, has_passenger, paid, checked_in]`` (flags as
+    0/1 to keep the payload small).  ``version`` changes whenever any
+    entry does and doubles as the HTTP ETag.
+    """
+    tickets = {}
+    for registration in roster_queryset(event).iterator(chunk_size=500):
+        first, last, _email, _phone, _card = registrant_details(registration)
+        tickets[ticket_digest(make_ticket(registration))] = [
+            registration.pk,
+            f"{last} {first}".strip(),
+            registration.guests,
+            int(registration.has_passenger),
+            int(registration.payment_status == "paid"),
+            int(registration.checked_in_at is not None),
+        ]
+    payload = json.dumps(tickets, sort_keys=True, separators=(",", ":"))
+    return {
+        "event": event.pk,
+        "title": event.title,
+        "generated_at": timezone.now().isoformat(),
+        "version": hashlib.md5(payload.encode()).hexdigest(),
+        "tickets": tickets,
+    }
+
+
+def get_roster_snapshot(event):
+    """Return the cached roster snapshot of *event*, building it on a miss."""
+    key = _roster_cache_key(event.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_roster_snapshot(event)
+        cache.set(key, snapshot, ROSTER_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_roster_snapshot(event_id):
+    """Drop the cached roster snapshot of one event."""
+    cache.delete(_roster_cache_key(event_id))
+
+
+def invalidate_checkin_caches(event_ids):
+    """
+    Drop the roster snapshots and check-in sheets of several events.
+
+    For set-based updates (``QuerySet.update``, ``bulk_update``), which
+    skip the ``post_save`` handler in ``apps.events.signals``.
+    """
+    event_ids = set(event_ids)
+    cache.delete_many([_roster_cache_key(event_id) for event_id in event_ids])
+    invalidate_checkin_sheets(event_ids)
+
+
+# ---------------------------------------------------------------------------
+# 3. Bulk sync
+# ---------------------------------------------------------------------------
+
+
+def _scan_time(value, now):
+    """Parse a scanner timestamp; missing, invalid or future values become *now*."""
+    scanned_at = parse_datetime(value) if isinstance(value, str) else None
+    if scanned_at is None:
+        return now
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    return min(scanned_at, now)
+
+
+def apply_checkins(event, scans):
+    """
+    Record a batch of scans for *event*.
+
+    *scans* is a list of ``{"ticket": str, "at": iso8601}`` dicts as
+    queued by the scanner; at most ``SYNC_BATCH_SIZE`` are processed.
+    All tickets are verified against one locked query and written with
+    one ``bulk_update``.  The earliest scan of a registration wins, so
+    re-uploading a batch is harmless.
+
+    Returns:
+        dict: ``accepted`` (registration pks checked in now),
+        ``duplicates`` (``{"pk", "checked_in_at"}`` of riders already in)
+        and ``rejected`` (tickets that are invalid for this event).
+    """
+    now = timezone.now()
+    scanned = {}
+    tickets = {}
+    rejected = []
+    for scan in scans[:SYNC_BATCH_SIZE]:
+        if not isinstance(scan, dict):
+            continue
+        ticket = str(scan.get("ticket", ""))
+        parsed = parse_ticket(ticket)
+        if parsed is None:
+            rejected.append(ticket)
+            continue
+        pk, signature = parsed
+        at = _scan_time(scan.get("at"), now)
+        if pk not in scanned or at < scanned[pk]:
+            scanned[pk] = at
+        tickets.setdefault(pk, []).append((ticket, signature))
+
+    accepted = []
+    duplicates = []
+    with transaction.atomic():
+        registrations = (
+            EventRegistration.objects.select_for_update()
+            .filter(
+                pk__in=scanned,
+                event=event,
+                status__in=ACTIVE_REGISTRATION_STATUSES,
+            )
+            .only("pk", "event_id", "registered_at", "checked_in_at")
+            .in_bulk()
+        )
+        to_update = []
+        for pk, entries in tickets.items():
+            registration = registrations.get(pk)
+            expected = (
+                _sign(registration.event_id, pk, registration.registered_at)
+                if registration is not None
+                else None
+            )
+            if expected is None or not any(
+                hmac.compare_digest(signature, expected) for _t, signature in entries
+            ):
+                rejected.extend(ticket for ticket, _s in entries)
+                continue
+            if registration.checked_in_at is not None:
+                duplicates.append(
+                    {"pk": pk, "checked_in_at": registration.checked_in_at.isoformat()}
+                )
+                continue
+            registration.checked_in_at = scanned[pk]
+            to_update.append(registration)
+            accepted.append(pk)
+
+        if to_update:
+            EventRegistration.objects.bulk_update(to_update, ["checked_in_at"])
+            # bulk_update skips post_save: refresh the roster ourselves
+            transaction.on_commit(lambda: invalidate_roster_snapshot(event.pk))
+
+    return {"accepted": accepted, "duplicates": duplicates, "rejected": rejected}
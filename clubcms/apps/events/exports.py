@@ -0,0 +1,259 @@
+"""
+Attendee roster exports for events.
+
+Rosters are read with ``select_related("user", "passenger_member")``
+and ``.iterator(chunk_size=...)`` and written row by row, so memory
+stays flat however many riders are registered:
+
+- ``iter_roster_csv`` yields CSV lines for ``StreamingHttpResponse``.
+- ``write_roster_xlsx`` writes a write-only openpyxl workbook (optional
+  ``exports`` extra).
+- ``render_checkin_sheet`` returns a printable HTML check-in sheet,
+  pre-rendered once per event and cached until a registration changes.
+"""
+
+import csv
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from apps.events.models import ACTIVE_REGISTRATION_STATUSES, EventRegistration
+
+# Registrations fetched per database round trip
+EXPORT_CHUNK_SIZE = 500
+
+CHECKIN_SHEET_CACHE_TIMEOUT = 60 * 60 * 24
+
+ROSTER_COLUMNS = [
+    _("ID"),
+    _("Status"),
+    _("Registered at"),
+    _("First name"),
+    _("Last name"),
+    _("Email"),
+    _("Phone"),
+    _("Card number"),
+    _("Guests"),
+    _("Guest names"),
+    _("Payment status"),
+    _("Payment amount"),
+    _("Payment reference"),
+    _("Passenger"),
+    _("Passenger first name"),
+    _("Passenger last name"),
+    _("Passenger email"),
+    _("Passenger phone"),
+    _("Passenger fiscal code"),
+    _("Passenger birth date"),
+    _("Passenger emergency contact"),
+    _("Notes"),
+]
+
+
+# ---------------------------------------------------------------------------
+# 1. Rows
+# ---------------------------------------------------------------------------
+
+
+def roster_queryset(event, include_waitlist=False):
+    """Registrations to export for *event*, in sign-up order."""
+    statuses = list(ACTIVE_REGISTRATION_STATUSES)
+    if include_waitlist:
+        statuses.append("waitlist")
+    return (
+        EventRegistration.objects.filter(event=event, status__in=statuses)
+        .select_related("user", "passenger_member")
+        .order_by("registered_at", "pk")
+    )
+
+
+def registrant_details(registration):
+    """Return (first_name, last_name, email, phone, card) of the registrant."""
+    user = registration.user
+    if user is None:
+        return (
+            registration.first_name,
+            registration.last_name,
+            registration.email,
+            "",
+            "",
+        )
+    return (
+        user.first_name,
+        user.last_name,
+        user.email,
+        user.mobile or user.phone,
+        user.card_number or "",
+    )
+
+
+def _passenger(registration):
+    """Return the passenger columns, preferring the linked member's data."""
+    if not registration.has_passenger:
+        return ("", "", "", "", "", "", "", "")
+    member = registration.passenger_member
+    if member is not None:
+        first, last = member.first_name, member.last_name
+        email = member.email
+        phone = member.mobile or member.phone
+        fiscal_code = member.fiscal_code
+        birth_date = member.birth_date
+    else:
+        first = registration.passenger_first_name
+        last = registration.passenger_last_name
+        email = registration.passenger_email
+        phone = registration.passenger_phone
+        fiscal_code = registration.passenger_fiscal_code
+        birth_date = registration.passenger_birth_date
+    return (
+        str(_("Yes")),
+        first,
+        last,
+        email,
+        phone,
+        fiscal_code,
+        birth_date.isoformat() if birth_date else "",
+        registration.passenger_emergency_contact,
+    )
+
+
+def iter_roster_rows(event, include_waitlist=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one list of column values per registration."""
+    registrations = roster_queryset(event, include_waitlist).iterator(
+        chunk_size=chunk_size
+    )
+    for registration in registrations:
+        yield [
+            registration.pk,
+            registration.get_status_display(),
+            timezone.localtime(registration.registered_at).strftime("%Y-%m-%d %H:%M"),
+            *registrant_details(registration),
+            registration.guests,
+            registration.guest_names,
+            registration.get_payment_status_display(),
+            f"{registration.payment_amount:.2f}",
+            registration.payment_reference,
+            *_passenger(registration),
+            registration.notes,
+        ]
+
+
+# ---------------------------------------------------------------------------
+# 2. CSV
+# ---------------------------------------------------------------------------
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_roster_csv(event, include_waitlist=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the roster of *event* as CSV, one line per chunk.
+
+    Starts with a UTF-8 BOM so spreadsheet apps detect the encoding.
+    """
+    writer = csv.writer(Echo())
+    yield "\ufeff" + writer.writerow([str(column) for column in ROSTER_COLUMNS])
+    for row in iter_roster_rows(event, include_waitlist, chunk_size):
+        yield writer.writerow(row)
+
+
+# ---------------------------------------------------------------------------
+# 3. XLSX (optional: openpyxl)
+# ---------------------------------------------------------------------------
+
+
+def xlsx_available():
+    """Return True if openpyxl is installed."""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_roster_xlsx(
+    event, fileobj, include_waitlist=False, chunk_size=EXPORT_CHUNK_SIZE
+):
+    """
+    Write the roster of *event* to *fileobj* as an XLSX workbook.
+
+    Uses openpyxl's write-only mode, which streams rows to disk instead
+    of building the sheet in memory.  Raises ImportError without
+    openpyxl.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=str(_("Roster"))[:31])
+    sheet.append([str(column) for column in ROSTER_COLUMNS])
+    for row in iter_roster_rows(event, include_waitlist, chunk_size):
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+# ---------------------------------------------------------------------------
+# 4. Check-in sheet (pre-rendered, cached)
+# ---------------------------------------------------------------------------
+
+
+def _checkin_cache_key(event_id):
+    return f"events_checkin_sheet_{event_id}"
+
+
+def _iter_checkin_rows(event):
+    """Yield the fields printed on the check-in sheet, one dict per rider."""
+    registrations = roster_queryset(event).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for number, registration in enumerate(registrations, start=1):
+        first, last, _email, phone, card = registrant_details(registration)
+        passenger = _passenger(registration)
+        yield {
+            "number": number,
+            "name": f"{last} {first}".strip(),
+            "card": card,
+            "phone": phone,
+            "passenger": f"{passenger[2]} {passenger[1]}".strip(),
+            "guests": registration.guests,
+            "paid": registration.payment_status == "paid",
+            "reference": registration.payment_reference,
+        }
+
+
+def render_checkin_sheet(event):
+    """
+    Return the printable HTML check-in sheet of *event*.
+
+    Rendered once and cached until a registration of the event changes
+    (see ``invalidate_checkin_sheets``), so repeated prints on event day
+    cost a single cache read.
+    """
+    key = _checkin_cache_key(event.pk)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            "events/checkin_sheet.html",
+            {"event": event, "rows": _iter_checkin_rows(event)},
+        )
+        cache.set(key, html, CHECKIN_SHEET_CACHE_TIMEOUT)
+    return html
+
+
+def invalidate_checkin_sheet(event_id):
+    """Drop the cached check-in sheet of one event."""
+    cache.delete(_checkin_cache_key(event_id))
+
+
+def invalidate_checkin_sheets(event_ids):
+    """
+    Drop the cached check-in sheets of several events.
+
+    For set-based updates (``QuerySet.update``, ``bulk_update``), which
+    skip the ``post_save`` handler in ``apps.events.signals``.
+    """
+    cache.delete_many([_checkin_cache_key(event_id) for event_id in set(event_ids)])
@@ -292,3 +292,36 @@ class GuestRegistrationForm(EventRegistrationForm):
         if not email:
             raise forms.ValidationError(_("Email is required for guest registrations."))
         return email
+
+
+# ---------------------------------------------------------------------------
+# Bank statement reconciliation (admin)
+# ---------------------------------------------------------------------------
+
+
+class BankStatementForm(forms.Form):
+    """Upload form for the bank reconciliation admin view."""
+
+    statement = forms.FileField(
+        label=_("Bank statement"),
+        help_text=_("CSV export or CAMT.053 XML file from your bank."),
+    )
+    format = forms.ChoiceField(
+        label=_("Format"),
+        choices=[
+            ("auto", _("Detect automatically")),
+            ("csv", _("CSV")),
+            ("camt053", _("CAMT.053")),
+        ],
+        initial="auto",
+    )
+    encoding = forms.CharField(
+        label=_("CSV encoding"),
+        initial="utf-8-sig",
+        max_length=30,
+    )
+    dry_run = forms.BooleanField(
+        label=_("Dry run"),
+        required=False,
+        help_text=_("Show the matches without marking anything paid."),
+    )
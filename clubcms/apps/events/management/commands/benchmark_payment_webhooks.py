@@ -0,0 +1,177 @@
+"""
+Management command to benchmark Stripe webhook ingestion and processing.
+
+Creates a throwaway event with N pending Stripe registrations, signs N
+``checkout.session.completed`` payloads with a fake webhook secret and
+measures both stages separately:
+
+    ingest   -- signature verification + record_webhook_event (the work
+                done inside the webhook request when a task cluster
+                applies the queue)
+    process  -- process_payment_webhooks over the resulting queue
+
+A share of the events is sent twice to mimic Stripe retries; they must
+be dropped at ingest.  The event, registrations and webhook rows are
+deleted afterwards.
+
+Usage:
+    python manage.py benchmark_payment_webhooks
+    python manage.py benchmark_payment_webhooks --events=2000 --retries=0.2
+"""
+
+import json
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.events.models import EventRegistration, PaymentWebhookEvent
+from apps.events.webhooks import (
+    fake_stripe_signature,
+    process_payment_webhooks,
+    record_webhook_event,
+)
+
+try:
+    import stripe
+except ImportError:
+    stripe = None
+
+BENCH_SECRET = "whsec_benchmark"
+
+
+class Command(BaseCommand):
+    help = "Benchmark Stripe webhook ingestion and batch processing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=500,
+            help="Number of distinct checkout sessions (default: 500)",
+        )
+        parser.add_argument(
+            "--retries",
+            type=float,
+            default=0.1,
+            help="Share of events delivered twice (default: 0.1)",
+        )
+
+    def handle(self, *args, **options):
+        if stripe is None:
+            raise CommandError("stripe package is not installed")
+
+        total = options["events"]
+        run = uuid.uuid4().hex[:8]
+        event = self._create_event(run)
+        try:
+            registrations = self._create_registrations(event, total, run)
+            deliveries = self._sign(registrations, run, options["retries"])
+            latencies = self._ingest(deliveries)
+            start = time.perf_counter()
+            handled = process_payment_webhooks()
+            processing = time.perf_counter() - start
+            self._report(event, deliveries, latencies, handled, processing)
+        finally:
+            PaymentWebhookEvent.objects.filter(
+                event_id__startswith=f"evt_{run}_"
+            ).delete()
+            EventRegistration.objects.filter(event=event).delete()
+            event.delete()
+
+    # -- setup --------------------------------------------------------------
+
+    def _create_event(self, run):
+        from wagtail.models import Page
+
+        from apps.website.models.pages import EventDetailPage
+
+        root = Page.objects.get(depth=1)
+        event = EventDetailPage(
+            title="Payment webhook benchmark",
+            slug=f"webhook-benchmark-{run}",
+            start_date=timezone.now() + timedelta(days=30),
+            max_attendees=0,
+            live=False,
+        )
+        root.add_child(instance=event)
+        return event
+
+    def _create_registrations(self, event, total, run):
+        EventRegistration.objects.bulk_create(
+            [
+                EventRegistration(
+                    event=event,
+                    first_name="Bench",
+                    last_name=str(index),
+                    payment_provider="stripe",
+                    payment_amount=25,
+                    payment_session_id=f"cs_{run}_{index}",
+                )
+                for index in range(total)
+            ],
+            batch_size=500,
+        )
+        return list(EventRegistration.objects.filter(event=event).order_by("pk"))
+
+    def _sign(self, registrations, run, retries):
+        deliveries = []
+        for index, reg in enumerate(registrations):
+            payload = json.dumps({
+                "id": f"evt_{run}_{index}",
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {
+                    "object": {
+                        "id": reg.payment_session_id,
+                        "object": "checkout.session",
+                        "payment_intent": f"pi_{run}_{index}",
+                    }
+                },
+            })
+            deliveries.append((payload, fake_stripe_signature(payload, BENCH_SECRET)))
+        step = int(1 / retries) if retries > 0 else 0
+        if step:
+            deliveries.extend(deliveries[::step])
+        return deliveries
+
+    # -- stages -------------------------------------------------------------
+
+    def _ingest(self, deliveries):
+        latencies = []
+        for payload, header in deliveries:
+            start = time.perf_counter()
+            event = stripe.Webhook.construct_event(payload, header, BENCH_SECRET)
+            record_webhook_event("stripe", event, enqueue=False)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    # -- reporting ----------------------------------------------------------
+
+    def _report(self, event, deliveries, latencies, handled, processing):
+        ingest = sum(latencies)
+        ordered = sorted(latencies)
+        p95 = ordered[int(len(ordered) * 0.95) - 1] if ordered else 0.0
+        registrations = EventRegistration.objects.filter(event=event)
+        paid = registrations.filter(payment_status="paid").count()
+        sessions = registrations.count()
+        rate = len(deliveries) / ingest if ingest else 0.0
+
+        self.stdout.write(
+            f"Deliveries: {len(deliveries)} ({len(deliveries) - sessions} retries)\n"
+            f"  Ingest:  {ingest:.3f}s ({rate:.1f}/s), "
+            f"median {statistics.median(latencies) * 1000:.2f}ms, "
+            f"p95 {p95 * 1000:.2f}ms\n"
+            f"  Process: {processing:.3f}s for {handled} queued event(s) "
+            f"({handled / processing if processing else 0:.1f}/s)\n"
+            f"  Paid: {paid}/{sessions}"
+        )
+        if handled == sessions and paid == sessions:
+            self.stdout.write(
+                self.style.SUCCESS("Retries deduplicated, every session paid")
+            )
+        else:
+            self.stdout.write(self.style.ERROR("Queue and registrations do not match"))
@@ -0,0 +1,213 @@
+"""
+Management command to benchmark concurrent event registrations.
+
+Creates a throwaway event, fires N registrations from parallel threads
+(released together by a barrier, like a registration opening at 20:00)
+and reports throughput plus capacity invariants.  The event and its
+registrations are deleted afterwards.
+
+Strategies:
+    counter   -- reserve_seat(): one conditional UPDATE on EventCapacity
+    row-lock  -- legacy: SELECT ... FOR UPDATE over confirmed registrations
+
+Run it against PostgreSQL for meaningful numbers; SQLite serializes all
+writers and will report "database is locked" under heavy concurrency.
+
+Usage:
+    python manage.py benchmark_seat_reservation
+    python manage.py benchmark_seat_reservation --registrations=200 --threads=50
+    python manage.py benchmark_seat_reservation --strategy=row-lock
+"""
+
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.events.capacity import (
+    get_capacity,
+    rebuild_capacity,
+    release_seat,
+    reserve_seat,
+)
+from apps.events.models import ACTIVE_REGISTRATION_STATUSES, EventRegistration
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent event registrations against a throwaway event"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--registrations",
+            type=int,
+            default=200,
+            help="Number of registrations to submit (default: 200)",
+        )
+        parser.add_argument(
+            "--capacity",
+            type=int,
+            default=100,
+            help="max_attendees of the throwaway event (default: 100)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=200,
+            help="Number of parallel workers; 1 runs inline (default: 200)",
+        )
+        parser.add_argument(
+            "--strategy",
+            choices=["counter", "row-lock"],
+            default="counter",
+            help="Seat decision strategy to benchmark (default: counter)",
+        )
+
+    def handle(self, *args, **options):
+        total = options["registrations"]
+        capacity = options["capacity"]
+        threads = max(1, min(options["threads"], total))
+        strategy = options["strategy"]
+
+        event = self._create_event(capacity)
+        try:
+            statuses, errors, elapsed = self._run(event, total, threads, strategy)
+            self._report(
+                event, total, capacity, threads, strategy, statuses, errors, elapsed
+            )
+        finally:
+            EventRegistration.objects.filter(event=event).delete()
+            event.delete()
+
+    # -- setup --------------------------------------------------------------
+
+    def _create_event(self, capacity):
+        from wagtail.models import Page
+
+        from apps.website.models.pages import EventDetailPage
+
+        root = Page.objects.get(depth=1)
+        event = EventDetailPage(
+            title="Seat reservation benchmark",
+            slug=f"seat-benchmark-{uuid.uuid4().hex[:8]}",
+            start_date=timezone.now() + timedelta(days=30),
+            registration_open=True,
+            max_attendees=capacity,
+            live=False,
+        )
+        root.add_child(instance=event)
+        return event
+
+    # -- workers ------------------------------------------------------------
+
+    def _register(self, event, index, strategy):
+        registration = EventRegistration(
+            event=event,
+            first_name="Bench",
+            last_name=str(index),
+            payment_status="paid",
+            payment_provider="free",
+        )
+        max_attendees = event.max_attendees
+
+        if strategy == "counter":
+            try:
+                reserve_seat(registration, max_attendees)
+                with transaction.atomic():
+                    registration.save()
+            except Exception:
+                release_seat(registration)
+                raise
+        else:
+            with transaction.atomic():
+                taken = (
+                    EventRegistration.objects.select_for_update()
+                    .filter(event=event, status__in=ACTIVE_REGISTRATION_STATUSES)
+                    .count()
+                )
+                registration.status = (
+                    "waitlist" if taken >= max_attendees else "registered"
+                )
+                registration.save()
+        return registration.status
+
+    def _run(self, event, total, threads, strategy):
+        statuses = Counter()
+        errors = []
+        lock = threading.Lock()
+
+        if threads == 1:
+            start = time.perf_counter()
+            for index in range(total):
+                statuses[self._register(event, index, strategy)] += 1
+            return statuses, errors, time.perf_counter() - start
+
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(indices):
+            try:
+                connection.ensure_connection()
+                barrier.wait()
+                for index in indices:
+                    try:
+                        status = self._register(event, index, strategy)
+                    except Exception as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    with lock:
+                        statuses[status] += 1
+            finally:
+                connection.close()
+
+        pool = [
+            threading.Thread(target=worker, args=(range(i, total, threads),))
+            for i in range(threads)
+        ]
+        for thread in pool:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in pool:
+            thread.join()
+        return statuses, errors, time.perf_counter() - start
+
+    # -- reporting ----------------------------------------------------------
+
+    def _report(
+        self, event, total, capacity, threads, strategy, statuses, errors, elapsed
+    ):
+        registered = statuses.get("registered", 0)
+        waitlisted = statuses.get("waitlist", 0)
+        done = registered + waitlisted
+        rate = done / elapsed if elapsed else 0.0
+
+        counted = get_capacity(event)
+        counters = (counted.confirmed_count, counted.waitlist_count)
+        rebuilt = rebuild_capacity([event.pk])[0]
+        actual = (rebuilt.confirmed_count, rebuilt.waitlist_count)
+
+        self.stdout.write(
+            f"Strategy: {strategy}, {threads} thread(s), "
+            f"{total} registration(s), capacity {capacity}\n"
+            f"  Elapsed: {elapsed:.3f}s ({rate:.1f} registrations/s)\n"
+            f"  registered={registered} waitlist={waitlisted} errors={len(errors)}\n"
+            f"  Counters: confirmed={counters[0]} waitlist={counters[1]} "
+            f"(actual confirmed={actual[0]} waitlist={actual[1]})"
+        )
+        for message in sorted(set(errors))[:5]:
+            self.stdout.write(f"  ! {message}")
+
+        ok = actual[0] <= capacity and counters == actual
+        if ok and not errors:
+            self.stdout.write(
+                self.style.SUCCESS("Invariants hold: no overbooking, counters exact")
+            )
+        elif not ok:
+            self.stdout.write(
+                self.style.ERROR("Invariant violated: overbooked or counters drifted")
+            )
@@ -0,0 +1,65 @@
+"""
+Management command to rebuild the denormalized EventCapacity counters.
+
+Recomputes confirmed, waitlisted and passenger totals from
+EventRegistration and reports any counters that had drifted.
+
+Usage:
+    python manage.py rebuild_event_capacity
+    python manage.py rebuild_event_capacity --event=42 --event=43
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.events.capacity import COUNTER_FIELDS, rebuild_capacity
+from apps.events.models import EventCapacity
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-event capacity counters from registrations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--event",
+            type=int,
+            action="append",
+            dest="events",
+            help="Rebuild only this event page PK (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        event_ids = options.get("events")
+
+        existing = EventCapacity.objects.all()
+        if event_ids:
+            existing = existing.filter(event_id__in=event_ids)
+        before = {
+            row["event_id"]: row
+            for row in existing.values("event_id", *COUNTER_FIELDS)
+        }
+
+        rows = rebuild_capacity(event_ids)
+
+        drifted = 0
+        for row in rows:
+            old = before.get(row.event_id)
+            new = {field: getattr(row, field) for field in COUNTER_FIELDS}
+            if old is None:
+                continue
+            if any(old[field] != new[field] for field in COUNTER_FIELDS):
+                drifted += 1
+                self.stdout.write(
+                    f"  Event {row.event_id}: "
+                    + ", ".join(
+                        f"{field} {old[field]} -> {new[field]}"
+                        for field in COUNTER_FIELDS
+                        if old[field] != new[field]
+                    )
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt capacity for {len(rows)} event(s), "
+                f"{drifted} had drifted, {len(rows) - len(before)} created"
+            )
+        )
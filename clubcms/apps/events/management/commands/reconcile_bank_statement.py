@@ -0,0 +1,75 @@
+"""
+Management command to reconcile bank transfers from a statement file.
+
+Streams a CSV or CAMT.053 statement, matches payment references
+(EVT-00042-A7B3) against pending bank transfers and marks the matches
+paid.  Unmatched, ambiguous and underpaid lines are listed for manual
+follow-up.
+
+Usage:
+    python manage.py reconcile_bank_statement statement.xml
+    python manage.py reconcile_bank_statement export.csv --encoding=cp1252
+    python manage.py reconcile_bank_statement export.csv --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.events.reconciliation import iter_statement, reconcile
+
+
+class Command(BaseCommand):
+    help = "Mark bank transfers paid from a CSV or CAMT.053 statement"
+
+    def add_arguments(self, parser):
+        parser.add_argument("statement", help="Path to the statement file")
+        parser.add_argument(
+            "--format",
+            choices=["auto", "csv", "camt053"],
+            default="auto",
+            help="Statement format (default: detected from content)",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="utf-8-sig",
+            help="Text encoding of CSV statements (default: utf-8-sig)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report matches without marking anything paid",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["statement"], "rb") as fileobj:
+                report = reconcile(
+                    iter_statement(fileobj, options["format"], options["encoding"]),
+                    dry_run=options["dry_run"],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except (ValueError, SyntaxError) as exc:
+            raise CommandError(f"Could not read statement: {exc}")
+
+        for line, reason in report.ambiguous:
+            self.stdout.write(f"  Ambiguous line {line.number}: {reason} [{line.text}]")
+        for line, pk, due in report.underpaid:
+            self.stdout.write(
+                f"  Underpaid line {line.number}: registration {pk} "
+                f"received {line.amount}, due {due}"
+            )
+        if options["verbosity"] > 1:
+            for line in report.unmatched:
+                self.stdout.write(
+                    f"  Unmatched line {line.number}: {line.amount} [{line.text}]"
+                )
+
+        verb = "would be marked" if report.dry_run else "marked"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report.lines} credit line(s): {len(report.matched)} {verb} paid, "
+                f"{len(report.unmatched)} unmatched, "
+                f"{len(report.ambiguous)} ambiguous, "
+                f"{len(report.underpaid)} underpaid"
+            )
+        )
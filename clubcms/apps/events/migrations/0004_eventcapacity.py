@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_capacity(apps, schema_editor):
+    EventDetailPage = apps.get_model("website", "EventDetailPage")
+    EventRegistration = apps.get_model("events", "EventRegistration")
+    EventCapacity = apps.get_model("events", "EventCapacity")
+
+    active = Q(status__in=["registered", "confirmed"])
+    totals = {
+        row["event_id"]: row
+        for row in EventRegistration.objects.order_by()
+        .values("event_id")
+        .annotate(
+            confirmed=Count("pk", filter=active),
+            waitlist=Count("pk", filter=Q(status="waitlist")),
+            passengers=Count("pk", filter=active & Q(has_passenger=True)),
+        )
+    }
+    EventCapacity.objects.bulk_create(
+        [
+            EventCapacity(
+                event_id=pk,
+                confirmed_count=totals.get(pk, {}).get("confirmed", 0),
+                waitlist_count=totals.get(pk, {}).get("waitlist", 0),
+                passenger_count=totals.get(pk, {}).get("passengers", 0),
+            )
+            for pk in EventDetailPage.objects.values_list("pk", flat=True)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_eventregistration_payment_amount_and_more'),
+        ('website', '0005_navbaritem_parent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCapacity',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='capacity', serialize=False, to='website.eventdetailpage', verbose_name='Event')),
+                ('confirmed_count', models.IntegerField(default=0, help_text='Registrations holding a seat (registered or confirmed).', verbose_name='Confirmed registrations')),
+                ('waitlist_count', models.IntegerField(default=0, verbose_name='Waitlisted registrations')),
+                ('passenger_count', models.IntegerField(default=0, help_text='Passengers of registrations holding a seat.', verbose_name='Passengers')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+            ],
+            options={
+                'verbose_name': 'Event Capacity',
+                'verbose_name_plural': 'Event Capacities',
+            },
+        ),
+        migrations.RunPython(populate_capacity, migrations.RunPython.noop),
+    ]
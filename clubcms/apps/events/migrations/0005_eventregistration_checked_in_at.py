@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_eventcapacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventregistration',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, help_text="When the rider's ticket was scanned at the event.", null=True, verbose_name='Checked in at'),
+        ),
+    ]
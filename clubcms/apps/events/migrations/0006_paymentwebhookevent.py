@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_eventregistration_checked_in_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('stripe', 'Stripe'), ('paypal', 'PayPal'), ('bank_transfer', 'Bank Transfer'), ('free', 'Free')], max_length=20, verbose_name='Provider')),
+                ('event_id', models.CharField(help_text='Webhook event ID assigned by the provider.', max_length=255, verbose_name='Event ID')),
+                ('event_type', models.CharField(max_length=100, verbose_name='Event type')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('error_message', models.TextField(blank=True, verbose_name='Error message')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Received at')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processed at')),
+            ],
+            options={
+                'verbose_name': 'Payment Webhook Event',
+                'verbose_name_plural': 'Payment Webhook Events',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='events_webhook_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id'), name='unique_payment_webhook_event')],
+            },
+        ),
+    ]
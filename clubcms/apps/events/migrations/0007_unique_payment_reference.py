@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:42
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# Frozen copy of apps.events.payment.generate_payment_reference as of this
+# migration, so later changes to the live generator cannot alter it
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+REFERENCE_CODE_LENGTH = 6
+MAX_ATTEMPTS = 50
+
+
+def _check_character(payload):
+    total = 0
+    for position, char in enumerate(reversed(payload + "0")):
+        addend = CROCKFORD_ALPHABET.index(char) * (2 if position % 2 else 1)
+        total += addend // 32 + addend % 32
+    return CROCKFORD_ALPHABET[(32 - total % 32) % 32]
+
+
+def generate_payment_reference(registration, attempt):
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"events.payment_reference:{registration.pk}:{attempt}".encode(),
+        hashlib.sha256,
+    ).digest()
+    value = int.from_bytes(digest[:8], "big")
+    code = ""
+    for _position in range(REFERENCE_CODE_LENGTH):
+        value, index = divmod(value, 32)
+        code += CROCKFORD_ALPHABET[index]
+    event_part = f"{registration.event_id:05d}"
+    return f"EVT-{event_part}-{code}{_check_character(event_part + code)}"
+
+
+def reissue_duplicate_references(apps, schema_editor):
+    """
+    Give every registration but the oldest of a shared legacy reference
+    a new (collision-free) one, so the unique constraint can be added.
+    """
+    EventRegistration = apps.get_model("events", "EventRegistration")
+    duplicated = (
+        EventRegistration.objects.exclude(payment_reference="")
+        .values("payment_reference")
+        .annotate(n=Count("pk"))
+        .filter(n__gt=1)
+        .values_list("payment_reference", flat=True)
+    )
+    taken = set(
+        EventRegistration.objects.exclude(payment_reference="").values_list(
+            "payment_reference", flat=True
+        )
+    )
+    for reference in list(duplicated):
+        registrations = EventRegistration.objects.filter(
+            payment_reference=reference
+        ).order_by("pk")
+        for registration in list(registrations)[1:]:
+            for attempt in range(MAX_ATTEMPTS):
+                candidate = generate_payment_reference(registration, attempt)
+                if candidate not in taken:
+                    break
+            taken.add(candidate)
+            registration.payment_reference = candidate
+            registration.save(update_fields=["payment_reference"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_paymentwebhookevent'),
+        ('website', '0005_navbaritem_parent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventregistration',
+            name='payment_reference',
+            field=models.CharField(blank=True, help_text='Unique reference for bank transfers (e.g. EVT-00123-7K3QFMX).', max_length=50, verbose_name='Payment reference'),
+        ),
+        migrations.RunPython(reissue_duplicate_references, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventregistration',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment_reference', ''), _negated=True), fields=('payment_reference',), name='unique_payment_reference'),
+        ),
+    ]
@@ -3,7 +3,9 @@ Models for the events app.
 
 Provides EventRegistration for event sign-ups, PricingTier for
 time-based pricing (as an Orderable linked to EventDetailPage),
-and EventFavorite for user bookmarks.
+EventFavorite for user bookmarks, EventCapacity for the
+denormalized per-event registration counters, and PaymentWebhookEvent
+for the queue of received payment provider webhooks.
 """
 
 from django.conf import settings
@@ -40,6 +42,16 @@ PAYMENT_PROVIDER_CHOICES = [
     ("free", _("Free")),
 ]
 
+# Statuses that occupy a seat (counted against max_attendees)
+ACTIVE_REGISTRATION_STATUSES = ("registered", "confirmed")
+
+WEBHOOK_STATUS_CHOICES = [
+    ("pending", _("Pending")),
+    ("processed", _("Processed")),
+    ("ignored", _("Ignored")),
+    ("failed", _("Failed")),
+]
+
 
 # ---------------------------------------------------------------------------
 # 1. EventRegistration
@@ -125,7 +137,7 @@ class EventRegistration(models.Model):
         max_length=50,
         blank=True,
         verbose_name=_("Payment reference"),
-        help_text=_("Unique reference for bank transfers (e.g. EVT-00123-A7B3)."),
+        help_text=_("Unique reference for bank transfers (e.g. EVT-00123-7K3QFMX)."),
     )
     payment_expires_at = models.DateTimeField(
         null=True,
@@ -133,6 +145,12 @@ class EventRegistration(models.Model):
         verbose_name=_("Payment expires at"),
         help_text=_("Deadline for bank transfer payments."),
     )
+    checked_in_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Checked in at"),
+        help_text=_("When the rider's ticket was scanned at the event."),
+    )
 
     # ---- Guest registration fields (when user is null) ----
     email = models.CharField(
@@ -209,11 +227,51 @@ class EventRegistration(models.Model):
         verbose_name = _("Event Registration")
         verbose_name_plural = _("Event Registrations")
         ordering = ["-registered_at"]
+        constraints = [
+            # Also the index behind find_by_reference / reconciliation
+            models.UniqueConstraint(
+                fields=["payment_reference"],
+                condition=~models.Q(payment_reference=""),
+                name="unique_payment_reference",
+            ),
+        ]
+
+    # State currently reflected in EventCapacity (None = not counted).
+    _capacity_state = None
 
     def __str__(self):
         user_display = self.user or self.email or _("Guest")
         return f"{user_display} - {self.event} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the capacity counters already account for, so the
+        # post_save handler can apply the difference without re-counting.
+        loaded = instance.__dict__
+        if {"event_id", "status", "has_passenger"} <= loaded.keys():
+            instance._capacity_state = instance.capacity_state
+        else:
+            instance._capacity_state = "unknown"
+        return instance
+
+    @property
+    def capacity_state(self):
+        """
+        Return the ``(event_id, bucket, has_passenger)`` triple this
+        registration contributes to ``EventCapacity``.
+
+        ``bucket`` is ``"confirmed"`` for seat-holding statuses,
+        ``"waitlist"`` for waitlisted entries and ``None`` otherwise.
+        """
+        if self.status in ACTIVE_REGISTRATION_STATUSES:
+            bucket = "confirmed"
+        elif self.status == "waitlist":
+            bucket = "waitlist"
+        else:
+            bucket = None
+        return (self.event_id, bucket, bool(self.has_passenger))
+
 
 # ---------------------------------------------------------------------------
 # 2. PricingTier (Orderable, linked to EventDetailPage)
@@ -330,3 +388,129 @@ class EventFavorite(models.Model):
 
     def __str__(self):
         return f"{self.user} - {self.event}"
+
+
+# ---------------------------------------------------------------------------
+# 4. EventCapacity (denormalized registration counters)
+# ---------------------------------------------------------------------------
+
+
+class EventCapacity(models.Model):
+    """
+    Per-event registration totals maintained alongside EventRegistration.
+
+    Listings and the registration path read these counters instead of
+    running ``COUNT(*)`` over registrations.  They are adjusted in the
+    same transaction as every registration change (see
+    ``apps.events.capacity``) and can be rebuilt with the
+    ``rebuild_event_capacity`` management command.
+    """
+
+    event = models.OneToOneField(
+        "website.EventDetailPage",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="capacity",
+        verbose_name=_("Event"),
+    )
+    confirmed_count = models.IntegerField(
+        default=0,
+        verbose_name=_("Confirmed registrations"),
+        help_text=_("Registrations holding a seat (registered or confirmed)."),
+    )
+    waitlist_count = models.IntegerField(
+        default=0,
+        verbose_name=_("Waitlisted registrations"),
+    )
+    passenger_count = models.IntegerField(
+        default=0,
+        verbose_name=_("Passengers"),
+        help_text=_("Passengers of registrations holding a seat."),
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at"),
+    )
+
+    class Meta:
+        verbose_name = _("Event Capacity")
+        verbose_name_plural = _("Event Capacities")
+
+    def __str__(self):
+        return (
+            f"{self.event_id}: {self.confirmed_count} confirmed, "
+            f"{self.waitlist_count} waitlisted"
+        )
+
+
+# ---------------------------------------------------------------------------
+# 5. PaymentWebhookEvent (ingestion queue)
+# ---------------------------------------------------------------------------
+
+
+class PaymentWebhookEvent(models.Model):
+    """
+    A verified payment provider webhook, stored on receipt and applied
+    later by ``apps.events.webhooks.process_payment_webhooks``.
+
+    ``(provider, event_id)`` is unique, so provider retries of an event
+    that was already received are dropped at insert time.
+    """
+
+    provider = models.CharField(
+        max_length=20,
+        choices=PAYMENT_PROVIDER_CHOICES,
+        verbose_name=_("Provider"),
+    )
+    event_id = models.CharField(
+        max_length=255,
+        verbose_name=_("Event ID"),
+        help_text=_("Webhook event ID assigned by the provider."),
+    )
+    event_type = models.CharField(
+        max_length=100,
+        verbose_name=_("Event type"),
+    )
+    payload = models.JSONField(
+        verbose_name=_("Payload"),
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=WEBHOOK_STATUS_CHOICES,
+        default="pending",
+        verbose_name=_("Status"),
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Attempts"),
+    )
+    error_message = models.TextField(
+        blank=True,
+        verbose_name=_("Error message"),
+    )
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Received at"),
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Processed at"),
+    )
+
+    class Meta:
+        verbose_name = _("Payment Webhook Event")
+        verbose_name_plural = _("Payment Webhook Events")
+        ordering = ["-received_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "event_id"],
+                name="unique_payment_webhook_event",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "id"], name="events_webhook_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id} ({self.status})"
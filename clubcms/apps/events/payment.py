@@ -3,11 +3,15 @@ Payment service layer for the events app.
 
 Provides payment reference generation for bank transfers,
 Stripe Checkout Session management, and PayPal Orders API
-integration via httpx.
+integration via a pooled, token-caching httpx client.
 """
 
 import hashlib
+import hmac
 import logging
+import re
+import threading
+import time
 
 import httpx
 
@@ -16,7 +20,10 @@ try:
 except ImportError:
     stripe = None
 
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger(__name__)
 
@@ -26,17 +33,175 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 
 
-def generate_payment_reference(registration):
+# Crockford base32: no I, L, O or U, so references survive being read aloud
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# Random characters per reference (32**6 ~ 1e9 codes per event)
+REFERENCE_CODE_LENGTH = 6
+
+REFERENCE_MAX_ATTEMPTS = 5
+
+# Characters people type for the ones Crockford leaves out
+_REFERENCE_TYPOS = str.maketrans({"O": "0", "I": "1", "L": "1", "U": "V"})
+
+# Current (7-char code incl. check) and legacy (4 hex chars) references,
+# with optional separators; typo characters are fixed by normalization
+PAYMENT_REFERENCE_PATTERN = re.compile(
+    r"\bEVT[\s-]?(\d{5})[\s-]?([0-9A-Z]{7}|[0-9A-Z]{4})\b", re.IGNORECASE
+)
+
+
+def _luhn_mod32(payload):
+    """Luhn mod N sum of *payload* (Crockford characters), N = 32."""
+    total = 0
+    for position, char in enumerate(reversed(payload)):
+        addend = CROCKFORD_ALPHABET.index(char) * (2 if position % 2 else 1)
+        total += addend // 32 + addend % 32
+    return total % 32
+
+
+def _check_character(payload):
+    """Luhn mod 32 check character for *payload*."""
+    # Position 0 of payload + check is the check character itself
+    total = _luhn_mod32(payload + "0")
+    return CROCKFORD_ALPHABET[(32 - total) % 32]
+
+
+def generate_payment_reference(registration, attempt=0):
     """
-    Generate a unique payment reference for bank transfers.
+    Generate the payment reference for bank transfers.
 
-    Format: EVT-{event_pk:05d}-{hash:4}
-    Example: EVT-00042-A7B3
+    Format: EVT-{event_pk:05d}-{code:6}{check:1}
+    Example: EVT-00042-7K3QFMX
+
+    ``code`` is derived from an HMAC of the registration PK (and
+    *attempt*, bumped on the rare collision) in Crockford base32;
+    ``check`` is a Luhn mod 32 character over event number and code,
+    which catches any single mistyped character and most swapped
+    neighbours.  Use ``assign_payment_reference`` to store it.
+    """
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"events.payment_reference:{registration.pk}:{attempt}".encode(),
+        hashlib.sha256,
+    ).digest()
+    value = int.from_bytes(digest[:8], "big")
+    code = ""
+    for _position in range(REFERENCE_CODE_LENGTH):
+        value, index = divmod(value, 32)
+        code += CROCKFORD_ALPHABET[index]
+    event_part = f"{registration.event_id:05d}"
+    return f"EVT-{event_part}-{code}{_check_character(event_part + code)}"
+
+
+def assign_payment_reference(registration, update_fields=("payment_reference",)):
     """
-    hash_part = hashlib.sha256(
-        str(registration.pk).encode()
-    ).hexdigest()[:4].upper()
-    return f"EVT-{registration.event_id:05d}-{hash_part}"
+    Store a unique payment reference on *registration*.
+
+    Saves *update_fields* (which must include ``payment_reference``);
+    a collision with another registration's reference is caught by the
+    unique index and retried with the next candidate.
+
+    Raises:
+        IntegrityError: If no free reference was found.
+    """
+    for attempt in range(REFERENCE_MAX_ATTEMPTS):
+        registration.payment_reference = generate_payment_reference(
+            registration, attempt
+        )
+        try:
+            with transaction.atomic():
+                registration.save(update_fields=list(update_fields))
+        except IntegrityError:
+            if attempt == REFERENCE_MAX_ATTEMPTS - 1:
+                raise
+            logger.warning(
+                "Payment reference collision for registration %s, retrying",
+                registration.pk,
+            )
+            continue
+        return registration.payment_reference
+
+
+def reference_candidates(text):
+    """
+    Return the canonical references *text* may stand for.
+
+    Fixes case, spacing, missing hyphens and O/I/L/U typos.  A current
+    reference with a wrong check character yields the variants with two
+    neighbouring characters swapped that pass the check; an invalid
+    reference yields an empty list.
+    """
+    match = PAYMENT_REFERENCE_PATTERN.fullmatch(
+        (text or "").strip().upper().translate(_REFERENCE_TYPOS)
+    )
+    if match is None:
+        return []
+    event_part, code = match.groups()
+    if len(code) == 4:
+        # Legacy EVT-XXXXX-XXXX reference: hex, no check character
+        if any(char not in "0123456789ABCDEF" for char in code):
+            return []
+        return [f"EVT-{event_part}-{code}"]
+
+    payload = event_part + code
+    if _luhn_mod32(payload) == 0:
+        return [f"EVT-{event_part}-{code}"]
+
+    candidates = []
+    for index in range(len(payload) - 1):
+        swapped = (
+            payload[:index] + payload[index + 1] + payload[index] + payload[index + 2:]
+        )
+        if swapped != payload and swapped[:5].isdigit() and _luhn_mod32(swapped) == 0:
+            candidates.append(f"EVT-{swapped[:5]}-{swapped[5:]}")
+    return candidates
+
+
+def normalize_payment_reference(text):
+    """Return the canonical form of *text*, or None if it is not unambiguous."""
+    candidates = reference_candidates(text)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def find_by_reference(text, queryset=None):
+    """
+    Return the registration whose payment reference *text* stands for.
+
+    Accepts the typos handled by ``reference_candidates``; looks the
+    candidates up through the unique ``payment_reference`` index with a
+    single query.  Returns None when nothing, or more than one
+    registration, matches.
+    """
+    from apps.events.models import EventRegistration
+
+    candidates = reference_candidates(text)
+    if not candidates:
+        return None
+    if queryset is None:
+        queryset = EventRegistration.objects.all()
+    matches = list(queryset.filter(payment_reference__in=candidates)[:2])
+    return matches[0] if len(matches) == 1 else None
+
+
+# ---------------------------------------------------------------------------
+# Payment confirmations
+# ---------------------------------------------------------------------------
+
+
+def notify_payment_confirmed(registrations):
+    """Queue ``payment_confirmed`` notifications with one bulk insert."""
+    from apps.notifications.services import notify_registrants
+
+    notify_registrants(
+        registrations,
+        "payment_confirmed",
+        title=_("Payment confirmed: {event}"),
+        body=_("We received your payment of {currency}{amount} for {event}."),
+        url=reverse("events:my_registrations"),
+        channels=["email"],
+        batch_size=500,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -108,9 +273,116 @@ def create_stripe_checkout_session(registration, payment_settings, request):
 # ---------------------------------------------------------------------------
 
 
+# Refresh the OAuth token this many seconds before PayPal expires it
+PAYPAL_TOKEN_REFRESH_MARGIN = 60
+
+PAYPAL_TIMEOUT = 30
+
+
+class PayPalClient:
+    """
+    Long-lived PayPal API client for one set of credentials.
+
+    Keeps a pooled ``httpx.Client`` (HTTP keep-alive, so a checkout
+    reuses one TLS connection) and caches the OAuth access token until
+    ``PAYPAL_TOKEN_REFRESH_MARGIN`` seconds before its ``expires_in``.
+    Refreshes happen under a lock so concurrent requests fetch the
+    token only once.
+    """
+
+    def __init__(self, base_url, client_id, secret):
+        self.base_url = base_url
+        self.client_id = client_id
+        self.secret = secret
+        self.http = httpx.Client(
+            timeout=PAYPAL_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+        )
+        self._token = None
+        self._token_expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def matches(self, payment_settings):
+        return (self.client_id, self.secret) == (
+            payment_settings.paypal_client_id,
+            payment_settings.paypal_secret,
+        )
+
+    def access_token(self):
+        """Return a valid access token, fetching a new one if needed."""
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            response = self.http.post(
+                f"{self.base_url}/v1/oauth2/token",
+                auth=(self.client_id, self.secret),
+                data={"grant_type": "client_credentials"},
+                headers={"Accept": "application/json"},
+            )
+            response.raise_for_status()
+            data = response.json()
+            self._token = data["access_token"]
+            expires_in = data.get("expires_in", 0)
+            self._token_expires_at = (
+                time.monotonic() + expires_in - PAYPAL_TOKEN_REFRESH_MARGIN
+            )
+            return self._token
+
+    def invalidate_token(self):
+        with self._lock:
+            self._token = None
+            self._token_expires_at = 0.0
+
+    def close(self):
+        self.http.close()
+
+
+_paypal_clients = {}
+_paypal_clients_lock = threading.Lock()
+
+
+def get_paypal_client(payment_settings):
+    """
+    Return the shared ``PayPalClient`` for the settings' mode.
+
+    One client is kept per API base URL (sandbox or live); it is
+    replaced when the credentials for that mode change.  The old client
+    is only dropped, not closed: other threads may still be mid-request
+    on it, and its connections are released once they are done with it.
+    """
+    base_url = payment_settings.paypal_base_url
+    client = _paypal_clients.get(base_url)
+    if client is not None and client.matches(payment_settings):
+        return client
+    with _paypal_clients_lock:
+        client = _paypal_clients.get(base_url)
+        if client is None or not client.matches(payment_settings):
+            client = PayPalClient(
+                base_url,
+                payment_settings.paypal_client_id,
+                payment_settings.paypal_secret,
+            )
+            _paypal_clients[base_url] = client
+        return client
+
+
+def reset_paypal_clients():
+    """Close and forget all pooled PayPal clients (tests, settings changes)."""
+    with _paypal_clients_lock:
+        for client in _paypal_clients.values():
+            client.close()
+        _paypal_clients.clear()
+
+
 def get_paypal_access_token(payment_settings):
     """
-    Obtain a PayPal OAuth2 access token using client credentials.
+    Return a PayPal OAuth2 access token using client credentials.
+
+    The token is cached on the pooled client until shortly before it
+    expires.
 
     Args:
         payment_settings: PaymentSettings instance.
@@ -121,15 +393,32 @@ def get_paypal_access_token(payment_settings):
     Raises:
         httpx.HTTPStatusError: On PayPal API failure.
     """
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f"{payment_settings.paypal_base_url}/v1/oauth2/token",
-            auth=(payment_settings.paypal_client_id, payment_settings.paypal_secret),
-            data={"grant_type": "client_credentials"},
-            headers={"Accept": "application/json"},
+    return get_paypal_client(payment_settings).access_token()
+
+
+def _paypal_post(payment_settings, path, **kwargs):
+    """
+    POST to the PayPal API with a bearer token on the pooled client.
+
+    A 401 means the cached token was revoked early: it is dropped and
+    the request retried once with a fresh one.
+    """
+    client = get_paypal_client(payment_settings)
+    for attempt in range(2):
+        access_token = get_paypal_access_token(payment_settings)
+        response = client.http.post(
+            f"{payment_settings.paypal_base_url}{path}",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json",
+            },
+            **kwargs,
         )
-        response.raise_for_status()
-        return response.json()["access_token"]
+        if response.status_code != 401 or attempt:
+            break
+        client.invalidate_token()
+    response.raise_for_status()
+    return response.json()
 
 
 def create_paypal_order(registration, payment_settings, request):
@@ -148,8 +437,6 @@ def create_paypal_order(registration, payment_settings, request):
         httpx.HTTPStatusError: On PayPal API failure.
         ValueError: If no approval link found in response.
     """
-    access_token = get_paypal_access_token(payment_settings)
-
     return_url = request.build_absolute_uri(
         reverse("events:paypal_return", args=[registration.pk])
     )
@@ -181,17 +468,7 @@ def create_paypal_order(registration, payment_settings, request):
         },
     }
 
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f"{payment_settings.paypal_base_url}/v2/checkout/orders",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-            },
-            json=order_body,
-        )
-        response.raise_for_status()
-        data = response.json()
+    data = _paypal_post(payment_settings, "/v2/checkout/orders", json=order_body)
 
     order_id = data["id"]
 
@@ -228,19 +505,9 @@ def capture_paypal_order(order_id, payment_settings):
     Raises:
         httpx.HTTPStatusError: On PayPal API failure.
     """
-    access_token = get_paypal_access_token(payment_settings)
-
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f"{payment_settings.paypal_base_url}/v2/checkout/orders/{order_id}/capture",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-            },
-            content=b"",
-        )
-        response.raise_for_status()
-        data = response.json()
+    data = _paypal_post(
+        payment_settings, f"/v2/checkout/orders/{order_id}/capture", content=b""
+    )
 
     capture_id = ""
     try:
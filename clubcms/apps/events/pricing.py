@@ -0,0 +1,209 @@
+"""
+Precomputed pricing schedules for events.
+
+A ``PricingSchedule`` is the immutable, time-independent part of an
+event's pricing: its ``PricingTier`` rows turned into absolute deadlines,
+sorted chronologically, plus the registration deadline they imply.  The
+page's own ``early_bird_discount``/``early_bird_deadline`` count as one
+more tier ending at that deadline.
+Schedules are built once per event and kept in the default Django
+cache, which is shared by all processes (see ``CACHES``); the active
+tier at any moment is then a ``bisect`` over the deadlines, with no
+database access.
+
+The cache entry is dropped when the event page is published or one of
+its tiers is saved or deleted (see ``apps.events.signals``), so every
+process sees the change on its next lookup.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class TierBoundary:
+    """One pricing tier, resolved to an absolute deadline."""
+
+    pk: int
+    label: str
+    discount_percent: int
+    is_deadline: bool
+    deadline: object  # aware datetime
+
+    def __str__(self):
+        return f"{self.label} ({self.discount_percent}%)"
+
+
+@dataclass(frozen=True)
+class PricingSchedule:
+    """Sorted tier boundaries for one event start date."""
+
+    event_id: int
+    start_date: object  # aware datetime or None
+    tiers: tuple = ()
+    registration_deadline: object = None
+
+    @property
+    def deadlines(self):
+        return [tier.deadline for tier in self.tiers]
+
+    def active_tier(self, now=None):
+        """
+        Return the tier in effect at *now*, or None.
+
+        The active tier is the one with the earliest deadline that has
+        not yet passed.
+        """
+        if now is None:
+            now = timezone.now()
+        index = bisect_left(self.deadlines, now)
+        if index < len(self.tiers):
+            return self.tiers[index]
+        return None
+
+
+def _cache_key(event_id):
+    return f"events_pricing_schedule_{event_id}"
+
+
+def _early_bird_boundary(event_page):
+    """The page's early-bird discount as a tier, or None if not set."""
+    discount = getattr(event_page, "early_bird_discount", 0)
+    deadline = getattr(event_page, "early_bird_deadline", None)
+    if not discount or not deadline:
+        return None
+    return TierBoundary(
+        pk=0,
+        label=_("Early bird"),
+        discount_percent=discount,
+        is_deadline=False,
+        deadline=deadline,
+    )
+
+
+def build_pricing_schedule(event_page, tiers=None):
+    """
+    Build a ``PricingSchedule`` from the event's ``PricingTier`` rows
+    and early-bird fields.
+
+    *tiers* may be passed when they were already fetched (see
+    ``prime_pricing_schedules``); otherwise they are queried.
+    """
+    early_bird = _early_bird_boundary(event_page)
+    start = event_page.start_date
+    if not start:
+        return PricingSchedule(
+            event_id=event_page.pk,
+            start_date=None,
+            tiers=(early_bird,) if early_bird else (),
+        )
+
+    if tiers is None:
+        tiers = event_page.pricing_tiers.all().order_by(
+            "-days_before", "-hours_before", "-minutes_before", "pk"
+        )
+
+    boundaries = []
+    for tier in tiers:
+        offset = timedelta(
+            days=tier.days_before,
+            hours=tier.hours_before,
+            minutes=tier.minutes_before,
+        )
+        boundaries.append(
+            TierBoundary(
+                pk=tier.pk,
+                label=tier.label,
+                discount_percent=tier.discount_percent,
+                is_deadline=tier.is_deadline,
+                deadline=start - offset,
+            )
+        )
+    if early_bird:
+        boundaries.append(early_bird)
+    # Earliest deadline (== longest offset) first, ties in creation order
+    boundaries.sort(key=lambda tier: (tier.deadline, tier.pk))
+
+    deadline = next((tier.deadline for tier in boundaries if tier.is_deadline), None)
+    return PricingSchedule(
+        event_id=event_page.pk,
+        start_date=start,
+        tiers=tuple(boundaries),
+        registration_deadline=deadline,
+    )
+
+
+def get_pricing_schedule(event_page):
+    """
+    Return the cached ``PricingSchedule`` for *event_page*.
+
+    The schedule is memoized on the page instance and shared across
+    requests through the Django cache.  A cached schedule computed for a
+    different start date (e.g. a draft being previewed) is rebuilt.
+    """
+    schedule = getattr(event_page, "_pricing_schedule", None)
+    if schedule is not None and schedule.start_date == event_page.start_date:
+        return schedule
+
+    key = _cache_key(event_page.pk)
+    schedule = cache.get(key)
+    if schedule is None or schedule.start_date != event_page.start_date:
+        schedule = build_pricing_schedule(event_page)
+        cache.set(key, schedule, SCHEDULE_CACHE_TIMEOUT)
+
+    event_page._pricing_schedule = schedule
+    return schedule
+
+
+def prime_pricing_schedules(event_pages):
+    """
+    Attach pricing schedules to many event pages at once.
+
+    Cached schedules are fetched with one ``get_many``; the tiers of all
+    remaining events are loaded with a single query.  Afterwards
+    ``get_pricing_schedule`` is free for every page in *event_pages*.
+    """
+    from apps.events.models import PricingTier
+
+    pending = [
+        page
+        for page in event_pages
+        if getattr(page, "_pricing_schedule", None) is None
+        or page._pricing_schedule.start_date != page.start_date
+    ]
+    if not pending:
+        return
+
+    cached = cache.get_many([_cache_key(page.pk) for page in pending])
+    missing = []
+    for page in pending:
+        schedule = cached.get(_cache_key(page.pk))
+        if schedule is not None and schedule.start_date == page.start_date:
+            page._pricing_schedule = schedule
+        else:
+            missing.append(page)
+    if not missing:
+        return
+
+    tiers_by_event = {page.pk: [] for page in missing}
+    for tier in PricingTier.objects.filter(event_page_id__in=tiers_by_event):
+        tiers_by_event[tier.event_page_id].append(tier)
+
+    fresh = {}
+    for page in missing:
+        schedule = build_pricing_schedule(page, tiers=tiers_by_event[page.pk])
+        page._pricing_schedule = schedule
+        fresh[_cache_key(page.pk)] = schedule
+    cache.set_many(fresh, SCHEDULE_CACHE_TIMEOUT)
+
+
+def invalidate_pricing_schedule(event_id):
+    """Drop the cached schedule of one event."""
+    cache.delete(_cache_key(event_id))
@@ -0,0 +1,328 @@
+"""
+Bank statement reconciliation for bank transfer payments.
+
+Statement files are streamed line by line (CSV via ``csv.reader``,
+CAMT.053 XML via ``iterparse``) into ``StatementLine`` records.  Payment
+references are pulled out of each line's remittance text with one
+compiled pattern, normalized (case, separators, typos, check
+character) and looked up in an in-memory index of all pending
+bank transfers, built with a single query.  Matches are marked paid
+with chunked ``UPDATE`` statements; unmatched, ambiguous and underpaid
+lines are reported for manual follow-up.
+
+Used by the ``reconcile_bank_statement`` management command and the
+"Bank reconciliation" admin view.
+"""
+
+import csv
+import io
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from apps.events.checkin import invalidate_checkin_caches
+from apps.events.models import EventRegistration
+from apps.events.payment import (
+    PAYMENT_REFERENCE_PATTERN,
+    notify_payment_confirmed,
+    reference_candidates,
+)
+
+logger = logging.getLogger(__name__)
+
+# Registrations marked paid per UPDATE
+RECONCILE_CHUNK_SIZE = 500
+
+# Header names recognised in CSV exports (lower case, any language we met)
+CSV_AMOUNT_COLUMNS = (
+    "amount", "importo", "betrag", "montant", "credit", "avere", "entrate",
+)
+CSV_TEXT_COLUMNS = (
+    "description", "causale", "descrizione", "remittance", "reference",
+    "riferimento", "verwendungszweck", "libelle", "details",
+)
+CSV_DATE_COLUMNS = (
+    "date", "data", "booking date", "data contabile", "data valuta", "datum",
+)
+
+
+@dataclass(frozen=True)
+class StatementLine:
+    """One credit line of a bank statement."""
+
+    number: int
+    amount: Decimal
+    text: str
+    booked_on: str = ""
+
+
+@dataclass
+class ReconciliationReport:
+    """Outcome of one reconciliation run."""
+
+    lines: int = 0
+    matched: list = field(default_factory=list)  # (line, registration pk)
+    unmatched: list = field(default_factory=list)  # line
+    ambiguous: list = field(default_factory=list)  # (line, reason)
+    underpaid: list = field(default_factory=list)  # (line, registration pk, due)
+    dry_run: bool = False
+
+
+# ---------------------------------------------------------------------------
+# 1. Statement parsers
+# ---------------------------------------------------------------------------
+
+
+def parse_amount(value):
+    """
+    Parse ``1.234,56`` / ``1,234.56`` / ``-12.50`` style amounts.
+
+    Returns None for empty or unparseable values.
+    """
+    value = (value or "").strip().replace("€", "").replace(" ", "")
+    if not value:
+        return None
+    # The last separator is the decimal one
+    if "," in value and value.rfind(",") > value.rfind("."):
+        value = value.replace(".", "").replace(",", ".")
+    else:
+        value = value.replace(",", "")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def _find_column(header, candidates):
+    for index, name in enumerate(header):
+        if name.strip().lower() in candidates:
+            return index
+    return None
+
+
+def iter_csv_statement(fileobj, encoding="utf-8-sig"):
+    """
+    Yield ``StatementLine`` records from a CSV statement (binary file).
+
+    The delimiter is sniffed and columns are located by header name.
+    Debit lines (negative amounts) are skipped.
+    """
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(text, dialect)
+    header = next(reader, [])
+    amount_col = _find_column(header, CSV_AMOUNT_COLUMNS)
+    text_col = _find_column(header, CSV_TEXT_COLUMNS)
+    date_col = _find_column(header, CSV_DATE_COLUMNS)
+    if amount_col is None or text_col is None:
+        raise ValueError(
+            "CSV statement needs an amount and a description column "
+            f"(found: {', '.join(header)})"
+        )
+
+    for number, row in enumerate(reader, start=2):
+        if len(row) <= max(amount_col, text_col):
+            continue
+        amount = parse_amount(row[amount_col])
+        if amount is None or amount <= 0:
+            continue
+        yield StatementLine(
+            number=number,
+            amount=amount,
+            text=row[text_col],
+            booked_on=(
+                row[date_col] if date_col is not None and date_col < len(row) else ""
+            ),
+        )
+    text.detach()
+
+
+def _local(tag):
+    """Strip the XML namespace from *tag*."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_camt053_statement(fileobj):
+    """
+    Yield ``StatementLine`` records from a CAMT.053 statement (binary file).
+
+    Parses with ``iterparse`` and clears every ``Ntry`` once read, so
+    memory stays flat for month-long statements.  Works with any
+    ``camt.053.001.xx`` namespace; only credit entries are returned.
+    """
+    number = 0
+    for _event, elem in ET.iterparse(fileobj, events=("end",)):
+        if _local(elem.tag) != "Ntry":
+            continue
+        number += 1
+        indicator = amount = booked_on = ""
+        texts = []
+        for child in elem.iter():
+            name = _local(child.tag)
+            value = (child.text or "").strip()
+            if name == "Amt" and not amount:
+                amount = value
+            elif name == "CdtDbtInd" and not indicator:
+                indicator = value
+            elif name in ("Dt", "DtTm") and not booked_on:
+                booked_on = value
+            elif name in ("Ustrd", "Ref", "AddtlNtryInf", "AddtlTxInf", "EndToEndId"):
+                if value:
+                    texts.append(value)
+        elem.clear()
+
+        parsed = parse_amount(amount)
+        if indicator != "CRDT" or parsed is None or parsed <= 0:
+            continue
+        yield StatementLine(
+            number=number,
+            amount=parsed,
+            text=" ".join(texts),
+            booked_on=booked_on,
+        )
+
+
+def iter_statement(fileobj, fmt="auto", encoding="utf-8-sig"):
+    """
+    Yield ``StatementLine`` records from a CSV or CAMT.053 file.
+
+    ``fmt="auto"`` picks CAMT.053 when the file starts with ``<``.
+    """
+    if fmt == "auto":
+        head = fileobj.read(512)
+        fileobj.seek(0)
+        is_xml = head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<")
+        fmt = "camt053" if is_xml else "csv"
+    if fmt == "camt053":
+        return iter_camt053_statement(fileobj)
+    return iter_csv_statement(fileobj, encoding=encoding)
+
+
+# ---------------------------------------------------------------------------
+# 2. Matching
+# ---------------------------------------------------------------------------
+
+
+def extract_references(text):
+    """
+    Return the canonical payment references *text* may contain.
+
+    Each match of ``PAYMENT_REFERENCE_PATTERN`` is normalized with
+    ``reference_candidates``; a reference with one pair of swapped
+    characters contributes its plausible corrections.
+    """
+    references = set()
+    for match in PAYMENT_REFERENCE_PATTERN.finditer(text or ""):
+        references.update(reference_candidates(match.group(0)))
+    return references
+
+
+def build_pending_index():
+    """
+    Map each pending bank transfer reference to its registrations.
+
+    One query; a reference shared by several registrations maps to all
+    of them and is reported as ambiguous.
+    """
+    index = {}
+    rows = (
+        EventRegistration.objects.filter(
+            payment_provider="bank_transfer",
+            payment_status="pending",
+        )
+        .exclude(payment_reference="")
+        .values_list("pk", "payment_reference", "payment_amount")
+    )
+    for pk, reference, amount in rows.iterator(chunk_size=2000):
+        index.setdefault(reference.upper(), []).append((pk, amount))
+    return index
+
+
+def reconcile(lines, dry_run=False):
+    """
+    Match statement *lines* against pending bank transfers.
+
+    A line is matched when it carries exactly one known reference, that
+    reference belongs to exactly one pending registration not claimed
+    by an earlier line, and the amount covers what is due.  Matches are
+    marked paid in chunks of ``RECONCILE_CHUNK_SIZE`` (unless *dry_run*)
+    and announced with ``payment_confirmed`` notifications.
+
+    Returns:
+        ReconciliationReport
+    """
+    report = ReconciliationReport(dry_run=dry_run)
+    index = build_pending_index()
+    claimed = {}
+
+    for line in lines:
+        report.lines += 1
+        known = [ref for ref in extract_references(line.text) if ref in index]
+        if not known:
+            report.unmatched.append(line)
+            continue
+        if len(known) > 1:
+            report.ambiguous.append(
+                (line, f"Several references: {', '.join(sorted(known))}")
+            )
+            continue
+        candidates = index[known[0]]
+        if len(candidates) > 1:
+            report.ambiguous.append(
+                (line, f"{known[0]} matches {len(candidates)} registrations")
+            )
+            continue
+        pk, due = candidates[0]
+        if pk in claimed:
+            report.ambiguous.append(
+                (line, f"{known[0]} already paid by line {claimed[pk].number}")
+            )
+            continue
+        if line.amount < due:
+            report.underpaid.append((line, pk, due))
+            continue
+        claimed[pk] = line
+        report.matched.append((line, pk))
+
+    if not dry_run and report.matched:
+        mark_paid([pk for _line, pk in report.matched])
+    return report
+
+
+def mark_paid(registration_ids, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Mark pending bank transfers paid with one ``UPDATE`` per chunk and
+    queue their payment confirmations.
+
+    Returns:
+        int: Number of registrations updated.
+    """
+    updated = 0
+    for start in range(0, len(registration_ids), chunk_size):
+        chunk = registration_ids[start:start + chunk_size]
+        with transaction.atomic():
+            registrations = list(
+                EventRegistration.objects.select_for_update(of=("self",))
+                .filter(pk__in=chunk, payment_status="pending")
+                .select_related("event", "user")
+            )
+            EventRegistration.objects.filter(
+                pk__in=[reg.pk for reg in registrations]
+            ).update(payment_status="paid", payment_expires_at=None)
+        # .update() bypasses post_save: refresh the check-in caches here
+        invalidate_checkin_caches(reg.event_id for reg in registrations)
+        notify_payment_confirmed(registrations)
+        updated += len(registrations)
+        logger.info(
+            "Reconciled %d/%d bank transfer(s).", updated, len(registration_ids)
+        )
+    return updated
@@ -3,24 +3,78 @@ Signals for the events app.
 
 Sends notifications when event registrations are created.
 Uses the notification queue for authenticated users and direct
-email for guest registrations.
+email for guest registrations.  Also keeps the denormalized
+EventCapacity counters in step with registration changes and drops
+cached pricing schedules, ICS fragments and check-in data when an
+event, its tiers or its registrations change.
 """
 
 import logging
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils.translation import gettext_lazy as _
+from wagtail.signals import page_published
 
-from apps.events.models import EventRegistration
+from apps.events.capacity import sync_registration_capacity
+from apps.events.checkin import invalidate_roster_snapshot
+from apps.events.exports import invalidate_checkin_sheet
+from apps.events.models import EventCapacity, EventRegistration, PricingTier
+from apps.events.pricing import invalidate_pricing_schedule
+from apps.events.utils import invalidate_vevent
 
 logger = logging.getLogger(__name__)
 
 
+@receiver(post_save, sender=EventRegistration)
+def update_capacity_on_save(sender, instance, raw=False, **kwargs):
+    """Apply the registration's status change to its EventCapacity row."""
+    if raw:
+        return
+    sync_registration_capacity(instance)
+
+
+@receiver(post_save, sender=EventRegistration)
+@receiver(post_delete, sender=EventRegistration)
+def invalidate_checkin_on_change(sender, instance, **kwargs):
+    """Drop the check-in sheet and roster snapshot of the registration's event."""
+    invalidate_checkin_sheet(instance.event_id)
+    invalidate_roster_snapshot(instance.event_id)
+
+
+@receiver(post_save, sender="website.EventDetailPage")
+def create_capacity_for_event(sender, instance, created, raw=False, **kwargs):
+    """Create the (empty) EventCapacity row alongside a new event page."""
+    if created and not raw:
+        EventCapacity.objects.get_or_create(event_id=instance.pk)
+
+
+@receiver(post_delete, sender=EventRegistration)
+def update_capacity_on_delete(sender, instance, **kwargs):
+    """Release the counters held by a deleted registration."""
+    sync_registration_capacity(instance, deleted=True)
+
+
+@receiver(page_published)
+def invalidate_event_caches_on_publish(sender, instance, **kwargs):
+    """Drop the cached pricing schedule and ICS fragment of a published event."""
+    if hasattr(instance, "pricing_tiers"):
+        invalidate_pricing_schedule(instance.pk)
+        invalidate_vevent(instance.pk)
+
+
+@receiver(post_save, sender=PricingTier)
+@receiver(post_delete, sender=PricingTier)
+def invalidate_pricing_on_tier_change(sender, instance, raw=False, **kwargs):
+    """Drop the cached pricing schedule when a tier is edited outside publishing."""
+    if not raw:
+        invalidate_pricing_schedule(instance.event_page_id)
+
+
 @receiver(post_save, sender=EventRegistration)
 def on_registration_created(sender, instance, created, **kwargs):
     """Send a confirmation notification when a new registration is created."""
@@ -7,19 +7,29 @@ and waitlist promotion.
 
 import logging
 
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from apps.events.capacity import apply_bulk_status
 from apps.events.models import EventRegistration
-from apps.events.utils import promote_from_waitlist
+from apps.events.utils import promote_waitlist
 
 logger = logging.getLogger(__name__)
 
+# Registrations expired per transaction
+EXPIRY_CHUNK_SIZE = 1000
 
-def expire_pending_bank_transfers():
+
+def expire_pending_bank_transfers(chunk_size=EXPIRY_CHUNK_SIZE):
     """
     Mark expired bank transfer registrations and promote from waitlist.
 
+    Works on bounded chunks: each chunk is locked, expired with a single
+    ``UPDATE``, reflected in the capacity counters per event and
+    announced with one ``bulk_create`` of notifications.  Freed seats
+    are filled with one bulk waitlist promotion once all chunks are done.
+
     Should be called periodically (e.g. every hour via cron or Celery beat).
     """
     now = timezone.now()
@@ -27,43 +37,62 @@ def expire_pending_bank_transfers():
         payment_provider="bank_transfer",
         payment_status="pending",
         payment_expires_at__lt=now,
-    ).select_related("event", "user")
+    ).order_by("pk")
+
+    total = expired_qs.count()
+    if not total:
+        return 0
 
     count = 0
-    for reg in expired_qs:
-        reg.payment_status = "expired"
-        reg.status = "cancelled"
-        reg.save(update_fields=["payment_status", "status"])
-
-        promote_from_waitlist(reg.event)
-
-        # Send expiration notification
-        if reg.user:
-            try:
-                from apps.notifications.services import create_notification
-
-                create_notification(
-                    notification_type="payment_expired",
-                    title=str(_("Payment expired: {event}")).format(
-                        event=reg.event.title,
-                    ),
-                    body=str(
-                        _("Your bank transfer for {event} was not received in time. "
-                          "Your registration has been cancelled.")
-                    ).format(event=reg.event.title),
-                    recipients=[reg.user],
-                    channels=["email"],
-                    content_object=reg,
-                )
-            except Exception:
-                logger.exception(
-                    "Failed to send expiry notification for registration %s",
-                    reg.pk,
-                )
-
-        count += 1
-
-    if count:
-        logger.info("Expired %d pending bank transfer registration(s).", count)
+    freed_event_ids = set()
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                expired_qs.select_for_update(of=("self",))
+                .select_related("event", "user")[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            EventRegistration.objects.filter(pk__in=[reg.pk for reg in chunk]).update(
+                payment_status="expired",
+                status="cancelled",
+            )
+            for reg in chunk:
+                reg.payment_status = "expired"
+            deltas = apply_bulk_status(chunk, "cancelled")
+
+        freed_event_ids.update(
+            event_id for event_id, d in deltas.items() if d["confirmed_count"] < 0
+        )
+        _notify_expired(chunk)
+
+        count += len(chunk)
+        logger.info(
+            "Expired %d/%d pending bank transfer registration(s).", count, total
+        )
+        if len(chunk) < chunk_size:
+            break
+
+    # Fill all freed seats in one pass per run
+    if freed_event_ids:
+        from apps.website.models.pages import EventDetailPage
+
+        promote_waitlist(EventDetailPage.objects.filter(pk__in=freed_event_ids))
 
     return count
+
+
+def _notify_expired(registrations):
+    """Queue ``payment_expired`` notifications with one bulk insert."""
+    from apps.notifications.services import notify_registrants
+
+    notify_registrants(
+        registrations,
+        "payment_expired",
+        title=_("Payment expired: {event}"),
+        body=_("Your bank transfer for {event} was not received in time. "
+               "Your registration has been cancelled."),
+        channels=["email"],
+        batch_size=500,
+    )
@@ -0,0 +1,191 @@
+"""
+Unit tests for apps/events/capacity.py
+
+Tests that EventCapacity counters follow registration changes and
+that the rebuild command reconciles drifted counters.
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.events.capacity import get_capacity, rebuild_capacity
+from apps.events.models import EventCapacity, EventRegistration
+
+User = get_user_model()
+
+
+def _create_event_page(**kwargs):
+    """Create a minimal EventDetailPage for testing."""
+    import uuid
+
+    from wagtail.models import Page
+
+    from apps.website.models.pages import EventDetailPage
+
+    defaults = {
+        "title": "Capacity Event",
+        "slug": f"capacity-event-{uuid.uuid4().hex[:8]}",
+        "start_date": timezone.now() + timedelta(days=30),
+        "max_attendees": 10,
+    }
+    defaults.update(kwargs)
+
+    root = Page.objects.first()
+    event = EventDetailPage(**defaults)
+    root.add_child(instance=event)
+    return event
+
+
+def _register(event, **kwargs):
+    with patch("apps.notifications.services.create_notification"):
+        return EventRegistration.objects.create(
+            event=event,
+            email="rider@example.com",
+            **kwargs,
+        )
+
+
+def _counters(event):
+    capacity = EventCapacity.objects.get(event_id=event.pk)
+    return (
+        capacity.confirmed_count,
+        capacity.waitlist_count,
+        capacity.passenger_count,
+    )
+
+
+@pytest.mark.django_db
+class TestCapacityCounters:
+    """Counters are adjusted on every registration change."""
+
+    def test_row_created_with_event(self):
+        event = _create_event_page()
+        assert _counters(event) == (0, 0, 0)
+
+    def test_new_registrations_counted(self):
+        event = _create_event_page()
+        _register(event, status="registered", has_passenger=True)
+        _register(event, status="confirmed")
+        _register(event, status="waitlist", has_passenger=True)
+
+        assert _counters(event) == (2, 1, 1)
+
+    def test_cancellation_releases_seat(self):
+        event = _create_event_page()
+        reg = _register(event, status="registered", has_passenger=True)
+
+        reg.status = "cancelled"
+        reg.save(update_fields=["status"])
+
+        assert _counters(event) == (0, 0, 0)
+
+    def test_status_change_on_reloaded_instance(self):
+        event = _create_event_page()
+        reg = _register(event, status="waitlist")
+
+        reloaded = EventRegistration.objects.get(pk=reg.pk)
+        reloaded.status = "registered"
+        reloaded.save()
+
+        assert _counters(event) == (1, 0, 0)
+
+    def test_save_without_change_is_noop(self):
+        event = _create_event_page()
+        reg = _register(event, status="registered")
+
+        reg.notes = "Bringing spare tyres"
+        reg.save()
+
+        assert _counters(event) == (1, 0, 0)
+
+    def test_delete_releases_seat(self):
+        event = _create_event_page()
+        reg = _register(event, status="registered")
+
+        reg.delete()
+
+        assert _counters(event) == (0, 0, 0)
+
+    def test_moving_registration_between_events(self):
+        first = _create_event_page()
+        second = _create_event_page()
+        reg = _register(first, status="registered")
+
+        reg.event = second
+        reg.save()
+
+        assert _counters(first) == (0, 0, 0)
+        assert _counters(second) == (1, 0, 0)
+
+    def test_deferred_instance_falls_back_to_rebuild(self):
+        event = _create_event_page()
+        reg = _register(event, status="registered")
+
+        deferred = EventRegistration.objects.only("pk", "notes").get(pk=reg.pk)
+        deferred.notes = "updated"
+        deferred.save(update_fields=["notes"])
+
+        assert _counters(event) == (1, 0, 0)
+
+
+@pytest.mark.django_db
+class TestCapacityReads:
+    """Pages read counters without counting registrations."""
+
+    def test_confirmed_count_reads_capacity_row(self, django_assert_num_queries):
+        from apps.website.models.pages import EventDetailPage
+
+        event = _create_event_page()
+        _register(event, status="registered")
+        _register(event, status="waitlist")
+
+        page = EventDetailPage.objects.select_related("capacity").get(pk=event.pk)
+        with django_assert_num_queries(0):
+            assert page.confirmed_count == 1
+            assert page.waitlist_count == 1
+            assert page.spots_remaining == 9
+
+    def test_missing_row_is_rebuilt_on_read(self):
+        event = _create_event_page()
+        _register(event, status="registered")
+        EventCapacity.objects.filter(event_id=event.pk).delete()
+
+        capacity = get_capacity(event)
+
+        assert capacity.confirmed_count == 1
+        assert EventCapacity.objects.filter(event_id=event.pk).exists()
+
+
+@pytest.mark.django_db
+class TestRebuildCapacity:
+    """rebuild_capacity and the management command reconcile counters."""
+
+    def test_rebuild_fixes_drift(self):
+        event = _create_event_page()
+        _register(event, status="registered", has_passenger=True)
+        EventCapacity.objects.filter(event_id=event.pk).update(
+            confirmed_count=7, waitlist_count=3, passenger_count=0
+        )
+
+        rows = rebuild_capacity([event.pk])
+
+        assert rows[0].event_id == event.pk
+        assert _counters(event) == (1, 0, 1)
+
+    def test_command_reports_drift(self):
+        event = _create_event_page()
+        _register(event, status="registered")
+        EventCapacity.objects.filter(event_id=event.pk).update(confirmed_count=5)
+
+        out = StringIO()
+        call_command("rebuild_event_capacity", f"--event={event.pk}", stdout=out)
+
+        assert "confirmed_count 5 -> 1" in out.getvalue()
+        assert "1 had drifted" in out.getvalue()
+        assert _counters(event) == (1, 0, 0)
@@ -0,0 +1,252 @@
+"""
+Tests for apps/events/checkin.py
+
+Tests signed tickets, the offline roster snapshot and the bulk sync of
+scanned check-ins.
+"""
+
+import json
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.events import checkin
+from apps.events.models import EventRegistration
+from apps.events.tests.test_capacity import _create_event_page, _register
+
+
+def _sync(client, event, *scans):
+    return client.post(
+        reverse("events:checkin_sync", args=[event.pk]),
+        data=json.dumps({"checkins": list(scans)}),
+        content_type="application/json",
+    )
+
+
+@pytest.mark.django_db
+class TestTickets:
+    """Tickets are signed per registration and event."""
+
+    def test_roundtrip(self):
+        registration = _register(_create_event_page(), status="confirmed")
+
+        ticket = checkin.make_ticket(registration)
+
+        assert ticket.startswith(f"CHK-{registration.pk}-")
+        assert checkin.parse_ticket(ticket.lower())[0] == registration.pk
+
+    def test_signature_bound_to_event(self):
+        registration = _register(_create_event_page(), status="confirmed")
+        ticket = checkin.make_ticket(registration)
+
+        registration.event_id = _create_event_page().pk
+
+        assert checkin.make_ticket(registration) != ticket
+
+    def test_survives_payment_reference_change(self):
+        registration = _register(_create_event_page(), status="confirmed")
+        ticket = checkin.make_ticket(registration)
+
+        registration.payment_reference = "MC-NEWREF"
+        registration.save()
+
+        assert checkin.make_ticket(EventRegistration.objects.get()) == ticket
+
+    def test_malformed(self):
+        assert checkin.parse_ticket("EVT-00042-A7B3") is None
+        assert checkin.parse_ticket("CHK-abc-123") is None
+
+
+@pytest.mark.django_db
+class TestRosterSnapshot:
+    """Snapshots index active riders by ticket digest."""
+
+    def test_indexed_by_digest(self):
+        event = _create_event_page()
+        registration = _register(
+            event, first_name="Anna", last_name="Rossi", status="confirmed",
+            payment_status="paid",
+        )
+        _register(event, status="cancelled")
+
+        snapshot = checkin.get_roster_snapshot(event)
+
+        digest = checkin.ticket_digest(checkin.make_ticket(registration))
+        assert snapshot["tickets"] == {
+            digest: [registration.pk, "Rossi Anna", 0, 0, 1, 0]
+        }
+        assert checkin.make_ticket(registration) not in json.dumps(snapshot)
+
+    def test_bulk_paths_refresh_snapshot(self):
+        from apps.events.capacity import apply_bulk_status
+
+        event = _create_event_page()
+        registration = _register(event, status="confirmed")
+        assert checkin.get_roster_snapshot(event)["tickets"]
+
+        cancelled = EventRegistration.objects.filter(pk=registration.pk)
+        cancelled.update(status="cancelled")
+        apply_bulk_status(list(cancelled), "cancelled")
+
+        assert checkin.get_roster_snapshot(event)["tickets"] == {}
+
+    def test_roster_view_revalidates_with_etag(self, client, staff_user):
+        event = _create_event_page()
+        _register(event, status="confirmed")
+        client.force_login(staff_user)
+        url = reverse("events:checkin_roster", args=[event.pk])
+
+        first = client.get(url)
+        second = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+
+    def test_new_registration_changes_version(self):
+        event = _create_event_page()
+        _register(event, status="confirmed")
+        version = checkin.get_roster_snapshot(event)["version"]
+
+        _register(event, status="confirmed")
+
+        assert checkin.get_roster_snapshot(event)["version"] != version
+
+    def test_staff_only(self, client, active_member):
+        event = _create_event_page()
+        client.force_login(active_member)
+
+        response = client.get(reverse("events:checkin_roster", args=[event.pk]))
+
+        assert response.status_code == 302
+
+
+@pytest.mark.django_db
+class TestBulkSync:
+    """Scans are verified and written in one batch."""
+
+    def test_accepts_valid_scans(
+        self, client, staff_user, django_capture_on_commit_callbacks
+    ):
+        event = _create_event_page()
+        first = _register(event, status="confirmed")
+        second = _register(event, status="registered")
+        checkin.get_roster_snapshot(event)
+        client.force_login(staff_user)
+        scanned_at = timezone.now() - timedelta(minutes=5)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = _sync(
+                client, event,
+                {"ticket": checkin.make_ticket(first), "at": scanned_at.isoformat()},
+                {"ticket": checkin.make_ticket(second)},
+            )
+
+        assert sorted(response.json()["accepted"]) == [first.pk, second.pk]
+        first.refresh_from_db()
+        assert first.checked_in_at == scanned_at
+        snapshot = checkin.get_roster_snapshot(event)
+        assert all(entry[5] == 1 for entry in snapshot["tickets"].values())
+
+    def test_resync_reports_duplicates(self, client, staff_user):
+        event = _create_event_page()
+        registration = _register(event, status="confirmed")
+        client.force_login(staff_user)
+        scan = {"ticket": checkin.make_ticket(registration)}
+        _sync(client, event, scan)
+
+        result = _sync(client, event, scan).json()
+
+        assert result["accepted"] == []
+        assert [d["pk"] for d in result["duplicates"]] == [registration.pk]
+
+    def test_rejects_forged_and_foreign_tickets(self, client, staff_user):
+        event = _create_event_page()
+        other = _register(_create_event_page(), status="confirmed")
+        registration = _register(event, status="confirmed")
+        cancelled = _register(event, status="cancelled")
+        client.force_login(staff_user)
+        forged = f"CHK-{registration.pk}-0000000000000000"
+
+        result = _sync(
+            client, event,
+            {"ticket": forged},
+            {"ticket": checkin.make_ticket(other)},
+            {"ticket": checkin.make_ticket(cancelled)},
+            {"ticket": "garbage"},
+        ).json()
+
+        assert result["accepted"] == []
+        assert len(result["rejected"]) == 4
+        assert not EventRegistration.objects.filter(
+            checked_in_at__isnull=False
+        ).exists()
+
+    def test_query_count_independent_of_batch_size(
+        self, staff_user, django_assert_num_queries
+    ):
+        event = _create_event_page(max_attendees=0)
+        scans = [
+            {"ticket": checkin.make_ticket(_register(event, status="confirmed"))}
+            for _ in range(6)
+        ]
+
+        # savepoint + locked select + bulk update + release
+        with django_assert_num_queries(4):
+            result = checkin.apply_checkins(event, scans)
+
+        assert len(result["accepted"]) == 6
+
+    def test_bad_payload(self, client, staff_user):
+        event = _create_event_page()
+        client.force_login(staff_user)
+
+        response = client.post(
+            reverse("events:checkin_sync", args=[event.pk]),
+            data="not json",
+            content_type="application/json",
+        )
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestTicketQr:
+    """Riders download the QR of their own active registrations."""
+
+    def test_own_ticket(self, client, active_member):
+        registration = _register(
+            _create_event_page(), user=active_member, status="confirmed"
+        )
+        client.force_login(active_member)
+
+        response = client.get(reverse("events:ticket_qr", args=[registration.pk]))
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "image/png"
+
+    def test_other_users_ticket(self, client, active_member, user_factory):
+        registration = _register(
+            _create_event_page(), user=user_factory(), status="confirmed"
+        )
+        client.force_login(active_member)
+
+        response = client.get(reverse("events:ticket_qr", args=[registration.pk]))
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestScannerPage:
+    """The scanner page embeds roster and sync endpoints."""
+
+    def test_renders(self, client, staff_user):
+        event = _create_event_page()
+        client.force_login(staff_user)
+
+        response = client.get(reverse("events:checkin_scanner", args=[event.pk]))
+
+        body = response.content.decode()
+        assert reverse("events:checkin_roster", args=[event.pk]) in body
+        assert reverse("events:checkin_sync", args=[event.pk]) in body
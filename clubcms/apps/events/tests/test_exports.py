@@ -0,0 +1,181 @@
+"""
+Tests for apps/events/exports.py
+
+Tests the streamed CSV/XLSX rosters, the staff-only export views, the
+cached check-in sheet and the export_registrations command.
+"""
+
+import io
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.events import exports
+from apps.events.tests.test_capacity import _create_event_page, _register
+
+
+def _roster_event():
+    event = _create_event_page(title="Roster Ride", max_attendees=0)
+    _register(event, first_name="Anna", last_name="Rossi", status="confirmed")
+    _register(event, first_name="Bruno", last_name="Bianchi", status="registered")
+    _register(event, first_name="Carla", last_name="Verdi", status="waitlist")
+    _register(event, first_name="Dario", last_name="Neri", status="cancelled")
+    return event
+
+
+@pytest.mark.django_db
+class TestRosterCsv:
+    """CSV rosters stream active registrations in sign-up order."""
+
+    def test_rows_and_header(self):
+        event = _roster_event()
+
+        lines = list(exports.iter_roster_csv(event))
+
+        assert lines[0].startswith("\ufeffID,")
+        assert lines[0].count(",") == len(exports.ROSTER_COLUMNS) - 1
+        assert len(lines) == 3
+        assert "Anna,Rossi" in lines[1]
+        assert "Bruno,Bianchi" in lines[2]
+
+    def test_include_waitlist(self):
+        event = _roster_event()
+
+        body = "".join(exports.iter_roster_csv(event, include_waitlist=True))
+
+        assert "Carla,Verdi" in body
+        assert "Neri" not in body
+
+    def test_query_count_independent_of_roster_size(
+        self, user_factory, django_assert_max_num_queries
+    ):
+        event = _create_event_page(max_attendees=0)
+        for _ in range(5):
+            _register(event, user=user_factory(), status="confirmed")
+
+        # Users come with the registrations: no per-row query
+        with django_assert_max_num_queries(2):
+            rows = list(exports.iter_roster_rows(event, chunk_size=2))
+
+        assert len(rows) == 5
+
+
+@pytest.mark.django_db
+class TestExportViews:
+    """Export views are staff only and stream their output."""
+
+    def test_anonymous_redirected(self, client):
+        event = _roster_event()
+
+        response = client.get(reverse("events:export_registrations", args=[event.pk]))
+
+        assert response.status_code == 302
+
+    def test_csv_streamed(self, client, staff_user):
+        event = _roster_event()
+        client.force_login(staff_user)
+
+        response = client.get(reverse("events:export_registrations", args=[event.pk]))
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/csv")
+        assert f'filename="roster-{event.slug}.csv"' in response["Content-Disposition"]
+        assert "Anna,Rossi" in b"".join(response.streaming_content).decode()
+
+    def test_xlsx(self, client, staff_user):
+        openpyxl = pytest.importorskip("openpyxl")
+        event = _roster_event()
+        client.force_login(staff_user)
+
+        response = client.get(
+            reverse("events:export_registrations", args=[event.pk]),
+            {"format": "xlsx", "waitlist": "1"},
+        )
+
+        workbook = openpyxl.load_workbook(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+        rows = list(workbook.active.values)
+        assert rows[0][0] == "ID"
+        assert [row[4] for row in rows[1:]] == ["Rossi", "Bianchi", "Verdi"]
+
+
+@pytest.mark.django_db
+class TestCheckinSheet:
+    """The check-in sheet is rendered once and refreshed on change."""
+
+    def test_lists_active_riders(self, client, staff_user):
+        event = _roster_event()
+        client.force_login(staff_user)
+
+        response = client.get(reverse("events:checkin_sheet", args=[event.pk]))
+
+        body = response.content.decode()
+        assert "Rossi Anna" in body
+        assert "Bianchi Bruno" in body
+        assert "Verdi" not in body
+
+    def test_cached_until_registration_changes(self, django_assert_num_queries):
+        event = _roster_event()
+        exports.render_checkin_sheet(event)
+
+        with django_assert_num_queries(0):
+            exports.render_checkin_sheet(event)
+
+        _register(event, first_name="Elena", last_name="Gialli", status="confirmed")
+
+        assert "Gialli Elena" in exports.render_checkin_sheet(event)
+
+    def test_bulk_status_change_refreshes(self):
+        from apps.events.capacity import apply_bulk_status
+        from apps.events.models import EventRegistration
+
+        event = _roster_event()
+        exports.render_checkin_sheet(event)
+
+        rossi = EventRegistration.objects.filter(event=event, last_name="Rossi")
+        rossi.update(status="cancelled")
+        apply_bulk_status(list(rossi), "cancelled")
+
+        assert "Rossi Anna" not in exports.render_checkin_sheet(event)
+
+    def test_bank_reconciliation_refreshes(self):
+        from apps.events.models import EventRegistration
+        from apps.events.reconciliation import mark_paid
+
+        event = _roster_event()
+        rossi = EventRegistration.objects.get(event=event, last_name="Rossi")
+        EventRegistration.objects.filter(pk=rossi.pk).update(payment_status="pending")
+        before = exports.render_checkin_sheet(event)
+
+        mark_paid([rossi.pk])
+
+        assert exports.render_checkin_sheet(event) != before
+
+
+@pytest.mark.django_db
+class TestExportCommand:
+    """export_registrations writes CSV to stdout or XLSX to a file."""
+
+    def test_csv_to_stdout(self):
+        event = _roster_event()
+        out = StringIO()
+
+        call_command("export_registrations", event=event.pk, stdout=out)
+
+        assert "Anna,Rossi" in out.getvalue()
+
+    def test_xlsx_to_file(self, tmp_path):
+        openpyxl = pytest.importorskip("openpyxl")
+        event = _roster_event()
+        path = tmp_path / "roster.xlsx"
+
+        call_command(
+            "export_registrations", event=event.pk, format="xlsx",
+            output=str(path), stderr=StringIO(),
+        )
+
+        assert openpyxl.load_workbook(path).active.max_row == 3
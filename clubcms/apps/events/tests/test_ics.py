@@ -0,0 +1,142 @@
+"""
+Tests for the streaming ICS feeds in apps/events/views.py
+
+Tests fragment caching, conditional (304) responses and the public
+club calendar.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.events import utils
+from apps.events.models import EventFavorite
+from apps.events.tests.test_capacity import _create_event_page
+from apps.events.views import _generate_user_token
+
+User = get_user_model()
+
+
+def _published_event(**kwargs):
+    event = _create_event_page(**kwargs)
+    event.save_revision().publish()
+    event.refresh_from_db()
+    return event
+
+
+def _body(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestClubFeed:
+    """The public calendar streams all live events."""
+
+    def test_streams_live_events(self, client):
+        event = _published_event(title="Spring Ride")
+
+        response = client.get(reverse("events:club_ics"))
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/calendar")
+        body = _body(response)
+        assert "SUMMARY:Spring Ride" in body
+        assert f"UID:event-{event.pk}@clubcms" in body
+        assert body.endswith("END:VCALENDAR\r\n")
+
+    def test_unchanged_feed_returns_304(self, client):
+        _published_event()
+        first = client.get(reverse("events:club_ics"))
+        _body(first)
+
+        second = client.get(
+            reverse("events:club_ics"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+
+        assert second.status_code == 304
+
+    def test_removed_event_changes_etag(self, client):
+        _published_event(title="Kept")
+        removed = _published_event(title="Removed")
+        first = client.get(reverse("events:club_ics"))
+        _body(first)
+
+        removed.unpublish()
+
+        second = client.get(
+            reverse("events:club_ics"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        assert second.status_code == 200
+        assert "SUMMARY:Removed" not in _body(second)
+        assert not second.has_header("Last-Modified")
+
+    def test_republish_changes_etag_and_content(self, client):
+        event = _published_event(title="Old Title")
+        first = client.get(reverse("events:club_ics"))
+        _body(first)
+
+        event.title = "New Title"
+        event.save_revision().publish()
+
+        second = client.get(
+            reverse("events:club_ics"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        assert second.status_code == 200
+        assert "SUMMARY:New Title" in _body(second)
+
+    def test_fragments_served_from_cache(self, client):
+        _published_event()
+        _published_event()
+        _body(client.get(reverse("events:club_ics")))
+
+        with patch.object(utils, "render_vevent", wraps=utils.render_vevent) as render:
+            body = _body(client.get(reverse("events:club_ics")))
+
+        render.assert_not_called()
+        assert body.count("BEGIN:VEVENT") == 2
+
+
+@pytest.mark.django_db
+class TestMemberFeeds:
+    """Favorites and single-event exports share the streaming writer."""
+
+    def test_favorites_feed_with_token(self, client):
+        user = User.objects.create_user(username="ics_user", password="testpass123456")
+        event = _published_event(title="Favorite Ride")
+        EventFavorite.objects.create(user=user, event=event)
+
+        response = client.get(
+            reverse("events:my_events_ics"),
+            {"uid": user.pk, "token": _generate_user_token(user)},
+        )
+
+        body = _body(response)
+        assert "X-WR-CALNAME:My Favorite Events" in body
+        assert "SUMMARY:Favorite Ride" in body
+
+    def test_favorites_etag_differs_per_user(self, client):
+        event = _published_event()
+        etags = set()
+        for name in ("ics_a", "ics_b"):
+            user = User.objects.create_user(username=name, password="testpass123456")
+            EventFavorite.objects.create(user=user, event=event)
+            response = client.get(
+                reverse("events:my_events_ics"),
+                {"uid": user.pk, "token": _generate_user_token(user)},
+            )
+            etags.add(response["ETag"])
+
+        assert len(etags) == 2
+
+    def test_single_event_download(self, client):
+        event = _published_event()
+
+        response = client.get(reverse("events:event_ics", args=[event.pk]))
+
+        assert response["Content-Disposition"] == (
+            f'attachment; filename="event-{event.pk}.ics"'
+        )
+        assert "PRODID:-//ClubCMS//Event//EN" in _body(response)
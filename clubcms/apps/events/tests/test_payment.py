@@ -12,7 +12,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from apps.events.payment import generate_payment_reference
+from apps.events.payment import CROCKFORD_ALPHABET, generate_payment_reference
 
 
 # ---------------------------------------------------------------------------
@@ -81,14 +81,14 @@ class TestGeneratePaymentReference:
     """Tests for generate_payment_reference function."""
 
     def test_format_matches_pattern(self):
-        """Reference matches EVT-XXXXX-XXXX format."""
+        """Reference matches EVT-XXXXX-XXXXXXX format."""
         reg = SimpleNamespace(pk=1, event_id=42)
         ref = generate_payment_reference(reg)
         assert ref.startswith("EVT-")
         parts = ref.split("-")
         assert len(parts) == 3
         assert len(parts[1]) == 5  # zero-padded event_id
-        assert len(parts[2]) == 4  # hash part
+        assert len(parts[2]) == 7  # code + check character
 
     def test_deterministic(self):
         """Same registration produces same reference."""
@@ -101,12 +101,16 @@ class TestGeneratePaymentReference:
         reg2 = SimpleNamespace(pk=2, event_id=42)
         assert generate_payment_reference(reg1) != generate_payment_reference(reg2)
 
-    def test_hash_part_is_uppercase(self):
-        """Hash portion of the reference is uppercase hex."""
+    def test_code_is_crockford_base32(self):
+        """Code uses the Crockford alphabet (no I, L, O, U)."""
         reg = SimpleNamespace(pk=99, event_id=7)
-        ref = generate_payment_reference(reg)
-        hash_part = ref.split("-")[2]
-        assert hash_part == hash_part.upper()
+        code = generate_payment_reference(reg).split("-")[2]
+        assert set(code) <= set(CROCKFORD_ALPHABET)
+
+    def test_attempt_changes_code(self):
+        """Retries after a collision produce a different reference."""
+        reg = SimpleNamespace(pk=1, event_id=42)
+        assert generate_payment_reference(reg, 1) != generate_payment_reference(reg)
 
     def test_event_id_zero_padded(self):
         """Event ID is zero-padded to 5 digits."""
@@ -301,7 +301,12 @@ class TestStripeWebhookView:
 
     @patch("apps.events.views.stripe_lib.Webhook.construct_event")
     def test_valid_webhook_updates_payment(
-        self, mock_construct, client, payment_settings
+        self,
+        mock_construct,
+        client,
+        payment_settings,
+        task_worker,
+        django_capture_on_commit_callbacks,
     ):
         """Valid webhook with checkout.session.completed marks registration paid."""
         user = User.objects.create_user(
@@ -319,6 +324,7 @@ class TestStripeWebhookView:
             )
 
         mock_construct.return_value = {
+            "id": "evt_test_webhook",
             "type": "checkout.session.completed",
             "data": {
                 "object": {
@@ -329,12 +335,13 @@ class TestStripeWebhookView:
         }
 
         url = reverse("events:stripe_webhook")
-        response = client.post(
-            url,
-            data=json.dumps({"fake": "payload"}),
-            content_type="application/json",
-            HTTP_STRIPE_SIGNATURE="test_sig_xxx",
-        )
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(
+                url,
+                data=json.dumps({"fake": "payload"}),
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="test_sig_xxx",
+            )
 
         assert response.status_code == 200
         reg.refresh_from_db()
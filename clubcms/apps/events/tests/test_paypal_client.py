@@ -0,0 +1,148 @@
+"""
+Tests for the pooled PayPal client in apps/events/payment.py
+
+Runs the client against a local stub of the PayPal API to check
+connection reuse, token caching and refresh.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from apps.events import payment
+
+
+class _StubPayPal(BaseHTTPRequestHandler):
+    """Minimal PayPal API: OAuth token, create order and capture."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.stats["connections"] += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        stats = self.server.stats
+        if self.path == "/v1/oauth2/token":
+            stats["tokens"] += 1
+            self._reply(200, {
+                "access_token": f"TOKEN{stats['tokens']}",
+                "expires_in": self.server.expires_in,
+            })
+        elif self.headers.get("Authorization") in self.server.revoked:
+            self._reply(401, {"error": "invalid_token"})
+        elif self.path == "/v2/checkout/orders":
+            self._reply(201, {
+                "id": "ORDER_1",
+                "links": [{"rel": "payer-action", "href": "https://paypal.test/approve"}],
+            })
+        else:
+            self._reply(201, {
+                "status": "COMPLETED",
+                "purchase_units": [{"payments": {"captures": [{"id": "CAP_1"}]}}],
+            })
+
+
+@pytest.fixture()
+def stub_paypal():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPayPal)
+    server.daemon_threads = True
+    server.stats = {"connections": 0, "tokens": 0}
+    server.expires_in = 32400
+    server.revoked = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    payment.reset_paypal_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def _settings(server, client_id="client", secret="secret"):
+    ps = MagicMock()
+    ps.paypal_base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    ps.paypal_client_id = client_id
+    ps.paypal_secret = secret
+    return ps
+
+
+def _registration():
+    reg = MagicMock()
+    reg.pk = 1
+    reg.payment_amount = 30
+    reg.event.title = "Ride"
+    return reg
+
+
+def _request():
+    request = MagicMock()
+    request.build_absolute_uri.side_effect = lambda path: f"https://club.test{path}"
+    return request
+
+
+class TestPooledPayPalClient:
+    """A checkout reuses one connection and one token."""
+
+    def test_checkout_reuses_connection_and_token(self, stub_paypal):
+        ps = _settings(stub_paypal)
+
+        order_id, _url = payment.create_paypal_order(_registration(), ps, _request())
+        result = payment.capture_paypal_order(order_id, ps)
+
+        assert result == {"status": "COMPLETED", "id": "CAP_1"}
+        assert stub_paypal.stats == {"connections": 1, "tokens": 1}
+
+    def test_token_refreshed_near_expiry(self, stub_paypal):
+        stub_paypal.expires_in = payment.PAYPAL_TOKEN_REFRESH_MARGIN
+        ps = _settings(stub_paypal)
+
+        assert payment.get_paypal_access_token(ps) == "TOKEN1"
+        assert payment.get_paypal_access_token(ps) == "TOKEN2"
+
+    def test_revoked_token_retried_once(self, stub_paypal):
+        ps = _settings(stub_paypal)
+        stub_paypal.revoked.add(f"Bearer {payment.get_paypal_access_token(ps)}")
+
+        result = payment.capture_paypal_order("ORDER_1", ps)
+
+        assert result["id"] == "CAP_1"
+        assert stub_paypal.stats["tokens"] == 2
+
+    def test_concurrent_requests_fetch_one_token(self, stub_paypal):
+        ps = _settings(stub_paypal)
+        threads = [
+            threading.Thread(target=payment.get_paypal_access_token, args=(ps,))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stub_paypal.stats["tokens"] == 1
+
+    def test_credential_change_replaces_client(self, stub_paypal):
+        ps = _settings(stub_paypal)
+        old = payment.get_paypal_client(ps)
+        payment.get_paypal_access_token(ps)
+
+        payment.get_paypal_access_token(_settings(stub_paypal, secret="rotated"))
+
+        assert stub_paypal.stats["tokens"] == 2
+        # A request still holding the old client can finish
+        assert old.http.post(f"{ps.paypal_base_url}/v1/oauth2/token").is_success
@@ -0,0 +1,224 @@
+"""
+Unit tests for apps/events/pricing.py
+
+Tests the precomputed pricing schedule: tier boundaries, bisect lookup,
+caching and invalidation.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.events.models import PricingTier
+from apps.events.pricing import get_pricing_schedule
+from apps.events.tests.test_capacity import _create_event_page
+from apps.events.utils import calculate_current_tier, calculate_price
+
+
+def _add_tiers(event):
+    """Early bird until 10 days before, regular until 2 days before (deadline)."""
+    PricingTier.objects.create(
+        event_page=event, days_before=10, discount_percent=20, label="Early Bird"
+    )
+    PricingTier.objects.create(
+        event_page=event, days_before=2, discount_percent=5, label="Regular",
+        is_deadline=True,
+    )
+
+
+def _fresh(event):
+    from apps.website.models.pages import EventDetailPage
+
+    return EventDetailPage.objects.get(pk=event.pk)
+
+
+@pytest.mark.django_db
+class TestPricingSchedule:
+    """Schedules hold sorted absolute boundaries."""
+
+    def test_boundaries_sorted_by_deadline(self):
+        event = _create_event_page()
+        _add_tiers(event)
+
+        schedule = get_pricing_schedule(_fresh(event))
+
+        assert [t.label for t in schedule.tiers] == ["Early Bird", "Regular"]
+        assert schedule.tiers[0].deadline == event.start_date - timedelta(days=10)
+        assert schedule.registration_deadline == event.start_date - timedelta(days=2)
+
+    def test_active_tier_follows_time(self):
+        event = _create_event_page()
+        _add_tiers(event)
+        start = event.start_date
+
+        def tier(days):
+            return calculate_current_tier(event, now=start - timedelta(days=days))
+
+        assert tier(15).label == "Early Bird"
+        assert tier(10).label == "Early Bird"
+        assert tier(5).label == "Regular"
+        assert tier(1) is None
+
+    def test_early_bird_fields_act_as_tier(self):
+        start = timezone.now() + timedelta(days=30)
+        event = _create_event_page(
+            start_date=start,
+            base_fee=100,
+            early_bird_discount=20,
+            early_bird_deadline=start - timedelta(days=10),
+        )
+
+        page = _fresh(event)
+
+        assert page.current_tier.discount_percent == 20
+        assert page.current_price == 80
+        assert calculate_current_tier(event, now=start - timedelta(days=5)) is None
+
+    def test_no_tiers(self):
+        event = _create_event_page()
+
+        assert calculate_current_tier(event) is None
+        assert event.computed_deadline is None
+
+
+@pytest.mark.django_db
+class TestPricingScheduleCache:
+    """Warm schedules are served without queries and dropped on change."""
+
+    def test_price_and_deadline_without_queries(self, django_assert_num_queries):
+        event = _create_event_page(base_fee=100)
+        _add_tiers(event)
+        get_pricing_schedule(_fresh(event))
+
+        page = _fresh(event)
+        with django_assert_num_queries(0):
+            pricing = calculate_price(page)
+            calculate_price(page)
+
+        assert pricing["tier"].label == "Early Bird"
+        assert pricing["final_price"] == 80
+        assert pricing["deadline"] == event.start_date - timedelta(days=2)
+
+    def test_tier_change_invalidates(self):
+        event = _create_event_page()
+        _add_tiers(event)
+        get_pricing_schedule(_fresh(event))
+
+        PricingTier.objects.filter(label="Early Bird").get().delete()
+
+        schedule = get_pricing_schedule(_fresh(event))
+        assert [t.label for t in schedule.tiers] == ["Regular"]
+
+    def test_publish_invalidates(self):
+        event = _create_event_page()
+        get_pricing_schedule(_fresh(event))
+        PricingTier.objects.bulk_create(
+            [
+                PricingTier(
+                    event_page=event, days_before=3, label="Late", discount_percent=0
+                )
+            ]
+        )
+
+        page = _fresh(event)
+        page.save_revision().publish()
+
+        assert [t.label for t in get_pricing_schedule(_fresh(event)).tiers] == ["Late"]
+
+    def test_moved_start_date_rebuilds(self):
+        event = _create_event_page()
+        _add_tiers(event)
+        get_pricing_schedule(_fresh(event))
+
+        page = _fresh(event)
+        page.start_date = page.start_date + timedelta(days=7)
+
+        assert get_pricing_schedule(page).registration_deadline == (
+            page.start_date - timedelta(days=2)
+        )
+
+
+@pytest.mark.django_db
+class TestPriceEvents:
+    """price_events prices a whole listing with a constant number of queries."""
+
+    def _listing(self, count):
+        from apps.website.models.pages import EventDetailPage
+
+        for _ in range(count):
+            _add_tiers(_create_event_page(base_fee=100, member_discount_percent=10))
+        return list(EventDetailPage.objects.order_by("pk"))
+
+    def test_query_count_independent_of_listing_size(self, django_assert_num_queries):
+        from apps.events.utils import price_events
+
+        events = self._listing(6)
+
+        with django_assert_num_queries(1):
+            prices = price_events(events)
+
+        assert len(prices) == 6
+        assert all(p["tier"].label == "Early Bird" for p in prices.values())
+        assert all(p["final_price"] == 80 for p in prices.values())
+
+    def test_warm_cache_needs_no_query(self, django_assert_num_queries):
+        from apps.events.utils import price_events
+
+        price_events(self._listing(3))
+        events = self._listing(0)
+
+        with django_assert_num_queries(0):
+            price_events(events)
+
+    def test_member_prices(self, active_member):
+        from apps.events.utils import price_events
+
+        events = self._listing(2)
+
+        prices = price_events(events, user=active_member)
+
+        # 20% early bird + 15% product discount (beats the event's 10%)
+        assert {p["final_price"] for p in prices.values()} == {65}
+
+    def test_page_prices_follow_schedule(self):
+        _add_tiers(_create_event_page(base_fee=100, member_discount_percent=10))
+        page = self._listing(0)[0]
+
+        assert page.current_tier.label == "Early Bird"
+        assert page.current_price == 80
+        assert page.member_price() == 70
+
+    def test_feed_uses_configured_currency(self, settings):
+        from apps.core.feeds import UpcomingEventsFeed
+
+        settings.EVENT_CURRENCY = "CHF"
+        event = self._listing(1)[0]
+        event.pricing = {"base_fee": 100, "final_price": 80}
+
+        assert "Price: 80.00 CHF" in UpcomingEventsFeed().item_description(event)
+
+    def test_page_shows_configured_currency_symbol(self, rf, settings):
+        from django.contrib.auth.models import AnonymousUser
+
+        settings.EVENT_CURRENCY_SYMBOL = "CHF"
+        event = _create_event_page(base_fee=100)
+        request = rf.get("/")
+        request.user = AnonymousUser()
+
+        response = _fresh(event).serve(request).render()
+
+        assert "100,00 CHF" in response.content.decode()
+
+    def test_upcoming_events_tag_attaches_pricing(self, rf):
+        from django.contrib.auth.models import AnonymousUser
+
+        from apps.website.templatetags.website_tags import upcoming_events
+
+        self._listing(2)
+        request = rf.get("/")
+        request.user = AnonymousUser()
+
+        events = upcoming_events({"request": request}, count=2)
+
+        assert [e.pricing["final_price"] for e in events] == [80, 80]
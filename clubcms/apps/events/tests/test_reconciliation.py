@@ -0,0 +1,203 @@
+"""
+Tests for apps/events/reconciliation.py
+
+Tests statement parsing (CSV and CAMT.053), reference matching, bulk
+marking and the command/admin entry points.
+"""
+
+import io
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.events.models import EventRegistration
+from apps.events.reconciliation import (
+    extract_references,
+    iter_statement,
+    parse_amount,
+    reconcile,
+)
+from apps.events.tests.test_capacity import _create_event_page, _register
+
+CAMT = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt><Stmt>
+    <Ntry>
+      <Amt Ccy="EUR">50.00</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+      <BookgDt><Dt>2026-10-01</Dt></BookgDt>
+      <NtryDtls><TxDtls><RmtInf>
+        <Ustrd>Iscrizione {ref}</Ustrd>
+      </RmtInf></TxDtls></NtryDtls>
+    </Ntry>
+    <Ntry>
+      <Amt Ccy="EUR">12.00</Amt><CdtDbtInd>DBIT</CdtDbtInd>
+      <NtryDtls><TxDtls><RmtInf><Ustrd>Bank fees</Ustrd></RmtInf></TxDtls></NtryDtls>
+    </Ntry>
+  </Stmt></BkToCstmrStmt>
+</Document>
+"""
+
+
+def _pending(event, reference, amount="50.00"):
+    return _register(
+        event,
+        payment_provider="bank_transfer",
+        payment_reference=reference,
+        payment_amount=Decimal(amount),
+    )
+
+
+def _csv(*rows):
+    text = "Data contabile;Importo;Causale\n" + "\n".join(";".join(r) for r in rows)
+    return io.BytesIO(text.encode("utf-8"))
+
+
+class TestParsing:
+    """Statements are streamed into credit lines."""
+
+    def test_amount_formats(self):
+        assert parse_amount("1.234,56") == Decimal("1234.56")
+        assert parse_amount("1,234.56") == Decimal("1234.56")
+        assert parse_amount("€ 50,00") == Decimal("50.00")
+        assert parse_amount("n/a") is None
+
+    def test_references_tolerate_formatting(self):
+        text = "bonifico evt 00042 a7b3 e EVT-00043-FFFF"
+        assert extract_references(text) == {"EVT-00042-A7B3", "EVT-00043-FFFF"}
+
+    def test_csv_credits_only(self):
+        lines = list(iter_statement(_csv(
+            ("01/10/2026", "50,00", "EVT-00001-AAAA"),
+            ("02/10/2026", "-10,00", "Commissioni"),
+        )))
+
+        assert [(line.number, line.amount) for line in lines] == [(2, Decimal("50.00"))]
+        assert lines[0].booked_on == "01/10/2026"
+
+    def test_csv_without_columns(self):
+        with pytest.raises(ValueError):
+            list(iter_statement(io.BytesIO(b"foo,bar\n1,2\n"), "csv"))
+
+    def test_camt053_detected(self):
+        camt = CAMT.format(ref="EVT-00001-AAAA").encode()
+
+        lines = list(iter_statement(io.BytesIO(camt)))
+
+        assert len(lines) == 1
+        assert lines[0].text == "Iscrizione EVT-00001-AAAA"
+        assert lines[0].booked_on == "2026-10-01"
+
+
+@pytest.mark.django_db
+class TestReconcile:
+    """References are matched against pending bank transfers in one pass."""
+
+    def test_marks_matches_paid(self):
+        event = _create_event_page(max_attendees=0)
+        paid = _pending(event, "EVT-00001-AAAA")
+        other = _pending(event, "EVT-00001-BBBB")
+
+        report = reconcile(iter_statement(_csv(("", "50,00", "evt-00001-aaaa"))))
+
+        assert [pk for _line, pk in report.matched] == [paid.pk]
+        paid.refresh_from_db()
+        other.refresh_from_db()
+        assert paid.payment_status == "paid"
+        assert other.payment_status == "pending"
+
+    def test_reports_problem_lines(self):
+        event = _create_event_page(max_attendees=0)
+        _pending(event, "EVT-00001-AAAA")
+        _pending(event, "EVT-00001-CCCC")
+        _pending(event, "EVT-00001-EEEE", amount="80.00")
+
+        report = reconcile(iter_statement(_csv(
+            ("", "50,00", "EVT-00001-AAAA"),
+            ("", "50,00", "EVT-00001-AAAA again"),
+            ("", "50,00", "EVT-00001-AAAA EVT-00001-CCCC"),
+            ("", "50,00", "EVT-00001-EEEE"),
+            ("", "50,00", "Quota sociale"),
+        )))
+
+        assert len(report.matched) == 1
+        assert len(report.ambiguous) == 2
+        assert [pk for _line, pk, _due in report.underpaid] == [
+            EventRegistration.objects.get(payment_reference="EVT-00001-EEEE").pk
+        ]
+        assert [line.text for line in report.unmatched] == ["Quota sociale"]
+
+    def test_dry_run_changes_nothing(self):
+        registration = _pending(_create_event_page(), "EVT-00001-AAAA")
+
+        statement = iter_statement(_csv(("", "50,00", "EVT-00001-AAAA")))
+
+        report = reconcile(statement, dry_run=True)
+
+        assert len(report.matched) == 1
+        registration.refresh_from_db()
+        assert registration.payment_status == "pending"
+
+    def test_query_count_independent_of_statement_size(
+        self, django_assert_max_num_queries
+    ):
+        event = _create_event_page(max_attendees=0)
+        rows = []
+        for index in range(20):
+            _pending(event, f"EVT-00001-{index:04X}")
+            rows.append(("", "50,00", f"EVT-00001-{index:04X}"))
+
+        # index + (savepoint, lock, update, release) per chunk
+        with django_assert_max_num_queries(5):
+            report = reconcile(iter_statement(_csv(*rows)))
+
+        assert len(report.matched) == 20
+
+
+@pytest.mark.django_db
+class TestEntryPoints:
+    """Command and admin upload share the reconciler."""
+
+    def test_command(self, tmp_path):
+        registration = _pending(_create_event_page(), "EVT-00001-AAAA")
+        path = tmp_path / "statement.xml"
+        path.write_text(CAMT.format(ref="EVT-00001-AAAA"))
+        out = StringIO()
+
+        call_command("reconcile_bank_statement", str(path), stdout=out)
+
+        assert "1 marked paid" in out.getvalue()
+        registration.refresh_from_db()
+        assert registration.payment_status == "paid"
+
+    def test_admin_upload(self, client, django_user_model):
+        admin = django_user_model.objects.create_superuser(
+            username="treasurer", email="t@example.com", password="testpass123456"
+        )
+        registration = _pending(_create_event_page(), "EVT-00001-AAAA")
+        client.force_login(admin)
+
+        response = client.post(
+            reverse("events_reconcile"),
+            {
+                "statement": SimpleUploadedFile(
+                    "statement.csv", _csv(("", "50,00", "EVT-00001-AAAA")).getvalue()
+                ),
+                "format": "auto",
+                "encoding": "utf-8-sig",
+            },
+        )
+
+        assert response.status_code == 200
+        registration.refresh_from_db()
+        assert registration.payment_status == "paid"
+
+    def test_admin_requires_permission(self, client, staff_user):
+        client.force_login(staff_user)
+
+        response = client.get(reverse("events_reconcile"))
+
+        assert response.status_code in (302, 403)
@@ -0,0 +1,118 @@
+"""
+Tests for payment references in apps/events/payment.py
+
+Tests the check character, typo-tolerant normalization, the unique
+index and find_by_reference.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from apps.events.models import EventRegistration
+from apps.events.payment import (
+    assign_payment_reference,
+    find_by_reference,
+    generate_payment_reference,
+    normalize_payment_reference,
+    reference_candidates,
+)
+from apps.events.tests.test_capacity import _create_event_page, _register
+
+REFERENCE = generate_payment_reference(SimpleNamespace(pk=1, event_id=42))
+
+
+class TestNormalization:
+    """Common typing mistakes map back to the canonical reference."""
+
+    def test_canonical(self):
+        assert normalize_payment_reference(REFERENCE) == REFERENCE
+
+    def test_case_spacing_and_separators(self):
+        compact = REFERENCE.replace("-", "").lower()
+        spaced = REFERENCE.replace("-", " ")
+
+        assert normalize_payment_reference(compact) == REFERENCE
+        assert normalize_payment_reference(f"  {spaced} ") == REFERENCE
+
+    def test_confusable_characters(self):
+        code = REFERENCE.split("-")[2]
+        typed = REFERENCE.replace("00042", "OOO42")
+        assert normalize_payment_reference(typed) == REFERENCE
+        if "1" in code:
+            assert normalize_payment_reference(REFERENCE.replace("1", "l")) == REFERENCE
+
+    def test_single_substitution_detected(self):
+        wrong = REFERENCE[:-2] + ("Z" if REFERENCE[-2] != "Z" else "Y") + REFERENCE[-1]
+
+        assert REFERENCE not in reference_candidates(wrong)
+
+    def test_swapped_neighbours_suggested(self):
+        code_start = len("EVT-00042-")
+        swapped = (
+            REFERENCE[:code_start]
+            + REFERENCE[code_start + 1]
+            + REFERENCE[code_start]
+            + REFERENCE[code_start + 2:]
+        )
+        if swapped != REFERENCE:
+            assert REFERENCE in reference_candidates(swapped)
+
+    def test_legacy_references(self):
+        assert normalize_payment_reference("evt-00042-a7b3") == "EVT-00042-A7B3"
+        assert normalize_payment_reference("EVT-00042-ZZZZ") is None
+
+    def test_garbage(self):
+        assert reference_candidates("hello") == []
+        assert reference_candidates("") == []
+
+
+@pytest.mark.django_db
+class TestStoredReferences:
+    """References are unique and found through the index."""
+
+    def _bank_transfer(self, **kwargs):
+        registration = _register(_create_event_page(), **kwargs)
+        registration.payment_provider = "bank_transfer"
+        assign_payment_reference(
+            registration, update_fields=["payment_provider", "payment_reference"]
+        )
+        return registration
+
+    def test_find_by_reference_with_typos(self, django_assert_num_queries):
+        registration = self._bank_transfer()
+        typed = registration.payment_reference.replace("-", " ").lower()
+
+        with django_assert_num_queries(1):
+            assert find_by_reference(typed) == registration
+
+    def test_find_by_unknown_reference(self):
+        self._bank_transfer()
+
+        assert find_by_reference("EVT-99999-0000000") is None
+        assert find_by_reference("not a reference") is None
+
+    def test_collision_retried(self):
+        first = self._bank_transfer()
+        second = _register(_create_event_page())
+        taken = first.payment_reference
+
+        def collide(registration, attempt=0):
+            if attempt == 0:
+                return taken
+            return generate_payment_reference(registration, attempt)
+
+        with patch(
+            "apps.events.payment.generate_payment_reference", side_effect=collide
+        ):
+            assign_payment_reference(second)
+
+        second.refresh_from_db()
+        assert second.payment_reference not in ("", taken)
+
+    def test_blank_references_not_unique(self):
+        _register(_create_event_page())
+        _register(_create_event_page())
+
+        assert EventRegistration.objects.filter(payment_reference="").count() == 2
@@ -0,0 +1,130 @@
+"""
+Unit tests for reserve_seat() / release_seat() in apps/events/capacity.py
+
+Tests the conditional-UPDATE seat decision and the concurrency
+benchmark command (run inline, SQLite serializes writers).
+"""
+
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+
+from apps.events.capacity import release_seat, reserve_seat
+from apps.events.models import EventCapacity, EventRegistration
+from apps.events.tests.test_capacity import _counters, _create_event_page, _register
+
+
+def _reserve(event, **kwargs):
+    """Reserve a seat and save the registration like the register view."""
+    registration = EventRegistration(event=event, email="rider@example.com", **kwargs)
+    reserve_seat(registration, event.max_attendees)
+    with patch("apps.notifications.services.create_notification"):
+        registration.save()
+    return registration
+
+
+@pytest.mark.django_db
+class TestReserveSeat:
+    """The capacity row decides between a seat and the waitlist."""
+
+    def test_seat_taken_while_available(self):
+        event = _create_event_page(max_attendees=2)
+
+        reg = _reserve(event, has_passenger=True)
+
+        assert reg.status == "registered"
+        assert _counters(event) == (1, 0, 1)
+
+    def test_full_event_goes_to_waitlist(self):
+        event = _create_event_page(max_attendees=1)
+        _reserve(event)
+
+        reg = _reserve(event)
+
+        assert reg.status == "waitlist"
+        assert _counters(event) == (1, 1, 0)
+
+    def test_waitlist_blocks_freed_seat(self):
+        """A newcomer cannot jump ahead of people already waiting."""
+        event = _create_event_page(max_attendees=1)
+        first = _reserve(event)
+        _reserve(event)
+        first.status = "cancelled"
+        first.save(update_fields=["status"])
+
+        reg = _reserve(event)
+
+        assert reg.status == "waitlist"
+        assert _counters(event) == (0, 2, 0)
+
+    def test_sequential_burst_never_overbooks(self):
+        event = _create_event_page(max_attendees=10)
+
+        statuses = [_reserve(event).status for _ in range(15)]
+
+        assert statuses.count("registered") == 10
+        assert statuses.count("waitlist") == 5
+        assert _counters(event) == (10, 5, 0)
+
+    def test_unlimited_event_always_registers(self):
+        event = _create_event_page(max_attendees=0)
+
+        reg = _reserve(event)
+
+        assert reg.status == "registered"
+        assert _counters(event) == (1, 0, 0)
+
+    def test_missing_row_is_rebuilt(self):
+        event = _create_event_page(max_attendees=1)
+        _register(event, status="registered")
+        EventCapacity.objects.filter(event_id=event.pk).delete()
+
+        reg = _reserve(event)
+
+        assert reg.status == "waitlist"
+        assert _counters(event) == (1, 1, 0)
+
+    def test_release_undoes_reservation(self):
+        event = _create_event_page(max_attendees=5)
+        registration = EventRegistration(event=event, has_passenger=True)
+        reserve_seat(registration, event.max_attendees)
+        assert _counters(event) == (1, 0, 1)
+
+        release_seat(registration)
+
+        assert _counters(event) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """benchmark_seat_reservation reports throughput and invariants."""
+
+    def test_inline_run_cleans_up(self):
+        out = StringIO()
+        call_command(
+            "benchmark_seat_reservation",
+            "--registrations=12",
+            "--capacity=8",
+            "--threads=1",
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        assert "registered=8 waitlist=4 errors=0" in output
+        assert "Invariants hold" in output
+        assert not EventRegistration.objects.filter(last_name="0").exists()
+
+    def test_row_lock_strategy(self):
+        out = StringIO()
+        call_command(
+            "benchmark_seat_reservation",
+            "--registrations=5",
+            "--capacity=3",
+            "--threads=1",
+            "--strategy=row-lock",
+            stdout=out,
+        )
+
+        assert "registered=3 waitlist=2" in out.getvalue()
@@ -37,20 +37,34 @@ def _create_event_page(**kwargs):
     return event
 
 
+def _register(**kwargs):
+    """Create a registration without its confirmation notification."""
+    with patch("apps.notifications.services.create_notification"):
+        return EventRegistration.objects.create(**kwargs)
+
+
+def _expired_notices(user):
+    """Number of queued ``payment_expired`` notifications for *user*."""
+    from apps.notifications.models import NotificationQueue
+
+    return NotificationQueue.objects.filter(
+        notification_type="payment_expired", recipient=user
+    ).count()
+
+
 @pytest.mark.django_db
 class TestExpirePendingBankTransfers:
     """Tests for expire_pending_bank_transfers task."""
 
-    @patch("apps.events.tasks.promote_from_waitlist")
-    @patch("apps.notifications.services.create_notification")
-    def test_expires_overdue_bank_transfers(self, mock_notify, mock_promote):
+    @patch("apps.events.tasks.promote_waitlist")
+    def test_expires_overdue_bank_transfers(self, mock_promote):
         """Registrations past payment_expires_at are marked expired+cancelled."""
         event = _create_event_page()
         user = User.objects.create_user(
             username="task_test1", password="testpass123456"
         )
 
-        reg = EventRegistration.objects.create(
+        reg = _register(
             event=event,
             user=user,
             payment_provider="bank_transfer",
@@ -66,18 +80,18 @@ class TestExpirePendingBankTransfers:
         assert count == 1
         assert reg.payment_status == "expired"
         assert reg.status == "cancelled"
+        assert _expired_notices(user) == 1
         mock_promote.assert_called_once()
 
-    @patch("apps.events.tasks.promote_from_waitlist")
-    @patch("apps.notifications.services.create_notification")
-    def test_does_not_expire_future_transfers(self, mock_notify, mock_promote):
+    @patch("apps.events.tasks.promote_waitlist")
+    def test_does_not_expire_future_transfers(self, mock_promote):
         """Registrations with future expires_at are left alone."""
         event = _create_event_page(slug="test-event-tasks-future")
         user = User.objects.create_user(
             username="task_test2", password="testpass123456"
         )
 
-        reg = EventRegistration.objects.create(
+        reg = _register(
             event=event,
             user=user,
             payment_provider="bank_transfer",
@@ -92,17 +106,17 @@ class TestExpirePendingBankTransfers:
         assert count == 0
         assert reg.payment_status == "pending"
         assert reg.status == "registered"
+        assert _expired_notices(user) == 0
 
-    @patch("apps.events.tasks.promote_from_waitlist")
-    @patch("apps.notifications.services.create_notification")
-    def test_ignores_non_bank_transfer(self, mock_notify, mock_promote):
+    @patch("apps.events.tasks.promote_waitlist")
+    def test_ignores_non_bank_transfer(self, mock_promote):
         """Only bank_transfer provider registrations are expired."""
         event = _create_event_page(slug="test-event-tasks-stripe")
         user = User.objects.create_user(
             username="task_test3", password="testpass123456"
         )
 
-        EventRegistration.objects.create(
+        _register(
             event=event,
             user=user,
             payment_provider="stripe",
@@ -113,17 +127,17 @@ class TestExpirePendingBankTransfers:
 
         count = expire_pending_bank_transfers()
         assert count == 0
+        assert _expired_notices(user) == 0
 
-    @patch("apps.events.tasks.promote_from_waitlist")
-    @patch("apps.notifications.services.create_notification")
-    def test_ignores_already_paid(self, mock_notify, mock_promote):
+    @patch("apps.events.tasks.promote_waitlist")
+    def test_ignores_already_paid(self, mock_promote):
         """Already-paid bank transfers are not expired."""
         event = _create_event_page(slug="test-event-tasks-paid")
         user = User.objects.create_user(
             username="task_test4", password="testpass123456"
         )
 
-        reg = EventRegistration.objects.create(
+        reg = _register(
             event=event,
             user=user,
             payment_provider="bank_transfer",
@@ -137,3 +151,74 @@ class TestExpirePendingBankTransfers:
         reg.refresh_from_db()
         assert count == 0
         assert reg.payment_status == "paid"
+        assert _expired_notices(user) == 0
+
+
+@pytest.mark.django_db
+class TestExpireInChunks:
+    """The expiry job is set-based and works in bounded chunks."""
+
+    def _pending(self, event, count, **kwargs):
+        return [
+            _register(
+                event=event,
+                payment_provider="bank_transfer",
+                payment_status="pending",
+                payment_expires_at=timezone.now() - timedelta(hours=1),
+                payment_amount=Decimal("50.00"),
+                **kwargs,
+            )
+            for _ in range(count)
+        ]
+
+    def test_chunks_expire_everything_and_fix_counters(self):
+        from apps.events.models import EventCapacity
+
+        event = _create_event_page(slug="test-event-tasks-chunks", max_attendees=5)
+        self._pending(event, 5)
+        waiting = [
+            EventRegistration.objects.create(event=event, status="waitlist")
+            for _ in range(2)
+        ]
+
+        count = expire_pending_bank_transfers(chunk_size=2)
+
+        assert count == 5
+        assert not EventRegistration.objects.filter(
+            payment_provider="bank_transfer", payment_status="pending"
+        ).exists()
+        for reg in waiting:
+            reg.refresh_from_db()
+            assert reg.status == "registered"
+        capacity = EventCapacity.objects.get(event_id=event.pk)
+        assert (capacity.confirmed_count, capacity.waitlist_count) == (2, 0)
+
+    def test_notifications_bulk_created_per_chunk(self):
+        from apps.notifications.models import NotificationQueue
+
+        event = _create_event_page(slug="test-event-tasks-notify")
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f"task_chunk{i}", password="testpass123456"
+            )
+            self._pending(event, 1, user=user)
+
+        with patch.object(
+            NotificationQueue.objects,
+            "bulk_create",
+            wraps=NotificationQueue.objects.bulk_create,
+        ) as bulk_create:
+            expire_pending_bank_transfers()
+
+        bulk_create.assert_called_once()
+        assert (
+            NotificationQueue.objects.filter(notification_type="payment_expired").count()
+            == 3
+        )
+
+    def test_query_count_does_not_grow_with_rows(self, django_assert_max_num_queries):
+        event = _create_event_page(slug="test-event-tasks-queries")
+        self._pending(event, 30)
+
+        with django_assert_max_num_queries(15):
+            assert expire_pending_bank_transfers() == 30
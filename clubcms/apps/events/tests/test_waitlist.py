@@ -0,0 +1,151 @@
+"""
+Unit tests for promote_waitlist() in apps/events/utils.py
+
+Tests that freed seats are filled from the waitlist in one pass and
+that promotion notifications are queued in bulk.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.events.models import EventCapacity, EventRegistration
+from apps.events.tests.test_capacity import _counters, _create_event_page, _register
+from apps.events.utils import promote_from_waitlist, promote_waitlist
+from apps.notifications.models import NotificationQueue
+
+User = get_user_model()
+
+
+def _fill(event, registered, waitlisted, **kwargs):
+    """Create *registered* seat holders and *waitlisted* entries."""
+    seats = [_register(event, status="registered") for _ in range(registered)]
+    waiting = [
+        _register(event, status="waitlist", **kwargs) for _ in range(waitlisted)
+    ]
+    return seats, waiting
+
+
+def _cancel(registrations):
+    for reg in registrations:
+        reg.status = "cancelled"
+        reg.save(update_fields=["status"])
+
+
+@pytest.mark.django_db
+class TestPromoteWaitlist:
+    """promote_waitlist fills every free seat in waitlist order."""
+
+    def test_fills_all_freed_seats(self):
+        event = _create_event_page(max_attendees=5)
+        seats, waiting = _fill(event, 5, 4)
+        _cancel(seats[:3])
+
+        promoted = promote_waitlist(event)
+
+        assert [reg.pk for reg in promoted] == [reg.pk for reg in waiting[:3]]
+        assert all(reg.status == "registered" for reg in promoted)
+        assert EventRegistration.objects.get(pk=waiting[3].pk).status == "waitlist"
+        assert _counters(event) == (5, 1, 0)
+
+    def test_multiple_events_in_one_call(self):
+        first = _create_event_page(max_attendees=2)
+        second = _create_event_page(max_attendees=1)
+        first_seats, _ = _fill(first, 2, 2)
+        second_seats, _ = _fill(second, 1, 1, has_passenger=True)
+        _cancel(first_seats + second_seats)
+
+        promoted = promote_waitlist([first, second])
+
+        assert len(promoted) == 3
+        assert _counters(first) == (2, 0, 0)
+        assert _counters(second) == (1, 0, 1)
+
+    def test_no_free_seats(self):
+        event = _create_event_page(max_attendees=2)
+        _fill(event, 2, 1)
+
+        assert promote_waitlist(event) == []
+        assert _counters(event) == (2, 1, 0)
+
+    def test_unlimited_event_skipped(self):
+        event = _create_event_page(max_attendees=0)
+        _register(event, status="waitlist")
+
+        assert promote_waitlist(event) == []
+
+    def test_missing_capacity_row_is_rebuilt(self):
+        event = _create_event_page(max_attendees=1)
+        _register(event, status="waitlist")
+        EventCapacity.objects.filter(event_id=event.pk).delete()
+
+        promoted = promote_waitlist(event)
+
+        assert len(promoted) == 1
+        assert _counters(event) == (1, 0, 0)
+
+    def test_notifications_queued_in_one_insert(self):
+        event = _create_event_page(max_attendees=3)
+        users = [
+            User.objects.create_user(username=f"waiting{i}", password="testpass123456")
+            for i in range(3)
+        ]
+        for user in users:
+            _register(event, status="waitlist", user=user)
+
+        with patch.object(
+            NotificationQueue.objects,
+            "bulk_create",
+            wraps=NotificationQueue.objects.bulk_create,
+        ) as bulk_create:
+            promote_waitlist(event)
+
+        bulk_create.assert_called_once()
+        queued = NotificationQueue.objects.filter(
+            notification_type="waitlist_promoted"
+        )
+        assert set(queued.values_list("recipient_id", flat=True)) == {
+            u.pk for u in users
+        }
+
+    def test_single_event_wrapper_returns_first(self):
+        event = _create_event_page(max_attendees=2)
+        _, waiting = _fill(event, 0, 2)
+
+        promoted = promote_from_waitlist(event)
+
+        assert promoted.pk == waiting[0].pk
+        assert _counters(event) == (2, 0, 0)
+
+
+@pytest.mark.django_db
+class TestCancelView:
+    """Cancelling a seat promotes the waitlist without delivering in the request."""
+
+    def test_promotion_not_delivered_in_request(
+        self, client, user_factory, django_capture_on_commit_callbacks
+    ):
+        event = _create_event_page(max_attendees=1)
+        holder = user_factory()
+        waiting = user_factory(push_notifications=True)
+        seat = _register(event, status="registered", user=holder)
+        promoted = _register(event, status="waitlist", user=waiting)
+        client.force_login(holder)
+
+        with (
+            patch("apps.notifications.dispatch.EmailDispatcher.dispatch") as email,
+            patch("apps.notifications.push.PushDispatcher.dispatch") as push,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            response = client.post(reverse("events:cancel", args=[seat.pk]))
+
+        assert response.status_code == 302
+        promoted.refresh_from_db()
+        assert promoted.status == "registered"
+        assert NotificationQueue.objects.filter(
+            notification_type="waitlist_promoted", status="pending"
+        ).exists()
+        assert not email.called
+        assert not push.called
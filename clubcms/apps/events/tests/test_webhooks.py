@@ -0,0 +1,234 @@
+"""
+Tests for apps/events/webhooks.py
+
+Tests idempotent webhook ingestion, batched processing and the
+benchmark command, using a fake Stripe signer.
+"""
+
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.events.models import EventRegistration, PaymentWebhookEvent
+from apps.events.tests.test_capacity import _create_event_page
+from apps.events.webhooks import (
+    fake_stripe_signature,
+    process_payment_webhooks,
+    record_webhook_event,
+)
+
+stripe = pytest.importorskip("stripe")
+
+SECRET = "whsec_test_xxx"
+
+
+@pytest.fixture
+def webhook_settings(db):
+    from wagtail.models import Site
+
+    from apps.website.models.settings import PaymentSettings
+
+    ps = PaymentSettings.for_site(Site.objects.get(is_default_site=True))
+    ps.payment_mode = "test"
+    ps.stripe_test_enabled = True
+    ps.stripe_test_webhook_secret = SECRET
+    ps.save()
+    return ps
+
+
+def _checkout_event(event_id, session_id, payment_intent="pi_1"):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": "checkout.session.completed",
+        "data": {"object": {"id": session_id, "payment_intent": payment_intent}},
+    }
+
+
+def _store(event):
+    """Store *event* as the webhook view does with a task cluster."""
+    return record_webhook_event("stripe", event, enqueue=False)
+
+
+def _stripe_registration(session_id, **kwargs):
+    with patch("apps.notifications.services.create_notification"):
+        return EventRegistration.objects.create(
+            event=kwargs.pop("event", None) or _create_event_page(),
+            payment_provider="stripe",
+            payment_session_id=session_id,
+            payment_amount=Decimal("25.00"),
+            **kwargs,
+        )
+
+
+@pytest.mark.django_db
+class TestIngestion:
+    """The webhook view verifies, stores and returns 200."""
+
+    def _post(self, client, body, secret=SECRET):
+        payload = json.dumps(body)
+        return client.post(
+            reverse("events:stripe_webhook"),
+            data=payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=fake_stripe_signature(payload, secret),
+        )
+
+    def test_stores_event_without_touching_registration(
+        self, client, webhook_settings
+    ):
+        reg = _stripe_registration("cs_1")
+
+        with patch("apps.events.webhooks.enqueue_webhook_processing") as enqueue:
+            response = self._post(client, _checkout_event("evt_1", "cs_1"))
+
+        assert response.status_code == 200
+        stored = PaymentWebhookEvent.objects.get()
+        assert (stored.event_id, stored.status) == ("evt_1", "pending")
+        reg.refresh_from_db()
+        assert reg.payment_status == "pending"
+        enqueue.assert_called_once()
+
+    def test_applied_by_queued_task(
+        self, client, webhook_settings, task_worker, django_capture_on_commit_callbacks
+    ):
+        reg = _stripe_registration("cs_1")
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            self._post(client, _checkout_event("evt_1", "cs_1", "pi_abc"))
+
+        assert len(callbacks) == 1
+        reg.refresh_from_db()
+        assert (reg.payment_status, reg.payment_id) == ("paid", "pi_abc")
+        assert PaymentWebhookEvent.objects.get().status == "processed"
+
+    def test_task_queued_not_applied_in_request(
+        self, client, webhook_settings, django_capture_on_commit_callbacks
+    ):
+        reg = _stripe_registration("cs_1")
+
+        with (
+            patch("django_q.tasks.async_task") as async_task,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            self._post(client, _checkout_event("evt_1", "cs_1", "pi_abc"))
+
+        async_task.assert_called_once()
+        reg.refresh_from_db()
+        assert reg.payment_status == "pending"
+
+    def test_applied_in_request_without_cluster(self, client, webhook_settings):
+        reg = _stripe_registration("cs_1")
+
+        with patch("apps.events.webhooks.django_apps.is_installed", return_value=False):
+            self._post(client, _checkout_event("evt_1", "cs_1", "pi_abc"))
+
+        reg.refresh_from_db()
+        assert (reg.payment_status, reg.payment_id) == ("paid", "pi_abc")
+        assert PaymentWebhookEvent.objects.get().status == "processed"
+
+    def test_retries_are_deduplicated(self, client, webhook_settings):
+        for _ in range(3):
+            response = self._post(client, _checkout_event("evt_1", "cs_1"))
+            assert response.status_code == 200
+
+        assert PaymentWebhookEvent.objects.count() == 1
+
+    def test_bad_signature_not_stored(self, client, webhook_settings):
+        response = self._post(
+            client, _checkout_event("evt_1", "cs_1"), secret="whsec_other"
+        )
+
+        assert response.status_code == 400
+        assert not PaymentWebhookEvent.objects.exists()
+
+    def test_unhandled_types_not_stored(self):
+        refund = {"id": "evt_2", "type": "charge.refunded"}
+        assert record_webhook_event("stripe", refund) is False
+        assert not PaymentWebhookEvent.objects.exists()
+
+
+@pytest.mark.django_db
+class TestProcessing:
+    """The worker applies queued events in batches."""
+
+    def test_marks_paid_and_notifies(self, user_factory):
+        user = user_factory(email="rider@example.com")
+        reg = _stripe_registration("cs_1", user=user)
+        _store(_checkout_event("evt_1", "cs_1", "pi_abc"))
+
+        with patch(
+            "apps.notifications.services.check_user_preference", return_value=True
+        ):
+            assert process_payment_webhooks() == 1
+
+        reg.refresh_from_db()
+        assert (reg.payment_status, reg.payment_id) == ("paid", "pi_abc")
+        assert PaymentWebhookEvent.objects.get().status == "processed"
+        from apps.notifications.models import NotificationQueue
+
+        assert NotificationQueue.objects.filter(
+            recipient=user, notification_type="payment_confirmed"
+        ).count() == 1
+
+    def test_distinct_events_for_one_session_apply_once(self):
+        reg = _stripe_registration("cs_1")
+        _store(_checkout_event("evt_1", "cs_1", "pi_first"))
+        _store(_checkout_event("evt_2", "cs_1", "pi_second"))
+
+        process_payment_webhooks()
+
+        reg.refresh_from_db()
+        assert reg.payment_id == "pi_first"
+        statuses = PaymentWebhookEvent.objects.values_list("status", flat=True)
+        assert set(statuses) == {"processed"}
+
+    def test_unknown_session_ignored(self):
+        _store(_checkout_event("evt_1", "cs_missing"))
+
+        process_payment_webhooks()
+
+        assert PaymentWebhookEvent.objects.get().status == "ignored"
+
+    def test_query_count_independent_of_batch_size(
+        self, django_assert_max_num_queries
+    ):
+        event = _create_event_page(max_attendees=0)
+        for index in range(8):
+            _stripe_registration(f"cs_{index}", event=event)
+            _store(_checkout_event(f"evt_{index}", f"cs_{index}"))
+
+        # claim + registrations + bulk update + mark processed (+ savepoints)
+        with django_assert_max_num_queries(7):
+            assert process_payment_webhooks() == 8
+
+        assert EventRegistration.objects.filter(payment_status="paid").count() == 8
+
+    def test_failing_batch_retried_then_given_up(self):
+        _store(_checkout_event("evt_1", "cs_1"))
+
+        with patch("apps.events.webhooks._apply_batch", side_effect=RuntimeError):
+            for _ in range(5):
+                process_payment_webhooks()
+
+        stored = PaymentWebhookEvent.objects.get()
+        assert (stored.status, stored.attempts) == ("failed", 5)
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """The benchmark cleans up after itself."""
+
+    def test_runs_and_cleans_up(self):
+        out = StringIO()
+
+        call_command("benchmark_payment_webhooks", events=20, retries=0.5, stdout=out)
+
+        assert "every session paid" in out.getvalue()
+        assert not PaymentWebhookEvent.objects.exists()
+        assert not EventRegistration.objects.exists()
@@ -82,9 +82,46 @@ urlpatterns = [
         name="toggle_favorite",
     ),
     # ICS export
+    path(
+        "calendar.ics",
+        views.ClubEventsICSView.as_view(),
+        name="club_ics",
+    ),
     path(
         "ics/<int:event_pk>/",
         views.EventICSView.as_view(),
         name="event_ics",
     ),
+    # Staff roster exports
+    path(
+        "export/<int:event_pk>/",
+        views.RegistrationExportView.as_view(),
+        name="export_registrations",
+    ),
+    path(
+        "export/<int:event_pk>/checkin/",
+        views.CheckinSheetView.as_view(),
+        name="checkin_sheet",
+    ),
+    # Event-day check-in
+    path(
+        "ticket/<int:pk>/qr.png",
+        views.RegistrationTicketView.as_view(),
+        name="ticket_qr",
+    ),
+    path(
+        "checkin/<int:event_pk>/",
+        views.CheckinScannerView.as_view(),
+        name="checkin_scanner",
+    ),
+    path(
+        "checkin/<int:event_pk>/roster.json",
+        views.CheckinRosterView.as_view(),
+        name="checkin_roster",
+    ),
+    path(
+        "checkin/<int:event_pk>/sync/",
+        views.CheckinSyncView.as_view(),
+        name="checkin_sync",
+    ),
 ]
@@ -5,54 +5,40 @@ Provides pricing calculations, ICS calendar generation,
 and waitlist promotion logic.
 """
 
-from datetime import timedelta
+import hashlib
+import logging
 from decimal import Decimal
 
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+logger = logging.getLogger(__name__)
+
 
 # ---------------------------------------------------------------------------
 # 1. calculate_current_tier — find the active PricingTier for an event
 # ---------------------------------------------------------------------------
 
 
-def calculate_current_tier(event_page):
+def calculate_current_tier(event_page, now=None):
     """
-    Return the currently active PricingTier for the given event page.
+    Return the currently active pricing tier for the given event page.
 
     Tiers are evaluated from the longest time-before-event to the
     shortest.  The first tier whose deadline has not yet passed
     (i.e. we are still *before* the tier boundary) is the active one.
 
-    Returns None if no tier is active or no tiers are defined.
-    """
-    now = timezone.now()
-    start = event_page.start_date
-    if not start:
-        return None
-
-    # Fetch tiers ordered from longest offset to shortest
-    tiers = list(
-        event_page.pricing_tiers.all().order_by(
-            "-days_before", "-hours_before", "-minutes_before"
-        )
-    )
-    if not tiers:
-        return None
+    Looks the tier up in the event's cached ``PricingSchedule``, so no
+    query is issued once the schedule is built.
 
-    for tier in tiers:
-        offset = timedelta(
-            days=tier.days_before,
-            hours=tier.hours_before,
-            minutes=tier.minutes_before,
-        )
-        tier_deadline = start - offset
-        if now <= tier_deadline:
-            return tier
+    Returns a ``TierBoundary``, or None if no tier is active or no tiers
+    are defined.
+    """
+    from apps.events.pricing import get_pricing_schedule
 
-    # All tier deadlines have passed — no active tier
-    return None
+    return get_pricing_schedule(event_page).active_tier(now)
 
 
 # ---------------------------------------------------------------------------
@@ -69,11 +55,13 @@ def calculate_price(event_page, user=None):
 
     Returns a dict with:
         - base_fee: Decimal
-        - tier: PricingTier or None
+        - tier: TierBoundary or None
         - tier_discount_percent: int
         - member_discount_percent: int
         - total_discount_percent: int (capped at 100)
         - final_price: Decimal
+        - passenger_price: Decimal
+        - deadline: datetime or None (computed registration deadline)
     """
     base_fee = Decimal(str(event_page.base_fee or 0))
 
@@ -99,9 +87,31 @@ def calculate_price(event_page, user=None):
         "total_discount_percent": total_discount,
         "final_price": final_price,
         "passenger_price": _calculate_passenger_price(event_page, user),
+        "deadline": getattr(event_page, "computed_deadline", None),
     }
 
 
+def price_events(events, user=None):
+    """
+    Price a whole listing of event pages at once.
+
+    Pricing schedules for all *events* are primed together (one cache
+    ``get_many`` plus at most one tier query); the viewer's entitlements
+    are memoized on the user by the first event, so every further
+    ``calculate_price`` call is query-free.
+
+    Returns a dict mapping event pk to the ``calculate_price`` result.
+    """
+    from apps.events.pricing import prime_pricing_schedules
+
+    events = list(events)
+    prime_pricing_schedules(events)
+    if user is not None and not getattr(user, "is_authenticated", False):
+        user = None
+
+    return {event.pk: calculate_price(event, user=user) for event in events}
+
+
 def _calculate_passenger_price(event_page, user=None):
     """
     Calculate the price for a passenger/companion.
@@ -126,9 +136,15 @@ def _calculate_passenger_price(event_page, user=None):
 
 
 # ---------------------------------------------------------------------------
-# 3. generate_single_ics — ICS for a single event
+# 3. ICS writer — cached VEVENT fragments streamed into a calendar
 # ---------------------------------------------------------------------------
 
+# Published events keep their serialized VEVENT until the next publish
+ICS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Fragments fetched from the cache per round trip
+ICS_FRAGMENT_BATCH_SIZE = 100
+
 
 def _escape_ics(text):
     """Escape text for use in an ICS field value."""
@@ -151,30 +167,22 @@ def _format_dt(dt):
     return dt.strftime("%Y%m%dT%H%M%SZ")
 
 
-def generate_single_ics(event):
+def render_vevent(event, dtstamp):
     """
-    Generate an ICS calendar string for a single event page.
+    Serialize one event page as a CRLF-terminated VEVENT block.
 
     Only exposes event data (title, dates, location) — no PII.
 
     Args:
         event: An EventDetailPage instance.
-
-    Returns:
-        str: A complete ICS calendar string.
+        dtstamp: Pre-formatted DTSTAMP value.
     """
     lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//ClubCMS//Event//EN",
-        "CALSCALE:GREGORIAN",
-        "METHOD:PUBLISH",
+        "BEGIN:VEVENT",
+        f"UID:event-{event.pk}@clubcms",
+        f"DTSTART:{_format_dt(event.start_date)}",
     ]
 
-    lines.append("BEGIN:VEVENT")
-    lines.append(f"UID:event-{event.pk}@clubcms")
-    lines.append(f"DTSTART:{_format_dt(event.start_date)}")
-
     if event.end_date:
         lines.append(f"DTEND:{_format_dt(event.end_date)}")
 
@@ -193,132 +201,220 @@ def generate_single_ics(event):
     if description:
         lines.append(f"DESCRIPTION:{_escape_ics(description)}")
 
-    now_str = _format_dt(timezone.now())
-    lines.append(f"DTSTAMP:{now_str}")
+    lines.append(f"DTSTAMP:{dtstamp}")
     lines.append("END:VEVENT")
-    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
 
-    return "\r\n".join(lines)
 
+def _vevent_cache_key(event_id):
+    return f"events_ics_vevent_{event_id}"
 
-# ---------------------------------------------------------------------------
-# 4. generate_ics — ICS for multiple events
-# ---------------------------------------------------------------------------
+
+def invalidate_vevent(event_id):
+    """Drop the cached VEVENT fragment of one event."""
+    cache.delete(_vevent_cache_key(event_id))
 
 
-def generate_ics(events):
+def _iter_vevents(events, dtstamp):
     """
-    Generate an ICS calendar string for a list of event pages.
+    Yield VEVENT fragments for *events*, reusing cached fragments.
 
-    Only exposes event data (title, dates, location) — no PII.
+    Fragments are only cached for published pages: they are keyed by
+    page and stamped with ``last_published_at``, which also serves as
+    their DTSTAMP so a cached fragment is byte-identical on every poll.
+    """
+    batch = []
+    for event in events:
+        batch.append(event)
+        if len(batch) >= ICS_FRAGMENT_BATCH_SIZE:
+            yield from _render_batch(batch, dtstamp)
+            batch = []
+    if batch:
+        yield from _render_batch(batch, dtstamp)
 
-    Args:
-        events: An iterable of EventDetailPage instances.
 
-    Returns:
-        str: A complete ICS calendar string with multiple VEVENTs.
+def _render_batch(events, dtstamp):
+    published = [e for e in events if getattr(e, "last_published_at", None)]
+    cached = cache.get_many([_vevent_cache_key(e.pk) for e in published])
+
+    fresh = {}
+    for event in events:
+        published_at = getattr(event, "last_published_at", None)
+        if not published_at:
+            yield render_vevent(event, dtstamp)
+            continue
+        key = _vevent_cache_key(event.pk)
+        entry = cached.get(key)
+        if entry is None or entry[0] != published_at:
+            entry = (published_at, render_vevent(event, _format_dt(published_at)))
+            fresh[key] = entry
+        yield entry[1]
+
+    if fresh:
+        cache.set_many(fresh, ICS_FRAGMENT_CACHE_TIMEOUT)
+
+
+def iter_ics(events, prodid="-//ClubCMS//Events//EN", calname=None):
     """
-    lines = [
+    Yield an ICS calendar for *events* chunk by chunk.
+
+    Suitable for ``StreamingHttpResponse``: the calendar header, one
+    VEVENT fragment per event and the footer are produced lazily.
+    """
+    header = [
         "BEGIN:VCALENDAR",
         "VERSION:2.0",
-        "PRODID:-//ClubCMS//Events//EN",
+        f"PRODID:{prodid}",
         "CALSCALE:GREGORIAN",
         "METHOD:PUBLISH",
-        "X-WR-CALNAME:My Favorite Events",
     ]
+    if calname:
+        header.append(f"X-WR-CALNAME:{_escape_ics(calname)}")
+    yield "\r\n".join(header) + "\r\n"
+
+    yield from _iter_vevents(events, _format_dt(timezone.now()))
+
+    yield "END:VCALENDAR\r\n"
+
+
+def ics_etag(events, extra=""):
+    """
+    Return the ETag of a calendar of *events*.
 
+    The ETag covers the event set and each event's publish time (plus
+    *extra*, e.g. the feed owner) and is computed without serializing
+    the calendar.  There is deliberately no Last-Modified counterpart:
+    the newest publish time does not change when an event leaves the
+    feed (unpublished, unfavorited), so it would answer a wrong 304.
+    """
+    digest = hashlib.md5(extra.encode(), usedforsecurity=False)
     for event in events:
-        lines.append("BEGIN:VEVENT")
-        lines.append(f"UID:event-{event.pk}@clubcms")
-        lines.append(f"DTSTART:{_format_dt(event.start_date)}")
+        published_at = getattr(event, "last_published_at", None)
+        timestamp = published_at and published_at.timestamp()
+        digest.update(f"{event.pk}:{timestamp};".encode())
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# 4. generate_single_ics / generate_ics — ICS as a string
+# ---------------------------------------------------------------------------
+
+
+def generate_single_ics(event):
+    """
+    Generate an ICS calendar string for a single event page.
+
+    Only exposes event data (title, dates, location) — no PII.
+
+    Args:
+        event: An EventDetailPage instance.
 
-        if event.end_date:
-            lines.append(f"DTEND:{_format_dt(event.end_date)}")
+    Returns:
+        str: A complete ICS calendar string.
+    """
+    return "".join(iter_ics([event], prodid="-//ClubCMS//Event//EN"))
 
-        lines.append(f"SUMMARY:{_escape_ics(event.title)}")
 
-        location_parts = []
-        if getattr(event, "location_name", ""):
-            location_parts.append(event.location_name)
-        if getattr(event, "location_address", ""):
-            location_parts.append(event.location_address)
-        if location_parts:
-            lines.append(f"LOCATION:{_escape_ics(', '.join(location_parts))}")
+def generate_ics(events, calname="My Favorite Events"):
+    """
+    Generate an ICS calendar string for a list of event pages.
 
-        description = getattr(event, "search_description", "") or ""
-        if description:
-            lines.append(f"DESCRIPTION:{_escape_ics(description)}")
+    Only exposes event data (title, dates, location) — no PII.
 
-        now_str = _format_dt(timezone.now())
-        lines.append(f"DTSTAMP:{now_str}")
-        lines.append("END:VEVENT")
+    Args:
+        events: An iterable of EventDetailPage instances.
 
-    lines.append("END:VCALENDAR")
-    return "\r\n".join(lines)
+    Returns:
+        str: A complete ICS calendar string with multiple VEVENTs.
+    """
+    return "".join(iter_ics(events, calname=calname))
 
 
 # ---------------------------------------------------------------------------
-# 5. promote_from_waitlist — when a spot opens
+# 5. promote_waitlist — fill freed seats from the waitlist
 # ---------------------------------------------------------------------------
 
 
-def promote_from_waitlist(event_page):
+def promote_waitlist(events):
     """
-    Promote the oldest waitlisted registration to 'registered' status.
+    Promote waitlisted registrations into every free seat of *events*.
 
-    Called after a cancellation frees up a spot.  Respects the
-    max_attendees limit (0 = unlimited).
+    Accepts a single EventDetailPage or an iterable of them.  Free seats
+    are computed once per event from the locked ``EventCapacity`` row,
+    the oldest waitlisted registrations are promoted with a single
+    ``UPDATE`` and the promotion notifications are queued with one
+    ``bulk_create``.  Events with unlimited capacity (0) are skipped.
 
-    Returns the promoted EventRegistration or None.
+    Returns the list of promoted EventRegistration instances, oldest
+    first within each event.
     """
-    from apps.events.models import EventRegistration
-
-    # If event has unlimited capacity, there should be no waitlist
-    max_attendees = event_page.max_attendees or 0
-    if max_attendees == 0:
-        return None
-
-    confirmed_count = EventRegistration.objects.filter(
-        event=event_page,
-        status__in=["registered", "confirmed"],
-    ).count()
-
-    if confirmed_count >= max_attendees:
-        return None
-
-    # Promote the earliest waitlisted registration
-    waitlisted = (
-        EventRegistration.objects.filter(
-            event=event_page,
-            status="waitlist",
-        )
-        .order_by("registered_at")
-        .first()
+    from apps.events.capacity import apply_bulk_status, rebuild_capacity
+    from apps.events.models import EventCapacity, EventRegistration
+
+    if hasattr(events, "pk"):
+        events = [events]
+    events = {event.pk: event for event in events if event.max_attendees}
+    if not events:
+        return []
+
+    promoted = []
+    with transaction.atomic():
+        # Lock in primary-key order so concurrent callers cannot deadlock
+        locked = EventCapacity.objects.select_for_update().order_by("pk")
+        capacities = {c.event_id: c for c in locked.filter(event_id__in=events)}
+        missing = events.keys() - capacities.keys()
+        if missing:
+            rebuild_capacity(missing)
+            capacities.update(
+                (c.event_id, c) for c in locked.filter(event_id__in=missing)
+            )
+
+        for event_id, capacity in sorted(capacities.items()):
+            free = events[event_id].max_attendees - capacity.confirmed_count
+            if free <= 0 or not capacity.waitlist_count:
+                continue
+            batch = list(
+                EventRegistration.objects.filter(event_id=event_id, status="waitlist")
+                .select_related("user")
+                .order_by("registered_at", "pk")[:free]
+            )
+            promoted.extend(batch)
+
+        if promoted:
+            EventRegistration.objects.filter(
+                pk__in=[reg.pk for reg in promoted]
+            ).update(status="registered")
+            # .update() bypasses post_save: adjust the counters here
+            apply_bulk_status(promoted, "registered")
+
+    if promoted:
+        _notify_promoted(promoted, events)
+
+    return promoted
+
+
+def _notify_promoted(registrations, events):
+    """Queue ``waitlist_promoted`` notifications with one bulk insert."""
+    from apps.notifications.services import notify_registrants
+
+    notify_registrants(
+        registrations,
+        "waitlist_promoted",
+        title=_("Spot available: {event}"),
+        body=_("A spot has opened up! You have been promoted "
+               "from the waitlist for {event}."),
+        channels=["email", "push"],
+        events=events,
     )
 
-    if waitlisted:
-        waitlisted.status = "registered"
-        waitlisted.save(update_fields=["status"])
-
-        # Send promotion notification
-        if waitlisted.user:
-            try:
-                from apps.notifications.services import create_notification
-
-                create_notification(
-                    notification_type="waitlist_promoted",
-                    title=str(_("Spot available: {event}")).format(
-                        event=event_page.title,
-                    ),
-                    body=str(
-                        _("A spot has opened up! You have been promoted "
-                          "from the waitlist for {event}.")
-                    ).format(event=event_page.title),
-                    recipients=[waitlisted.user],
-                    channels=["email", "push"],
-                    content_object=waitlisted,
-                )
-            except Exception:
-                pass
-
-    return waitlisted
+
+def promote_from_waitlist(event_page):
+    """
+    Fill the free seats of one event from the waitlist.
+
+    Kept for callers that deal with a single event; see
+    ``promote_waitlist``.  Returns the first promoted EventRegistration
+    or None.
+    """
+    promoted = promote_waitlist([event_page])
+    return promoted[0] if promoted else None
@@ -2,25 +2,36 @@
 Views for the events app.
 
 Provides class-based views for event registration, cancellation,
-user registration lists, favorites management, and ICS calendar
-export.
+user registration lists, favorites management, ICS calendar
+export, staff roster exports and event-day check-in.
 """
 
 import hashlib
 import hmac
+import json
 import logging
+import tempfile
 
 from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
 from django.db import transaction
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
@@ -31,14 +42,16 @@ try:
 except ImportError:
     stripe_lib = None
 
+from apps.events.capacity import release_seat, reserve_seat
 from apps.events.forms import EventRegistrationForm, GuestRegistrationForm
 from apps.events.models import EventFavorite, EventRegistration
 from apps.events.utils import (
     calculate_price,
-    generate_ics,
-    generate_single_ics,
-    promote_from_waitlist,
+    ics_etag,
+    iter_ics,
+    promote_waitlist,
 )
+from apps.events.webhooks import record_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -151,7 +164,7 @@ class EventRegisterView(CreateView):
         pricing = calculate_price(event, user=user)
         payment_amount = pricing["final_price"]
 
-        # Determine status based on capacity (atomic to prevent race conditions)
+        # Status (registered / waitlist) is decided by reserve_seat() below
         max_attendees = event.max_attendees or 0
         registration = form.save(commit=False)
         registration.event = event
@@ -165,24 +178,20 @@ class EventRegisterView(CreateView):
             registration.payment_status = "paid"
             registration.payment_provider = "free"
 
-        with transaction.atomic():
-            if max_attendees > 0:
-                confirmed_count = (
-                    EventRegistration.objects.select_for_update()
-                    .filter(
-                        event=event,
-                        status__in=["registered", "confirmed"],
-                    )
-                    .count()
-                )
-                if confirmed_count >= max_attendees:
-                    registration.status = "waitlist"
-                else:
-                    registration.status = "registered"
-            else:
-                registration.status = "registered"
+        # Claim a seat with one conditional UPDATE on the capacity row
+        # (no registration rows are locked), then persist the registration.
+        try:
+            reserve_seat(registration, max_attendees)
+            with transaction.atomic():
+                registration.save()
+        except Exception:
+            release_seat(registration)
+            raise
 
-            registration.save()
+        if registration.status == "waitlist":
+            # Seats may have been freed (e.g. max_attendees raised) while
+            # people were waiting: fill them in waitlist order.
+            promote_waitlist(event)
 
         # Redirect to payment choice for paid events
         if payment_amount > 0 and user:
@@ -233,7 +242,7 @@ class EventCancelView(LoginRequiredMixin, View):
 
         # Promote from waitlist if a spot opened up
         if was_active:
-            promote_from_waitlist(registration.event)
+            promote_waitlist(registration.event)
 
         return redirect(reverse("events:my_registrations"))
 
@@ -359,6 +368,31 @@ class ToggleFavoriteView(LoginRequiredMixin, View):
 # ---------------------------------------------------------------------------
 
 
+def _ics_response(
+    request, events, filename, disposition="inline", extra="", **ics_kwargs
+):
+    """
+    Stream an ICS calendar for *events*, or answer 304 if unchanged.
+
+    The ETag is derived from the feed's events and their publish times
+    (see ``ics_etag``), so polling calendar apps get a 304 without the
+    calendar being serialized.
+    """
+    etag = quote_etag(ics_etag(events, extra=extra))
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        iter_ics(events, **ics_kwargs),
+        content_type="text/calendar; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    response["ETag"] = etag
+    return response
+
+
 class EventICSView(View):
     """Export a single event as an ICS file download."""
 
@@ -368,16 +402,17 @@ class EventICSView(View):
         if not event_page.start_date:
             raise Http404
 
-        ics_content = generate_single_ics(event_page)
-        response = HttpResponse(ics_content, content_type="text/calendar")
-        response["Content-Disposition"] = (
-            f'attachment; filename="event-{event_pk}.ics"'
+        return _ics_response(
+            request,
+            [event_page],
+            f"event-{event_pk}.ics",
+            disposition="attachment",
+            prodid="-//ClubCMS//Event//EN",
         )
-        return response
 
 
 # ---------------------------------------------------------------------------
-# 8. MyEventsICSView — export all favorites as ICS feed (token auth)
+# 8. ICS feeds — favorites (token auth) and public club calendar
 # ---------------------------------------------------------------------------
 
 
@@ -437,10 +472,49 @@ class MyEventsICSView(View):
         )
         events = [fav.event for fav in favorites if fav.event.start_date]
 
-        ics_content = generate_ics(events)
-        response = HttpResponse(ics_content, content_type="text/calendar")
-        response["Content-Disposition"] = 'inline; filename="my-events.ics"'
-        return response
+        return _ics_response(
+            request,
+            events,
+            "my-events.ics",
+            extra=f"user-{user.pk}",
+            calname="My Favorite Events",
+        )
+
+
+# Past events kept in the public feed
+CLUB_ICS_PAST_DAYS = 90
+
+
+class ClubEventsICSView(View):
+    """
+    Public ICS feed of the club's live events.
+
+    Covers upcoming events and those of the last ``CLUB_ICS_PAST_DAYS``
+    days, served from the same per-event fragment cache as the member
+    feeds.
+
+    Usage: /events/calendar.ics
+    """
+
+    def get(self, request):
+        from apps.website.models.pages import EventDetailPage
+
+        since = timezone.now() - timedelta(days=CLUB_ICS_PAST_DAYS)
+        events = list(
+            EventDetailPage.objects.live()
+            .public()
+            .filter(start_date__gte=since)
+            .defer_streamfields()
+            .order_by("start_date")
+        )
+
+        return _ics_response(
+            request,
+            events,
+            "club-events.ics",
+            extra="club",
+            calname=str(_("Club Events")),
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -496,7 +570,7 @@ class PaymentChoiceView(LoginRequiredMixin, View):
 
     def _setup_bank_transfer(self, request, registration, payment_settings):
         """Set up bank transfer payment and redirect to instructions."""
-        from apps.events.payment import generate_payment_reference
+        from apps.events.payment import assign_payment_reference
 
         now = timezone.now()
         expiry_days = payment_settings.bank_transfer_expiry_days or 5
@@ -509,10 +583,12 @@ class PaymentChoiceView(LoginRequiredMixin, View):
                 expires_at = max_expires
 
         registration.payment_provider = "bank_transfer"
-        registration.payment_reference = generate_payment_reference(registration)
         registration.payment_expires_at = expires_at
-        registration.save(
-            update_fields=["payment_provider", "payment_reference", "payment_expires_at"]
+        assign_payment_reference(
+            registration,
+            update_fields=[
+                "payment_provider", "payment_reference", "payment_expires_at"
+            ],
         )
 
         # Send bank transfer instructions notification
@@ -662,10 +738,8 @@ class PaymentSuccessView(LoginRequiredMixin, View):
         """Poll Stripe to check if the checkout session completed."""
         try:
             from apps.website.models.settings import PaymentSettings
-            from wagtail.models import Site
 
-            site = Site.objects.get(is_default_site=True)
-            payment_settings = PaymentSettings.for_site(site)
+            payment_settings = PaymentSettings.for_default_site()
             stripe_lib.api_key = payment_settings.stripe_secret_key
 
             session = stripe_lib.checkout.Session.retrieve(
@@ -709,25 +783,25 @@ class PaymentCancelView(LoginRequiredMixin, View):
 @method_decorator(csrf_exempt, name="dispatch")
 class StripeWebhookView(View):
     """
-    Handle Stripe webhook events.
+    Receive Stripe webhook events.
 
-    Verifies the webhook signature and processes checkout.session.completed
-    events to mark registrations as paid.
+    Verifies the webhook signature and stores checkout.session.completed
+    events for ``apps.events.webhooks.process_payment_webhooks``, which
+    marks the registrations as paid.  Returns 200 as soon as the event
+    is stored.
     """
 
     def post(self, request):
         from apps.website.models.settings import PaymentSettings
-        from wagtail.models import Site
 
         payload = request.body
         sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
 
-        site = Site.objects.filter(is_default_site=True).first()
-        if not site:
+        try:
+            payment_settings = PaymentSettings.for_default_site()
+        except PaymentSettings.DoesNotExist:
             return HttpResponse(status=400)
 
-        payment_settings = PaymentSettings.for_site(site)
-
         if not payment_settings.stripe_webhook_secret:
             return HttpResponse(status=400)
 
@@ -738,26 +812,8 @@ class StripeWebhookView(View):
         except (ValueError, stripe_lib.error.SignatureVerificationError):
             return HttpResponse(status=400)
 
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            session_id = session["id"]
-
-            try:
-                registration = EventRegistration.objects.get(
-                    payment_session_id=session_id,
-                    payment_provider="stripe",
-                )
-                if registration.payment_status != "paid":
-                    registration.payment_status = "paid"
-                    registration.payment_id = session.get("payment_intent", "")
-                    registration.save(
-                        update_fields=["payment_status", "payment_id"]
-                    )
-            except EventRegistration.DoesNotExist:
-                logger.warning(
-                    "Stripe webhook: no registration found for session %s",
-                    session_id,
-                )
+        # Persist and acknowledge; registrations are updated by the worker
+        record_webhook_event("stripe", event)
 
         return HttpResponse(status=200)
 
@@ -813,3 +869,155 @@ class PayPalReturnView(LoginRequiredMixin, View):
             )
 
         return redirect(reverse("events:payment_cancel", args=[pk]))
+
+
+# ---------------------------------------------------------------------------
+# 14. Roster exports (staff only)
+# ---------------------------------------------------------------------------
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class RegistrationExportView(View):
+    """
+    Stream the attendee roster of an event as CSV or XLSX.
+
+    Usage: /events/export/<event_pk>/?format=csv|xlsx&waitlist=1
+    """
+
+    def get(self, request, event_pk):
+        from apps.events import exports
+
+        event_page = _get_event_page(event_pk)
+        include_waitlist = request.GET.get("waitlist") == "1"
+        export_format = request.GET.get("format", "csv")
+        filename = f"roster-{event_page.slug}"
+
+        if export_format == "xlsx":
+            if not exports.xlsx_available():
+                raise Http404
+            # Spools to disk past 1 MB, so large rosters never sit in memory
+            fileobj = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+            exports.write_roster_xlsx(event_page, fileobj, include_waitlist)
+            fileobj.seek(0)
+            return FileResponse(
+                fileobj,
+                as_attachment=True,
+                filename=f"{filename}.xlsx",
+                content_type=(
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                ),
+            )
+
+        response = StreamingHttpResponse(
+            exports.iter_roster_csv(event_page, include_waitlist),
+            content_type="text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+        return response
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class CheckinSheetView(View):
+    """Printable check-in sheet of an event (pre-rendered, cached)."""
+
+    def get(self, request, event_pk):
+        from apps.events.exports import render_checkin_sheet
+
+        event_page = _get_event_page(event_pk)
+        return HttpResponse(render_checkin_sheet(event_page))
+
+
+# ---------------------------------------------------------------------------
+# 15. Event-day check-in — tickets, scanner, roster snapshot, bulk sync
+# ---------------------------------------------------------------------------
+
+
+class RegistrationTicketView(LoginRequiredMixin, View):
+    """QR ticket (PNG) of the user's own active registration."""
+
+    def get(self, request, pk):
+        from apps.events.checkin import make_ticket_qr
+
+        registration = get_object_or_404(
+            EventRegistration,
+            pk=pk,
+            user=request.user,
+            status__in=("registered", "confirmed"),
+        )
+        image = make_ticket_qr(registration)
+        if image is None:
+            raise Http404
+        response = HttpResponse(image, content_type="image/png")
+        response["Cache-Control"] = "private, max-age=3600"
+        return response
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class CheckinScannerView(View):
+    """
+    Gate scanner page.
+
+    Downloads the roster snapshot once and validates scans in the
+    browser; check-ins are queued locally and synced in batches.
+    """
+
+    def get(self, request, event_pk):
+        from django.shortcuts import render
+
+        from apps.events.checkin import DIGEST_LENGTH, SYNC_BATCH_SIZE
+
+        event_page = _get_event_page(event_pk)
+        return render(
+            request,
+            "events/checkin_scanner.html",
+            {
+                "event": event_page,
+                "digest_length": DIGEST_LENGTH,
+                "sync_batch_size": SYNC_BATCH_SIZE,
+            },
+        )
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class CheckinRosterView(View):
+    """
+    Roster snapshot of an event as JSON, revalidated with its ETag.
+
+    Usage: /events/checkin/<event_pk>/roster.json
+    """
+
+    def get(self, request, event_pk):
+        from apps.events.checkin import get_roster_snapshot
+
+        event_page = _get_event_page(event_pk)
+        snapshot = get_roster_snapshot(event_page)
+        etag = quote_etag(snapshot["version"])
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(snapshot)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class CheckinSyncView(View):
+    """
+    Upload a batch of offline scans.
+
+    Body: {"checkins": [{"ticket": "CHK-...", "at": "<iso8601>"}, ...]}
+    """
+
+    def post(self, request, event_pk):
+        from apps.events.checkin import apply_checkins
+
+        event_page = _get_event_page(event_pk)
+        try:
+            scans = json.loads(request.body)["checkins"]
+        except (ValueError, KeyError, TypeError):
+            return HttpResponse(status=400)
+        if not isinstance(scans, list):
+            return HttpResponse(status=400)
+
+        return JsonResponse(apply_checkins(event_page, scans))
@@ -1,13 +1,17 @@
 """
 Wagtail hooks for the events app.
 
-Registers the EventRegistration ModelViewSet with the Wagtail admin
-and adds PricingTier as an InlinePanel on EventDetailPage.
+Registers the EventRegistration ModelViewSet and the bank
+reconciliation view with the Wagtail admin and adds PricingTier as an
+InlinePanel on EventDetailPage.
 """
 
+from django.urls import path, reverse
+from django.utils.translation import gettext_lazy as _
 from wagtail import hooks
+from wagtail.admin.menu import MenuItem
 
-from apps.events.admin import event_registration_viewset
+from apps.events.admin import BankReconciliationView, event_registration_viewset
 
 
 @hooks.register("register_admin_viewset")
@@ -15,6 +19,32 @@ def register_event_registration_viewset():
     return event_registration_viewset
 
 
+class ReconciliationMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.has_perm("events.change_eventregistration")
+
+
+@hooks.register("register_admin_urls")
+def register_reconciliation_url():
+    return [
+        path(
+            "events/reconcile/",
+            BankReconciliationView.as_view(),
+            name="events_reconcile",
+        ),
+    ]
+
+
+@hooks.register("register_admin_menu_item")
+def register_reconciliation_menu_item():
+    return ReconciliationMenuItem(
+        _("Bank reconciliation"),
+        reverse("events_reconcile"),
+        icon_name="doc-full",
+        order=260,
+    )
+
+
 @hooks.register("construct_page_action_menu")
 def add_pricing_tiers_panel(menu_items, request, context):
     """
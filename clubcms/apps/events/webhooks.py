@@ -0,0 +1,242 @@
+"""
+Payment webhook ingestion and processing.
+
+Webhook views only verify the provider signature and call
+``record_webhook_event``: a single ``INSERT ... ON CONFLICT DO NOTHING``
+keyed by the provider's event ID, then 200.  Applying the events to
+registrations happens in ``process_payment_webhooks``, which works
+through the queue in batches.
+
+``process_payment_webhooks`` is a standalone callable for Django-Q2: it
+is queued with ``async_task`` after an ingest and must also be scheduled
+every minute (see ``idea/91-NOTIFICATIONS.md``), which guarantees that
+every stored event is applied.  The queueing is only a latency shortcut:
+it is skipped for ``WEBHOOK_TASK_DEBOUNCE`` seconds after a task was
+queued, so a burst of webhooks is applied by one task.
+
+Without Django-Q2 installed nothing would ever run the queue, so the
+events are applied in the request instead, as before the queue existed.
+"""
+
+import hashlib
+import hmac
+import logging
+import time
+
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.events.checkin import invalidate_checkin_caches
+from apps.events.models import EventRegistration, PaymentWebhookEvent
+from apps.events.payment import notify_payment_confirmed
+
+logger = logging.getLogger(__name__)
+
+# Stripe event types worth storing; anything else is acknowledged and dropped
+HANDLED_STRIPE_EVENTS = ("checkout.session.completed",)
+
+# Webhook events applied per transaction
+WEBHOOK_BATCH_SIZE = 200
+
+# Failed batches are retried this many times before events are marked failed
+WEBHOOK_MAX_ATTEMPTS = 5
+
+WEBHOOK_TASK_DEBOUNCE = 5
+
+_TASK_QUEUED_KEY = "events_webhook_task_queued"
+
+
+# ---------------------------------------------------------------------------
+# 1. Ingestion (request path)
+# ---------------------------------------------------------------------------
+
+
+def record_webhook_event(provider, event, enqueue=True):
+    """
+    Persist a verified webhook *event* for later processing.
+
+    Retries of an event that was already received are dropped by the
+    ``(provider, event_id)`` unique constraint without an extra query.
+    With *enqueue* the queue is then processed (see
+    ``enqueue_webhook_processing``).  Returns False if the event type is
+    not handled.
+    """
+    if event["type"] not in HANDLED_STRIPE_EVENTS:
+        return False
+    PaymentWebhookEvent.objects.bulk_create(
+        [
+            PaymentWebhookEvent(
+                provider=provider,
+                event_id=event["id"],
+                event_type=event["type"],
+                payload=event,
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    if enqueue:
+        enqueue_webhook_processing()
+    return True
+
+
+def enqueue_webhook_processing():
+    """
+    Queue ``process_payment_webhooks`` on the Django-Q2 cluster.
+
+    When django-q is not installed the pending events are applied right
+    away instead.  Otherwise nothing is queued if a task was queued in
+    the last few seconds (the key lives in the shared cache); should the
+    debounce ever drop a run, the every-minute schedule catches up.
+    """
+    if not django_apps.is_installed("django_q"):
+        process_payment_webhooks()
+        return
+    if not cache.add(_TASK_QUEUED_KEY, True, WEBHOOK_TASK_DEBOUNCE):
+        return
+
+    from django_q.tasks import async_task
+
+    transaction.on_commit(
+        lambda: async_task(
+            "apps.events.webhooks.process_payment_webhooks",
+            group="payment_webhooks",
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# 2. Processing (worker)
+# ---------------------------------------------------------------------------
+
+
+def process_payment_webhooks(batch_size=WEBHOOK_BATCH_SIZE):
+    """
+    Apply pending webhook events in batches.
+
+    Each batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` (so
+    parallel workers never share events), applied with one registration
+    query and one ``bulk_update``, and marked done with one ``UPDATE``
+    per outcome.  Payment confirmations are queued with one
+    ``bulk_create`` per batch.
+
+    Returns:
+        int: Number of webhook events handled.
+    """
+    cache.delete(_TASK_QUEUED_KEY)
+    pending = PaymentWebhookEvent.objects.filter(status="pending").order_by("pk")
+
+    handled = 0
+    while True:
+        batch = []
+        try:
+            with transaction.atomic():
+                batch = list(pending.select_for_update(skip_locked=True)[:batch_size])
+                if not batch:
+                    break
+                paid = _apply_batch(batch)
+        except Exception:
+            logger.exception("Failed to apply %d payment webhook(s)", len(batch))
+            _record_failure(batch)
+            break
+
+        # bulk_update bypasses post_save: refresh the check-in caches here
+        invalidate_checkin_caches(reg.event_id for reg in paid)
+        notify_payment_confirmed(paid)
+        handled += len(batch)
+        logger.info("Applied %d payment webhook(s), %d newly paid.", handled, len(paid))
+        if len(batch) < batch_size:
+            break
+
+    return handled
+
+
+def _apply_batch(batch):
+    """Apply one locked batch; return the registrations newly marked paid."""
+    now = timezone.now()
+
+    # Retries carry the same session: the first event per session wins
+    sessions = {}
+    for webhook in batch:
+        session = webhook.payload["data"]["object"]
+        sessions.setdefault(session["id"], session.get("payment_intent") or "")
+
+    registrations = {
+        reg.payment_session_id: reg
+        for reg in EventRegistration.objects.select_for_update(of=("self",))
+        .filter(payment_provider="stripe", payment_session_id__in=sessions)
+        .select_related("event", "user")
+    }
+
+    paid = []
+    for session_id, payment_intent in sessions.items():
+        reg = registrations.get(session_id)
+        if reg is None or reg.payment_status == "paid":
+            continue
+        reg.payment_status = "paid"
+        reg.payment_id = payment_intent
+        paid.append(reg)
+    if paid:
+        EventRegistration.objects.bulk_update(paid, ["payment_status", "payment_id"])
+
+    matched = []
+    unmatched = []
+    for webhook in batch:
+        if webhook.payload["data"]["object"]["id"] in registrations:
+            matched.append(webhook.pk)
+        else:
+            unmatched.append(webhook)
+    PaymentWebhookEvent.objects.filter(pk__in=matched).update(
+        status="processed",
+        processed_at=now,
+        attempts=F("attempts") + 1,
+    )
+    if unmatched:
+        for webhook in unmatched:
+            logger.warning(
+                "Stripe webhook %s: no registration found for session %s",
+                webhook.event_id,
+                webhook.payload["data"]["object"]["id"],
+            )
+        PaymentWebhookEvent.objects.filter(pk__in=[w.pk for w in unmatched]).update(
+            status="ignored",
+            processed_at=now,
+            attempts=F("attempts") + 1,
+            error_message="No registration found for this checkout session.",
+        )
+    return paid
+
+
+def _record_failure(batch):
+    """Count a failed attempt; give up on events that keep failing."""
+    if not batch:
+        return
+    ids = [webhook.pk for webhook in batch]
+    PaymentWebhookEvent.objects.filter(pk__in=ids).update(attempts=F("attempts") + 1)
+    PaymentWebhookEvent.objects.filter(
+        pk__in=ids, attempts__gte=WEBHOOK_MAX_ATTEMPTS
+    ).update(status="failed", error_message="Gave up after repeated failures.")
+
+
+# ---------------------------------------------------------------------------
+# 3. Fake signer (tests and benchmarks)
+# ---------------------------------------------------------------------------
+
+
+def fake_stripe_signature(payload, secret, timestamp=None):
+    """
+    Return a ``Stripe-Signature`` header for *payload* signed with *secret*.
+
+    Uses Stripe's v1 scheme (HMAC-SHA256 of ``"{timestamp}.{payload}"``),
+    so ``stripe.Webhook.construct_event`` accepts it.
+    """
+    if timestamp is None:
+        timestamp = int(time.time())
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
@@ -0,0 +1,102 @@
+"""
+Per-user entitlement snapshots.
+
+The privileges a member gets from their products (vote, upload, event
+registration, maximum discount) are computed with a single aggregate
+query, memoized on the user instance for the rest of the request and
+kept in the default Django cache (shared by all processes) across
+requests.
+
+Snapshots are dropped when a user's products change, when the user is
+saved (e.g. ``membership_expiry`` edited) and when a product's grants
+change (see ``apps.members.signals``).  Privileges gate access, so the
+snapshots also expire after a few minutes, bounding staleness should an
+invalidation be missed (e.g. a queryset ``update``).
+"""
+
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+ENTITLEMENTS_CACHE_TIMEOUT = 60 * 5
+
+_PRODUCTS = "products"
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    """Product privileges of one user."""
+
+    can_vote: bool = False
+    can_upload: bool = False
+    can_register_events: bool = False
+    max_discount_percent: int = 0
+    membership_expiry: object = None  # date the snapshot was computed for
+
+
+def _cache_key(user_id):
+    return f"members_entitlements_{user_id}"
+
+
+def _from_products(products, membership_expiry):
+    """Build a snapshot from in-memory Product instances."""
+    discounts = [p.discount_percent for p in products if p.grants_discount]
+    return Entitlements(
+        can_vote=any(p.grants_vote for p in products),
+        can_upload=any(p.grants_upload for p in products),
+        can_register_events=any(p.grants_events for p in products),
+        max_discount_percent=max(discounts, default=0) or 0,
+        membership_expiry=membership_expiry,
+    )
+
+
+def _query(user):
+    """Compute the snapshot with one aggregate over the user's products."""
+    totals = user.products.aggregate(
+        vote=Count("pk", filter=Q(grants_vote=True)),
+        upload=Count("pk", filter=Q(grants_upload=True)),
+        events=Count("pk", filter=Q(grants_events=True)),
+        max_discount=Max("discount_percent", filter=Q(grants_discount=True)),
+    )
+    return Entitlements(
+        can_vote=bool(totals["vote"]),
+        can_upload=bool(totals["upload"]),
+        can_register_events=bool(totals["events"]),
+        max_discount_percent=totals["max_discount"] or 0,
+        membership_expiry=user.membership_expiry,
+    )
+
+
+def get_entitlements(user):
+    """
+    Return the ``Entitlements`` snapshot for *user*.
+
+    Products assigned in memory but not yet written to the database
+    (``ParentalManyToManyField`` defers them) are evaluated directly and
+    never cached.
+    """
+    pending = getattr(user, "_cluster_related_objects", {})
+    if _PRODUCTS in pending:
+        return _from_products(pending[_PRODUCTS], user.membership_expiry)
+
+    snapshot = user.__dict__.get("_entitlements")
+    if snapshot is not None and snapshot.membership_expiry == user.membership_expiry:
+        return snapshot
+
+    if not user.pk:
+        snapshot = Entitlements(membership_expiry=user.membership_expiry)
+    else:
+        key = _cache_key(user.pk)
+        snapshot = cache.get(key)
+        if snapshot is None or snapshot.membership_expiry != user.membership_expiry:
+            snapshot = _query(user)
+            cache.set(key, snapshot, ENTITLEMENTS_CACHE_TIMEOUT)
+
+    user.__dict__["_entitlements"] = snapshot
+    return snapshot
+
+
+def invalidate_entitlements(user_ids):
+    """Drop the cached snapshots of the given users."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
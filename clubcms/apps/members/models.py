@@ -168,21 +168,25 @@ class ClubUser(AbstractUser):
             return None
         return (self.membership_expiry - timezone.now().date()).days
 
+    @property
+    def entitlements(self):
+        """Product privileges snapshot; see ``apps.members.entitlements``."""
+        from apps.members.entitlements import get_entitlements
+
+        return get_entitlements(self)
+
     @property
     def can_vote(self):
-        return self.products.filter(grants_vote=True).exists()
+        return self.entitlements.can_vote
 
     @property
     def can_upload(self):
-        return self.products.filter(grants_upload=True).exists()
+        return self.entitlements.can_upload
 
     @property
     def can_register_events(self):
-        return self.products.filter(grants_events=True).exists()
+        return self.entitlements.can_register_events
 
     @property
     def max_discount_percent(self):
-        result = self.products.filter(grants_discount=True).aggregate(
-            max_discount=models.Max("discount_percent")
-        )
-        return result["max_discount"] or 0
+        return self.entitlements.max_discount_percent
@@ -5,13 +5,19 @@ Post-save signal on ClubUser:
 - Auto-generates card_number (YYYY-NNNN format) when membership_date
   is set and card_number is empty.
 - Regenerates QR code and barcode when card_number changes.
+- Drops the cached entitlement snapshot.
+
+Product / membership changes also drop the affected snapshots.
 """
 
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
 
+from apps.members.entitlements import invalidate_entitlements
+from apps.members.models import ClubUser
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,6 +40,10 @@ def handle_clubuser_post_save(sender, instance, created, **kwargs):
         generate_qr_code,
     )
 
+    # Products or membership_expiry may have changed
+    instance.__dict__.pop("_entitlements", None)
+    invalidate_entitlements([instance.pk])
+
     update_fields = {}
 
     # Auto-generate card number if membership_date is set but card_number is empty
@@ -62,3 +72,29 @@ def handle_clubuser_post_save(sender, instance, created, **kwargs):
             logger.exception(
                 "Failed to generate barcode for user %s", instance.pk
             )
+
+
+@receiver(m2m_changed, sender=ClubUser.products.through)
+def invalidate_entitlements_on_products_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Drop entitlement snapshots when user <-> product links change."""
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        instance.__dict__.pop("_entitlements", None)
+        invalidate_entitlements([instance.pk])
+    elif action == "pre_clear":
+        # pk_set is not provided on clear: collect members beforehand
+        invalidate_entitlements(instance.members.values_list("pk", flat=True))
+    elif pk_set:
+        invalidate_entitlements(pk_set)
+
+
+@receiver(post_save, sender="website.Product")
+@receiver(pre_delete, sender="website.Product")
+def invalidate_entitlements_on_product_change(sender, instance, raw=False, **kwargs):
+    """Drop the snapshots of every member holding an edited product."""
+    if raw or not instance.pk:
+        return
+    invalidate_entitlements(instance.members.values_list("pk", flat=True))
@@ -0,0 +1,118 @@
+"""
+Tests for ClubUser entitlement snapshots.
+
+Tests that product privileges are loaded with one query, cached across
+requests and invalidated when products or membership change.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def _assign(user, *products):
+    """Write product links to the database (not deferred in memory)."""
+    user.products.get_original_manager().add(*products)
+
+
+def _reload(user):
+    return User.objects.get(pk=user.pk)
+
+
+@pytest.mark.django_db
+class TestEntitlementSnapshot:
+    """All privilege properties share one snapshot."""
+
+    def test_one_query_for_all_flags(
+        self, user_factory, product_factory, django_assert_num_queries
+    ):
+        user = user_factory()
+        _assign(
+            user,
+            product_factory(
+                grants_vote=True, grants_discount=True, discount_percent=10
+            ),
+            product_factory(
+                grants_events=True, grants_discount=True, discount_percent=25
+            ),
+        )
+        user = _reload(user)
+
+        with django_assert_num_queries(1):
+            assert user.can_vote is True
+            assert user.can_upload is False
+            assert user.can_register_events is True
+            assert user.max_discount_percent == 25
+
+    def test_cached_across_instances(
+        self, user_factory, product_factory, django_assert_num_queries
+    ):
+        user = user_factory()
+        _assign(user, product_factory(grants_upload=True))
+        assert _reload(user).can_upload is True
+
+        fresh = _reload(user)
+        with django_assert_num_queries(0):
+            assert fresh.can_upload is True
+
+    def test_pending_products_evaluated_in_memory(self, active_member):
+        """Products added through the deferring manager count immediately."""
+        assert active_member.can_vote is True
+        assert active_member.max_discount_percent == 15
+
+    def test_no_products(self, user_factory):
+        user = _reload(user_factory())
+
+        assert user.can_vote is False
+        assert user.max_discount_percent == 0
+
+
+@pytest.mark.django_db
+class TestEntitlementInvalidation:
+    """Snapshots are dropped when their inputs change."""
+
+    def test_product_assignment_invalidates(self, user_factory, product_factory):
+        user = user_factory()
+        assert _reload(user).can_vote is False
+
+        _assign(user, product_factory(grants_vote=True))
+
+        assert _reload(user).can_vote is True
+
+    def test_product_removal_from_product_side(self, user_factory, product_factory):
+        product = product_factory(grants_events=True)
+        user = user_factory()
+        _assign(user, product)
+        assert _reload(user).can_register_events is True
+
+        product.members.remove(user)
+
+        assert _reload(user).can_register_events is False
+
+    def test_product_grant_change_invalidates(self, user_factory, product_factory):
+        product = product_factory(grants_discount=True, discount_percent=5)
+        user = user_factory()
+        _assign(user, product)
+        assert _reload(user).max_discount_percent == 5
+
+        product.discount_percent = 30
+        product.save()
+
+        assert _reload(user).max_discount_percent == 30
+
+    def test_membership_expiry_edit_invalidates(self, user_factory, product_factory):
+        user = user_factory(membership_expiry=date.today() + timedelta(days=10))
+        _assign(user, product_factory(grants_vote=True))
+        assert _reload(user).can_vote is True
+        user.products.get_original_manager().through.objects.all().delete()
+
+        # Links removed behind the signal's back: only the expiry edit
+        # forces the stale snapshot out.
+        user = _reload(user)
+        user.membership_expiry = date.today() + timedelta(days=400)
+        user.save()
+
+        assert _reload(user).can_vote is False
@@ -0,0 +1,282 @@
+"""
+Claim-based consumer for the notification queue.
+
+Workers never share entries: each batch is claimed atomically by
+switching it to ``status='processing'`` with a fresh ``claim_token``
+and a lease (``claimed_at``).  Candidates are selected with
+``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it;
+on SQLite, which serializes writers, the conditional
+``UPDATE ... WHERE status='pending'`` alone guarantees that a row is
+claimed once.  Entries whose worker died are returned to the queue
+once their lease expires.
+
+Entries are claimed in priority order (``priority``, then age), so
+urgent types overtake bulk announcements in every batch.  Creating an
+urgent entry also queues ``drain_urgent``, which claims only the urgent
+lane and delivers it within seconds instead of waiting for the next
+scheduled run.  Delivery never runs in the request that creates the
+entries: without Django-Q2 nothing is queued.
+
+Within a batch, pushes are delivered on a background thread while the
+emails go out over one SMTP connection.  Several consumers can run at
+once (``start_consumers`` queues one per Django-Q2 worker when the
+backlog warrants it), so throughput scales with ``Q_CLUSTER["workers"]``;
+without django-q installed only the calling process consumes.  Entries
+claimed by a running consumer count towards the rate limits of the
+batches claimed after them.
+"""
+
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .dispatch import EmailDispatcher
+from .models import PRIORITY_URGENT, NotificationQueue
+from .push import PushDispatcher
+from .ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Entries claimed per batch
+CLAIM_BATCH_SIZE = 200
+
+# Claims older than this are considered abandoned and released
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Seconds a consumer keeps claiming batches (below Q_CLUSTER["timeout"])
+DRAIN_TIME_BUDGET = 45
+
+# Urgent lane: small batches, short runs
+URGENT_BATCH_SIZE = 50
+URGENT_TIME_BUDGET = 20
+
+_CONSUMERS_QUEUED_KEY = "notifications_consumers_queued"
+_URGENT_QUEUED_KEY = "notifications_urgent_queued"
+
+
+# ---------------------------------------------------------------------------
+# 1. Claims
+# ---------------------------------------------------------------------------
+
+
+def due_notifications(now=None, max_priority=None):
+    """
+    Pending entries whose ``scheduled_for`` has passed (or is unset),
+    limited to priorities up to *max_priority* if given.
+    """
+    now = now or timezone.now()
+    due = NotificationQueue.objects.filter(
+        Q(scheduled_for__isnull=True) | Q(scheduled_for__lte=now),
+        status="pending",
+    )
+    if max_priority is not None:
+        due = due.filter(priority__lte=max_priority)
+    return due
+
+
+def claim_batch(limit=CLAIM_BATCH_SIZE, now=None, max_priority=None):
+    """
+    Claim up to *limit* due entries for this worker, most urgent and
+    then oldest first.
+
+    Returns:
+        list[NotificationQueue]: The claimed entries, recipients loaded.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        candidates = due_notifications(now, max_priority).order_by(
+            "priority", "created_at"
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list("pk", flat=True)[:limit])
+        token = mark_claimed(ids, now)
+    return list(
+        NotificationQueue.objects.filter(pk__in=ids, claim_token=token)
+        .select_related("recipient")
+        .order_by("priority", "created_at")
+    )
+
+
+def mark_claimed(ids, now):
+    """
+    Switch the still pending entries among *ids* to ``processing``.
+
+    Returns the claim token written to them; entries another worker
+    claimed first are left alone.
+    """
+    token = uuid.uuid4().hex
+    NotificationQueue.objects.filter(pk__in=ids, status="pending").update(
+        status="processing", claimed_at=now, claim_token=token
+    )
+    return token
+
+
+def release_expired_claims(now=None, lease=CLAIM_LEASE):
+    """Return entries claimed more than *lease* ago to the queue."""
+    now = now or timezone.now()
+    released = NotificationQueue.objects.filter(
+        status="processing", claimed_at__lt=now - lease
+    ).update(status="pending", claimed_at=None, claim_token="")
+    if released:
+        logger.warning("Released %d notification(s) with expired claims", released)
+    return released
+
+
+# ---------------------------------------------------------------------------
+# 2. Processing
+# ---------------------------------------------------------------------------
+
+
+def process_batch(notifications, now=None):
+    """
+    Deliver a claimed batch; every entry leaves ``processing``.
+
+    Returns:
+        tuple: ``(sent, not_sent)`` counts.
+    """
+    now = now or timezone.now()
+    by_channel = {}
+    for notification in notifications:
+        by_channel.setdefault(notification.channel, []).append(notification)
+
+    # One query for the rate-limit counters of the whole batch, including
+    # entries claimed earlier by consumers running alongside this one
+    claim = None
+    if notifications and notifications[0].claim_token:
+        claim = (notifications[0].claimed_at, notifications[0].claim_token)
+    limiter = RateLimiter(now, claim)
+    limiter.preload({
+        n.recipient_id for n in notifications if n.channel in ("email", "push")
+    })
+
+    # Pushes travel on a background thread (network only) while the
+    # emails are sent here; ORM work stays on this thread.
+    push = PushDispatcher(limiter)
+    push_batch = push.prepare(by_channel.pop("push", []))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        delivery = executor.submit(push.deliver, push_batch)
+        sent, not_sent = EmailDispatcher(limiter).dispatch(by_channel.pop("email", []))
+        push_sent, push_not_sent = push.finish(push_batch, delivery.result())
+    sent += push_sent
+    not_sent += push_not_sent
+
+    # In-app notifications are marked sent immediately
+    in_app = by_channel.pop("in_app", [])
+    if in_app:
+        NotificationQueue.objects.filter(pk__in=[n.pk for n in in_app]).update(
+            status="sent", sent_at=now
+        )
+        sent += len(in_app)
+
+    for channel, unknown in by_channel.items():
+        NotificationQueue.objects.filter(pk__in=[n.pk for n in unknown]).update(
+            status="skipped", error_message=f"Unknown channel: {channel}"
+        )
+        not_sent += len(unknown)
+
+    return sent, not_sent
+
+
+def drain_queue(
+    time_budget=DRAIN_TIME_BUDGET, batch_size=CLAIM_BATCH_SIZE, max_priority=None
+):
+    """
+    Claim and process batches until the queue (or the lanes up to
+    *max_priority*) is empty or *time_budget* seconds have passed.
+
+    Returns:
+        dict: ``sent`` and ``failed`` (failed or skipped) counts.
+    """
+    release_expired_claims()
+    deadline = time.monotonic() + time_budget
+    sent = failed = 0
+    while time.monotonic() < deadline:
+        batch = claim_batch(batch_size, max_priority=max_priority)
+        if not batch:
+            break
+        batch_sent, batch_failed = process_batch(batch)
+        sent += batch_sent
+        failed += batch_failed
+        if len(batch) < batch_size:
+            break
+
+    logger.info(
+        "Notification queue processed: %d sent, %d failed/skipped", sent, failed
+    )
+    return {"sent": sent, "failed": failed}
+
+
+def drain_urgent():
+    """
+    Deliver the urgent lane only (see ``enqueue_urgent_drain``).
+
+    Returns:
+        dict: ``sent`` and ``failed`` counts, as ``drain_queue``.
+    """
+    # Entries created from now on queue a new run
+    cache.delete(_URGENT_QUEUED_KEY)
+    return drain_queue(
+        URGENT_TIME_BUDGET, URGENT_BATCH_SIZE, max_priority=PRIORITY_URGENT
+    )
+
+
+def enqueue_urgent_drain():
+    """
+    Queue ``drain_urgent`` on the Django-Q2 cluster once the current
+    transaction commits.
+
+    A burst of urgent entries queues one task: further calls are
+    ignored until that task starts (the key lives in the shared cache,
+    and expires after ``URGENT_TIME_BUDGET`` should the task be lost;
+    ``process_urgent_notifications`` is also scheduled every minute).
+    Does nothing when django-q is not installed: this runs in web
+    requests, which must not deliver anything themselves.
+    """
+    if not django_apps.is_installed("django_q"):
+        return
+    if not cache.add(_URGENT_QUEUED_KEY, True, URGENT_TIME_BUDGET):
+        return
+
+    from django_q.tasks import async_task
+
+    transaction.on_commit(
+        lambda: async_task(
+            "apps.notifications.consumer.drain_urgent", group="notifications_urgent"
+        )
+    )
+
+
+def start_consumers(workers=None):
+    """
+    Queue extra ``drain_queue`` consumers on the Django-Q2 cluster.
+
+    Up to ``Q_CLUSTER["workers"] - 1`` are queued, one per full batch of
+    backlog, at most once per ``DRAIN_TIME_BUDGET``.  Does nothing when
+    django-q is not installed.
+
+    Returns:
+        int: Number of consumers queued.
+    """
+    if not django_apps.is_installed("django_q"):
+        return 0
+    if workers is None:
+        workers = getattr(settings, "Q_CLUSTER", {}).get("workers", 1)
+    extra = min(workers - 1, due_notifications().count() // CLAIM_BATCH_SIZE)
+    if extra <= 0 or not cache.add(_CONSUMERS_QUEUED_KEY, True, DRAIN_TIME_BUDGET):
+        return 0
+
+    from django_q.tasks import async_task
+
+    for _ in range(extra):
+        async_task("apps.notifications.consumer.drain_queue", group="notifications")
+    return extra
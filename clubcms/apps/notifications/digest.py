@@ -0,0 +1,171 @@
+"""
+Daily and weekly digest compilation.
+
+``send_digests`` builds every digest of one frequency in a single pass:
+
+- the recipients with pending email entries and that ``digest_frequency``
+  are listed first, then handled in chunks;
+- each chunk's entries are streamed in one query, ordered by recipient,
+  and grouped with a generator (``iter_digests``) so only one
+  recipient's entries are held at a time;
+- the digest template is compiled once and rendered per recipient;
+- every message goes over one connection (reopened if dropped);
+- included entries are marked sent after each chunk.
+"""
+
+import logging
+from itertools import groupby, islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .dispatch import send_message
+from .models import NotificationQueue
+from .rendering import get_email_template
+from .services import DIGEST_TEMPLATE, build_digest_html
+
+logger = logging.getLogger(__name__)
+
+# Most recent entries included in one digest; older ones wait for the next
+DIGEST_LIMITS = {"daily": 50, "weekly": 100}
+
+DIGEST_SUBJECTS = {"daily": "Daily digest", "weekly": "Weekly digest"}
+
+# Digests sent per chunk, and entries marked sent per UPDATE
+DIGEST_CHUNK_SIZE = 500
+
+# Rows fetched per round trip while streaming
+DIGEST_FETCH_SIZE = 2000
+
+
+# ---------------------------------------------------------------------------
+# 1. Grouping
+# ---------------------------------------------------------------------------
+
+
+def pending_digest_entries(frequency):
+    """
+    Pending email entries of active recipients with an address and the
+    given ``digest_frequency``, grouped by recipient, newest first.
+    """
+    return (
+        NotificationQueue.objects.filter(
+            status="pending",
+            channel="email",
+            recipient__digest_frequency=frequency,
+            recipient__is_active=True,
+        )
+        .exclude(recipient__email="")
+        .select_related("recipient")
+        .order_by("recipient_id", "-created_at", "-pk")
+    )
+
+
+def iter_digests(entries, limit):
+    """
+    Yield ``(user, notifications)`` per recipient from *entries* (ordered
+    by recipient), keeping the *limit* most recent notifications each.
+    """
+    rows = entries.iterator(chunk_size=DIGEST_FETCH_SIZE)
+    for _user_id, group in groupby(rows, key=attrgetter("recipient_id")):
+        notifications = list(islice(group, limit))
+        yield notifications[0].recipient, notifications
+
+
+# ---------------------------------------------------------------------------
+# 2. Sending
+# ---------------------------------------------------------------------------
+
+
+def build_digest_message(user, notifications, subject, template, connection=None):
+    """Return the digest ``EmailMultiAlternatives`` for *user*."""
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        body="\n".join(f"- {n.title}: {n.body}" for n in notifications),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+    html = build_digest_html(user, notifications, template)
+    msg.attach_alternative(html, "text/html")
+    return msg
+
+
+def mark_sent(ids, now, chunk_size=DIGEST_CHUNK_SIZE):
+    """Mark the entries in *ids* sent, one ``UPDATE`` per chunk."""
+    for start in range(0, len(ids), chunk_size):
+        NotificationQueue.objects.filter(pk__in=ids[start:start + chunk_size]).update(
+            status="sent", sent_at=now
+        )
+
+
+def digest_recipient_ids(frequency):
+    """Ids of the recipients with pending *frequency* digest entries."""
+    return list(
+        pending_digest_entries(frequency)
+        .order_by("recipient_id")
+        .values_list("recipient_id", flat=True)
+        .distinct()
+    )
+
+
+def send_digests(frequency, limit=None, connection=None, chunk_size=DIGEST_CHUNK_SIZE):
+    """
+    Compile and send the *frequency* (``"daily"`` or ``"weekly"``) digests.
+
+    Recipients are handled *chunk_size* at a time: their entries are
+    streamed, the digests sent, and the included entries marked sent
+    before the next chunk is read (writing to the table mid-stream is
+    unsafe on SQLite).  An interrupted run therefore resends at most one
+    chunk of digests.  A digest that fails to send leaves its entries
+    pending for the next run.
+
+    Returns:
+        int: Number of digests sent.
+    """
+    limit = limit or DIGEST_LIMITS[frequency]
+    now = timezone.now()
+    site_name = getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS")
+    date = now.strftime("%d/%m/%Y")
+    subject = f"[{site_name}] {DIGEST_SUBJECTS[frequency]} - {date}"
+    template = get_email_template(DIGEST_TEMPLATE)
+    connection = connection or get_connection()
+    recipient_ids = digest_recipient_ids(frequency)
+
+    done = []
+    sent = 0
+    opened = False
+    try:
+        for start in range(0, len(recipient_ids), chunk_size):
+            entries = pending_digest_entries(frequency).filter(
+                recipient_id__in=recipient_ids[start:start + chunk_size]
+            )
+            for user, notifications in iter_digests(entries, limit):
+                if not opened:
+                    connection.open()
+                    opened = True
+                try:
+                    message = build_digest_message(
+                        user, notifications, subject, template, connection
+                    )
+                    send_message(connection, message)
+                except Exception as exc:
+                    logger.exception(
+                        "Failed to send %s digest for user %s: %s",
+                        frequency, user.pk, exc,
+                    )
+                    continue
+                done.extend(n.pk for n in notifications)
+                sent += 1
+            mark_sent(done, now)
+            done = []
+    except Exception:
+        logger.exception("%s digest run aborted", frequency.capitalize())
+    finally:
+        if opened:
+            connection.close()
+        mark_sent(done, now)
+
+    return sent
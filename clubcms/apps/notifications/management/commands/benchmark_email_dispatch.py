@@ -0,0 +1,145 @@
+"""
+Management command to benchmark email delivery of the notification queue.
+
+Queues N email notifications (one throwaway user each, so no rate limit
+applies) and sends them to a local SMTP stand-in twice:
+
+    per-message -- send_email_notification, one SMTP session per email
+    dispatcher  -- EmailDispatcher, one session for the whole batch
+
+Every new session costs ``--handshake-ms``, standing in for the TLS
+handshake and AUTH of a real relay.  Users and notifications are
+deleted afterwards.
+
+Usage:
+    python manage.py benchmark_email_dispatch
+    python manage.py benchmark_email_dispatch --emails=500 --handshake-ms=80
+"""
+
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from apps.notifications.dispatch import EmailDispatcher
+from apps.notifications.models import NotificationQueue
+from apps.notifications.services import send_email_notification
+from apps.notifications.testing import LocalSMTPServer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-message vs batched notification email delivery"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--emails",
+            type=int,
+            default=200,
+            help="Number of email notifications per run (default: 200)",
+        )
+        parser.add_argument(
+            "--handshake-ms",
+            type=float,
+            default=30.0,
+            help="Simulated cost of opening an SMTP session (default: 30)",
+        )
+
+    def handle(self, *args, **options):
+        total = options["emails"]
+        run = uuid.uuid4().hex[:8]
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f"mailbench_{run}_{index}",
+                    email=f"bench{index}@example.com",
+                )
+                for index in range(total)
+            ],
+            batch_size=500,
+        )
+        users = User.objects.filter(username__startswith=f"mailbench_{run}_")
+        try:
+            with LocalSMTPServer(options["handshake_ms"] / 1000) as server:
+                with override_settings(
+                    EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                    EMAIL_HOST="127.0.0.1",
+                    EMAIL_PORT=server.port,
+                    EMAIL_USE_TLS=False,
+                    EMAIL_USE_SSL=False,
+                    EMAIL_HOST_USER="",
+                    EMAIL_HOST_PASSWORD="",
+                ):
+                    single = self._run(server, users, self._per_message)
+                    batched = self._run(server, users, self._dispatcher)
+        finally:
+            NotificationQueue.objects.filter(recipient__in=users).delete()
+            users.delete()
+
+        self._report(total, single, batched)
+
+    # -- runs ---------------------------------------------------------------
+
+    def _queue(self, users):
+        NotificationQueue.objects.filter(recipient__in=users).delete()
+        NotificationQueue.objects.bulk_create(
+            [
+                NotificationQueue(
+                    notification_type="news_published",
+                    recipient=user,
+                    channel="email",
+                    title="Benchmark",
+                    body="<p>Benchmark notification</p>",
+                )
+                for user in users
+            ],
+            batch_size=500,
+        )
+        return list(
+            NotificationQueue.objects.filter(recipient__in=users).select_related("recipient")
+        )
+
+    def _run(self, server, users, send):
+        notifications = self._queue(users)
+        connections, messages = server.connections, server.messages
+        start = time.perf_counter()
+        send(notifications)
+        elapsed = time.perf_counter() - start
+        sent = NotificationQueue.objects.filter(
+            recipient__in=users, status="sent"
+        ).count()
+        return {
+            "elapsed": elapsed,
+            "sent": sent,
+            "connections": server.connections - connections,
+            "messages": server.messages - messages,
+        }
+
+    def _per_message(self, notifications):
+        for notification in notifications:
+            send_email_notification(notification)
+
+    def _dispatcher(self, notifications):
+        EmailDispatcher().dispatch(notifications)
+
+    # -- reporting ----------------------------------------------------------
+
+    def _report(self, total, single, batched):
+        for label, result in (("Per-message", single), ("Dispatcher", batched)):
+            rate = result["sent"] / result["elapsed"] if result["elapsed"] else 0.0
+            self.stdout.write(
+                f"{label + ':':13} {result['sent']}/{total} sent in "
+                f"{result['elapsed']:.3f}s ({rate:.1f} msg/s), "
+                f"{result['connections']} SMTP session(s)"
+            )
+        if batched["sent"] == total and batched["elapsed"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Speed-up: {single['elapsed'] / batched['elapsed']:.1f}x"
+                )
+            )
+        else:
+            self.stdout.write(self.style.ERROR("Not every message was delivered"))
@@ -0,0 +1,123 @@
+"""
+Management command to benchmark the rendering of notification emails.
+
+Renders the HTML body of N emails (unsaved users and notifications, so
+nothing touches the database) twice:
+
+    per-email -- render_to_string of the full template for every email
+    renderer  -- EmailRenderer: each distinct notification rendered once,
+                 the unsubscribe token substituted per recipient
+
+``--distinct`` sets how many different notifications the N emails are
+spread over (1 = one announcement to N members).  Unsubscribe tokens
+are generated once, before timing, and shared by both runs, which must
+produce identical HTML.
+
+Usage:
+    python manage.py benchmark_email_render
+    python manage.py benchmark_email_render --emails=10000 --distinct=5
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from apps.notifications.models import NotificationQueue
+from apps.notifications.rendering import SINGLE_TEMPLATE, EmailRenderer
+from apps.notifications.services import generate_unsubscribe_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-email vs shared rendering of notification emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--emails",
+            type=int,
+            default=10000,
+            help="Number of emails to render per run (default: 10000)",
+        )
+        parser.add_argument(
+            "--distinct",
+            type=int,
+            default=1,
+            help="Number of different notifications among them (default: 1)",
+        )
+
+    def handle(self, *args, **options):
+        total = options["emails"]
+        distinct = max(1, options["distinct"])
+        notifications = [
+            NotificationQueue(
+                pk=index,
+                notification_type="news_published",
+                recipient=User(
+                    pk=index,
+                    username=f"bench{index}",
+                    email=f"bench{index}@example.com",
+                ),
+                channel="email",
+                title=f"Benchmark {index % distinct}",
+                body=f"<p>Benchmark notification {index % distinct}</p>\nSecond line",
+                url=f"/news/benchmark-{index % distinct}/",
+            )
+            for index in range(1, total + 1)
+        ]
+
+        tokens = [
+            generate_unsubscribe_token(n.recipient, n.notification_type)
+            for n in notifications
+        ]
+
+        per_email, naive = self._run(notifications, tokens, self._per_email)
+        shared, pipeline = self._run(notifications, tokens, self._renderer)
+        self._report(total, distinct, per_email, shared, naive == pipeline)
+
+    # -- runs ---------------------------------------------------------------
+
+    def _run(self, notifications, tokens, render):
+        start = time.perf_counter()
+        output = render(notifications, tokens)
+        return time.perf_counter() - start, output
+
+    def _per_email(self, notifications, tokens):
+        site_name = getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS")
+        base_url = getattr(settings, "WAGTAILADMIN_BASE_URL", "")
+        return [
+            render_to_string(
+                SINGLE_TEMPLATE,
+                {
+                    "notification": notification,
+                    "unsubscribe_token": token,
+                    "site_name": site_name,
+                    "base_url": base_url,
+                },
+            )
+            for notification, token in zip(notifications, tokens)
+        ]
+
+    def _renderer(self, notifications, tokens):
+        renderer = EmailRenderer()
+        return [
+            renderer.html(notification, token)
+            for notification, token in zip(notifications, tokens)
+        ]
+
+    # -- reporting ----------------------------------------------------------
+
+    def _report(self, total, distinct, per_email, shared, identical):
+        self.stdout.write(f"{total} emails, {distinct} distinct notification(s)")
+        for label, elapsed in (("Per-email", per_email), ("Renderer", shared)):
+            rate = total / elapsed if elapsed else 0.0
+            self.stdout.write(f"{label + ':':11} {elapsed:.3f}s ({rate:.0f} emails/s)")
+        if not identical:
+            self.stdout.write(self.style.ERROR("Rendered HTML differs"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Speed-up: {per_email / shared:.1f}x (identical HTML)")
+        )
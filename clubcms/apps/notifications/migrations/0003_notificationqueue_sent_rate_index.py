@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0002_alter_notificationqueue_notification_type_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationqueue',
+            index=models.Index(condition=models.Q(('status', 'sent')), fields=['recipient', 'channel', 'sent_at'], name='notification_sent_rate_idx'),
+        ),
+    ]
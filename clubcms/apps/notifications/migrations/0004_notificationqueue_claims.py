@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notificationqueue_sent_rate_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationqueue',
+            name='claim_token',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='claim token'),
+        ),
+        migrations.AddField(
+            model_name='notificationqueue',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='claimed at'),
+        ),
+        migrations.AlterField(
+            model_name='notificationqueue',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], db_index=True, default='pending', max_length=10, verbose_name='status'),
+        ),
+    ]
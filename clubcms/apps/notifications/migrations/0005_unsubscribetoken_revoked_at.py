@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notificationqueue_claims'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unsubscribetoken',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='revoked at'),
+        ),
+    ]
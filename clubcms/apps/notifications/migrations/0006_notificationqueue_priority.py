@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:35
+
+from django.db import migrations, models
+
+# Frozen copy of apps.notifications.models.NOTIFICATION_PRIORITY_MAP as of
+# this migration, so later changes to the live map cannot alter it
+NOTIFICATION_PRIORITY_MAP = {
+    "aid_request": 0,
+    "mutual_aid_request": 0,
+    "mutual_aid_access_request": 0,
+    "waitlist_promoted": 0,
+    "payment_instructions": 0,
+    "news_published": 2,
+    "event_published": 2,
+    "weekend_favorites": 2,
+    "registration_opens": 2,
+    "partner_news": 2,
+    "partner_events": 2,
+}
+
+
+def set_priorities(apps, schema_editor):
+    """Derive the priority of existing entries from their type."""
+    NotificationQueue = apps.get_model("notifications", "NotificationQueue")
+    by_priority = {}
+    for notification_type, priority in NOTIFICATION_PRIORITY_MAP.items():
+        by_priority.setdefault(priority, []).append(notification_type)
+    for priority, types in by_priority.items():
+        NotificationQueue.objects.filter(notification_type__in=types).update(
+            priority=priority
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_unsubscribetoken_revoked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationqueue',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Urgent'), (1, 'Normal'), (2, 'Bulk')], default=1, help_text='Derived from the notification type; lower is sent sooner.', verbose_name='priority'),
+        ),
+        migrations.RunPython(set_priorities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notificationqueue',
+            index=models.Index(fields=['status', 'priority', 'created_at'], name='notification_lane_idx'),
+        ),
+    ]
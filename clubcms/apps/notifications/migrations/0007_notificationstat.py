@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notificationqueue_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('notification_type', models.CharField(choices=[('news_published', 'News published'), ('event_published', 'Event published'), ('event_reminder', 'Event reminder'), ('weekend_favorites', 'Weekend favorites'), ('registration_opens', 'Registration opens'), ('photo_approved', 'Photo approved'), ('membership_expiring', 'Membership expiring'), ('partner_news', 'Partner news'), ('partner_events', 'Partner events'), ('partner_event_interest', 'Partner event interest'), ('partner_event_comment', 'Partner event comment'), ('partner_event_cancelled', 'Partner event cancelled'), ('aid_request', 'Aid request'), ('mutual_aid_request', 'Mutual aid request'), ('mutual_aid_access_request', 'Mutual aid access request'), ('event_registered', 'Event registration confirmed'), ('payment_instructions', 'Payment instructions'), ('payment_confirmed', 'Payment confirmed'), ('payment_expired', 'Payment expired'), ('registration_cancelled', 'Registration cancelled'), ('waitlist_promoted', 'Promoted from waitlist')], max_length=50, verbose_name='notification type')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('push', 'Push notification'), ('in_app', 'In-app notification')], max_length=10, verbose_name='channel')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], max_length=10, verbose_name='status')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+            ],
+            options={
+                'verbose_name': 'notification statistic',
+                'verbose_name_plural': 'notification statistics',
+                'ordering': ['-day', 'notification_type', 'channel', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'notification_type', 'channel', 'status'), name='unique_notification_stat')],
+            },
+        ),
+    ]
@@ -2,7 +2,8 @@
 Notification system models.
 
 Provides a notification queue for email, push, and in-app delivery,
-push subscription management, and token-based unsubscribe.
+daily delivery statistics, push subscription management, and
+token-based unsubscribe.
 """
 
 from django.conf import settings
@@ -52,12 +53,48 @@ CHANNEL_CHOICES = [
 
 STATUS_CHOICES = [
     ("pending", _("Pending")),
+    ("processing", _("Processing")),
     ("sent", _("Sent")),
     ("failed", _("Failed")),
     ("skipped", _("Skipped")),
 ]
 
 
+# ---------------------------------------------------------------------------
+# Delivery priority (lower is sooner)
+# ---------------------------------------------------------------------------
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+PRIORITY_CHOICES = [
+    (PRIORITY_URGENT, _("Urgent")),
+    (PRIORITY_NORMAL, _("Normal")),
+    (PRIORITY_BULK, _("Bulk")),
+]
+
+# Types not listed are PRIORITY_NORMAL
+NOTIFICATION_PRIORITY_MAP = {
+    "aid_request": PRIORITY_URGENT,
+    "mutual_aid_request": PRIORITY_URGENT,
+    "mutual_aid_access_request": PRIORITY_URGENT,
+    "waitlist_promoted": PRIORITY_URGENT,
+    "payment_instructions": PRIORITY_URGENT,
+    "news_published": PRIORITY_BULK,
+    "event_published": PRIORITY_BULK,
+    "weekend_favorites": PRIORITY_BULK,
+    "registration_opens": PRIORITY_BULK,
+    "partner_news": PRIORITY_BULK,
+    "partner_events": PRIORITY_BULK,
+}
+
+
+def priority_for(notification_type):
+    """Return the delivery priority of *notification_type*."""
+    return NOTIFICATION_PRIORITY_MAP.get(notification_type, PRIORITY_NORMAL)
+
+
 # ---------------------------------------------------------------------------
 # Mapping: notification_type -> user preference field
 # ---------------------------------------------------------------------------
@@ -139,6 +176,12 @@ class NotificationQueue(models.Model):
         default="pending",
         db_index=True,
     )
+    priority = models.PositiveSmallIntegerField(
+        _("priority"),
+        choices=PRIORITY_CHOICES,
+        default=PRIORITY_NORMAL,
+        help_text=_("Derived from the notification type; lower is sent sooner."),
+    )
 
     title = models.CharField(_("title"), max_length=255)
     body = models.TextField(_("body"))
@@ -154,14 +197,31 @@ class NotificationQueue(models.Model):
     sent_at = models.DateTimeField(_("sent at"), null=True, blank=True)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
 
+    # Lease held by the queue worker sending this entry (status "processing")
+    claimed_at = models.DateTimeField(_("claimed at"), null=True, blank=True)
+    claim_token = models.CharField(
+        _("claim token"), max_length=32, blank=True, default="", editable=False,
+    )
+
     error_message = models.TextField(_("error message"), blank=True, default="")
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["status", "scheduled_for"]),
+            # Claim order of the queue consumers (apps.notifications.consumer)
+            models.Index(
+                fields=["status", "priority", "created_at"],
+                name="notification_lane_idx",
+            ),
             models.Index(fields=["recipient", "created_at"]),
             models.Index(fields=["notification_type", "status"]),
+            # Rate-limit counters (apps.notifications.ratelimit)
+            models.Index(
+                fields=["recipient", "channel", "sent_at"],
+                condition=models.Q(status="sent"),
+                name="notification_sent_rate_idx",
+            ),
         ]
         verbose_name = _("notification")
         verbose_name_plural = _("notifications")
@@ -170,6 +230,50 @@ class NotificationQueue(models.Model):
         return f"[{self.get_status_display()}] {self.title} -> {self.recipient}"
 
 
+class NotificationStat(models.Model):
+    """
+    Daily count of notifications by type, channel and final status.
+
+    Written by ``apps.notifications.retention`` when old queue entries
+    are purged, so delivery statistics outlive the entries themselves.
+    """
+
+    day = models.DateField(_("day"))
+    notification_type = models.CharField(
+        _("notification type"),
+        max_length=50,
+        choices=NOTIFICATION_TYPE_CHOICES,
+    )
+    channel = models.CharField(
+        _("channel"),
+        max_length=10,
+        choices=CHANNEL_CHOICES,
+    )
+    status = models.CharField(
+        _("status"),
+        max_length=10,
+        choices=STATUS_CHOICES,
+    )
+    count = models.PositiveIntegerField(_("count"), default=0)
+
+    class Meta:
+        ordering = ["-day", "notification_type", "channel", "status"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "notification_type", "channel", "status"],
+                name="unique_notification_stat",
+            ),
+        ]
+        verbose_name = _("notification statistic")
+        verbose_name_plural = _("notification statistics")
+
+    def __str__(self):
+        return (
+            f"{self.day} {self.notification_type}/{self.channel} "
+            f"{self.status}: {self.count}"
+        )
+
+
 class PushSubscription(models.Model):
     """
     Web Push subscription registered by a user's browser.
@@ -209,7 +313,12 @@ class PushSubscription(models.Model):
 
 class UnsubscribeToken(models.Model):
     """
-    HMAC-based token allowing one-click unsubscribe without login.
+    Stored unsubscribe token for a user and notification type.
+
+    Unsubscribe links are signed and verified without the database (see
+    ``services.generate_unsubscribe_token``).  Rows remain for tokens
+    issued before that (legacy lookup) and to revoke the links of a
+    user and type issued up to ``revoked_at``.
     """
 
     user = models.ForeignKey(
@@ -229,6 +338,7 @@ class UnsubscribeToken(models.Model):
         unique=True,
     )
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    revoked_at = models.DateTimeField(_("revoked at"), null=True, blank=True)
 
     class Meta:
         unique_together = [("user", "notification_type")]
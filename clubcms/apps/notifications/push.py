@@ -0,0 +1,302 @@
+"""
+Web Push delivery engine.
+
+``PushDispatcher`` sends a batch of push notifications to every active
+subscription of their recipients:
+
+- VAPID claims are signed once per push-service origin and reused until
+  shortly before they expire (``PushClient.vapid_headers``);
+- requests go through one pooled ``requests.Session`` and are sent
+  concurrently by a bounded thread pool (threads do HTTP only, never
+  the ORM);
+- subscriptions answered with 404/410 are deactivated, ``last_used``
+  is set for the others, and notification statuses are saved with one
+  query each.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import NotificationQueue, PushSubscription
+from .ratelimit import PUSH_HOURLY_LIMIT, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests to push services
+PUSH_MAX_WORKERS = 8
+
+# Seconds before a push service request is abandoned
+PUSH_TIMEOUT = 10
+
+# Lifetime of a signed VAPID JWT, and how long before expiry it is replaced
+VAPID_EXPIRY = 12 * 60 * 60
+VAPID_REFRESH_MARGIN = 10 * 60
+
+# Push service answers that mean the subscription is gone for good
+GONE_STATUSES = (404, 410)
+
+
+# ---------------------------------------------------------------------------
+# 1. Pooled client
+# ---------------------------------------------------------------------------
+
+
+class PushClient:
+    """
+    Pooled HTTP session and VAPID signer for one VAPID key pair.
+
+    Thread-safe; shared between batches by ``get_push_client``.
+    """
+
+    def __init__(self, private_key, admin_email, max_workers=PUSH_MAX_WORKERS):
+        import requests
+        from py_vapid import Vapid
+
+        self.private_key = private_key
+        self.admin_email = admin_email
+        self.vapid = Vapid.from_string(private_key=private_key)
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers
+        )
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self._signed = {}  # origin -> (headers, expires_at)
+        self._lock = threading.Lock()
+
+    def matches(self, private_key, admin_email):
+        return self.private_key == private_key and self.admin_email == admin_email
+
+    def vapid_headers(self, endpoint):
+        """Return the VAPID headers for *endpoint*'s push service origin."""
+        url = urlsplit(endpoint)
+        origin = f"{url.scheme}://{url.netloc}"
+        now = time.time()
+        with self._lock:
+            signed = self._signed.get(origin)
+            if signed is None or signed[1] - VAPID_REFRESH_MARGIN <= now:
+                expires_at = int(now) + VAPID_EXPIRY
+                headers = self.vapid.sign({
+                    "sub": f"mailto:{self.admin_email}",
+                    "aud": origin,
+                    "exp": expires_at,
+                })
+                signed = (headers, expires_at)
+                self._signed[origin] = signed
+            return dict(signed[0])
+
+    def send(self, subscription_info, payload):
+        """
+        Encrypt and POST *payload* to one subscription.
+
+        Returns the HTTP status code; raises on network errors.
+        """
+        from pywebpush import WebPusher
+
+        response = WebPusher(subscription_info, requests_session=self.http).send(
+            payload,
+            self.vapid_headers(subscription_info["endpoint"]),
+            timeout=PUSH_TIMEOUT,
+        )
+        return response.status_code
+
+    def close(self):
+        self.http.close()
+
+
+_push_client = None
+_push_client_lock = threading.Lock()
+
+
+def get_push_client():
+    """
+    Return the shared ``PushClient`` for ``WEBPUSH_SETTINGS``, or None if
+    no VAPID private key is configured.
+
+    The client is replaced when the key or admin email change.
+    """
+    global _push_client
+    vapid_settings = getattr(settings, "WEBPUSH_SETTINGS", {})
+    private_key = vapid_settings.get("VAPID_PRIVATE_KEY", "")
+    admin_email = vapid_settings.get("VAPID_ADMIN_EMAIL", "")
+    if not private_key:
+        return None
+    client = _push_client
+    if client is not None and client.matches(private_key, admin_email):
+        return client
+    with _push_client_lock:
+        if _push_client is None or not _push_client.matches(private_key, admin_email):
+            if _push_client is not None:
+                _push_client.close()
+            _push_client = PushClient(private_key, admin_email)
+        return _push_client
+
+
+def reset_push_client():
+    """Close and forget the shared push client (tests, key rotation)."""
+    global _push_client
+    with _push_client_lock:
+        if _push_client is not None:
+            _push_client.close()
+        _push_client = None
+
+
+# ---------------------------------------------------------------------------
+# 2. Dispatcher
+# ---------------------------------------------------------------------------
+
+
+def push_payload(notification):
+    """JSON payload shown by the service worker."""
+    return json.dumps(
+        {
+            "title": notification.title,
+            "body": strip_tags(notification.body),
+            "url": notification.url,
+            "type": notification.notification_type,
+        }
+    )
+
+
+class PushDispatcher:
+    """
+    Deliver push notifications to all active subscriptions of their
+    recipients, concurrently.
+
+    *limiter* is the batch's ``RateLimiter`` (shared with other
+    channels).  ``dispatch`` runs the three phases in turn; callers that
+    overlap pushes with other work run ``prepare`` and ``finish`` (ORM)
+    on their own thread and ``deliver`` (network only) on another.
+    """
+
+    def __init__(self, limiter=None, client=None, max_workers=PUSH_MAX_WORKERS):
+        self.limiter = limiter or RateLimiter()
+        self.client = client
+        self.max_workers = max_workers
+
+    def dispatch(self, notifications):
+        """
+        Send *notifications* (``channel='push'``).
+
+        Returns:
+            tuple: ``(sent, not_sent)`` counts; skipped and failed
+            notifications count as not sent.
+        """
+        batch = self.prepare(notifications)
+        return self.finish(batch, self.deliver(batch))
+
+    def prepare(self, notifications):
+        """
+        Load subscriptions and apply rate limits.
+
+        Returns a ``(notifications, jobs)`` batch with one job per
+        notification and subscription.
+        """
+        notifications = list(notifications)
+        if not notifications:
+            return notifications, []
+        self.client = self.client or get_push_client()
+        if self.client is None:
+            for notification in notifications:
+                notification.status = "failed"
+                notification.error_message = "VAPID private key not configured"
+            return notifications, []
+
+        user_ids = {n.recipient_id for n in notifications}
+        self.limiter.preload(user_ids)
+        subscriptions = {}
+        active = PushSubscription.objects.filter(user_id__in=user_ids, is_active=True)
+        for sub in active:
+            subscriptions.setdefault(sub.user_id, []).append(sub)
+
+        # Queued in this batch; the limiter only counts pushes once sent
+        queued = Counter()
+        jobs = []
+        for notification in notifications:
+            user_id = notification.recipient_id
+            pushes = self.limiter.push_count(user_id) + queued[user_id]
+            if pushes >= PUSH_HOURLY_LIMIT:
+                notification.status = "skipped"
+                notification.error_message = (
+                    f"Rate limit: max {PUSH_HOURLY_LIMIT} push/hour exceeded"
+                )
+                continue
+            if not subscriptions.get(user_id):
+                notification.status = "skipped"
+                notification.error_message = "No active push subscriptions"
+                continue
+            queued[user_id] += 1
+            payload = push_payload(notification)
+            jobs.extend((notification, sub, payload) for sub in subscriptions[user_id])
+        return notifications, jobs
+
+    def deliver(self, batch):
+        """Send every job of *batch*; return HTTP statuses or exceptions."""
+        _notifications, jobs = batch
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self._deliver, jobs))
+
+    def _deliver(self, job):
+        _notification, sub, payload = job
+        try:
+            return self.client.send(
+                {
+                    "endpoint": sub.endpoint,
+                    "keys": {"p256dh": sub.p256dh_key, "auth": sub.auth_key},
+                },
+                payload,
+            )
+        except Exception as exc:
+            return exc
+
+    def finish(self, batch, results):
+        """Record the outcome of *batch*; return ``(sent, not_sent)``."""
+        notifications, jobs = batch
+        if not notifications:
+            return 0, 0
+        now = timezone.now()
+        delivered = set()
+        gone = set()
+        errors = {}
+        for (notification, sub, _payload), result in zip(jobs, results):
+            if isinstance(result, int) and result <= 202:
+                delivered.add(sub.pk)
+                notification.status = "sent"
+                notification.sent_at = now
+                continue
+            if result in GONE_STATUSES:
+                gone.add(sub.pk)
+            message = f"HTTP {result}" if isinstance(result, int) else str(result)
+            logger.warning("Push failed for subscription %s: %s", sub.pk, message)
+            errors.setdefault(notification, []).append(message)
+
+        # A notification is sent if any of the recipient's devices got it
+        for notification, messages in errors.items():
+            if notification.status != "sent":
+                notification.status = "failed"
+                notification.error_message = "; ".join(messages)[:1000]
+
+        if delivered:
+            PushSubscription.objects.filter(pk__in=delivered).update(last_used=now)
+        if gone:
+            PushSubscription.objects.filter(pk__in=gone).update(is_active=False)
+        NotificationQueue.objects.bulk_update(
+            notifications, ["status", "sent_at", "error_message"], batch_size=500
+        )
+        sent = 0
+        for notification in notifications:
+            if notification.status == "sent":
+                self.limiter.record(notification.recipient_id, "push")
+                sent += 1
+        return sent, len(notifications) - sent
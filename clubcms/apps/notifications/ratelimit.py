@@ -0,0 +1,104 @@
+"""
+Per-user rate limits for notification delivery.
+
+Limits: 5 emails per user per day (since midnight) and 3 pushes per
+user in the last 60 minutes, counting ``sent`` queue entries, digests
+included.
+
+``RateLimiter`` loads the counters of a whole batch of recipients with
+one grouped query and keeps them up to date in memory as the batch is
+sent, instead of running two ``COUNT`` queries per notification.
+
+When consumers run in parallel, a batch's limiter also counts the
+entries other consumers claimed before it (still ``processing``), so
+concurrent batches cannot together exceed the limits.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import NotificationQueue
+
+EMAIL_DAILY_LIMIT = 5
+PUSH_HOURLY_LIMIT = 3
+
+
+class RateLimiter:
+    """
+    Email and push counters for a set of recipients.
+
+    Counters are loaded on demand; call ``preload`` with every recipient
+    of a batch first so they are fetched with a single query.
+
+    *claim* is the ``(claimed_at, claim_token)`` of the batch being sent:
+    entries claimed by other consumers before it count as sent.
+    """
+
+    def __init__(self, now=None, claim=None):
+        self.now = now or timezone.now()
+        self.claim = claim
+        self.day_start = self.now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.hour_ago = self.now - timedelta(hours=1)
+        self._email = {}
+        self._push = {}
+
+    def preload(self, user_ids):
+        """Fetch the counters of *user_ids* not loaded yet (one query)."""
+        missing = {pk for pk in user_ids if pk not in self._email}
+        if not missing:
+            return
+        for pk in missing:
+            self._email[pk] = 0
+            self._push[pk] = 0
+        emails = Q(channel="email", status="sent", sent_at__gte=self.day_start)
+        pushes = Q(channel="push", status="sent", sent_at__gte=self.hour_ago)
+        if self.claim is not None:
+            in_flight = self._claimed_earlier()
+            emails |= Q(channel="email") & in_flight
+            pushes |= Q(channel="push") & in_flight
+        rows = (
+            NotificationQueue.objects.filter(emails | pushes, recipient_id__in=missing)
+            .order_by()
+            .values("recipient_id")
+            .annotate(
+                emails=Count("pk", filter=emails),
+                pushes=Count("pk", filter=pushes),
+            )
+        )
+        for row in rows:
+            self._email[row["recipient_id"]] = row["emails"]
+            self._push[row["recipient_id"]] = row["pushes"]
+
+    def _claimed_earlier(self):
+        """Entries other consumers claimed before this batch, still in flight."""
+        claimed_at, token = self.claim
+        return Q(status="processing") & (
+            Q(claimed_at__lt=claimed_at)
+            | Q(claimed_at=claimed_at, claim_token__lt=token)
+        )
+
+    def email_count(self, user_id):
+        """Emails sent to *user_id* today."""
+        self.preload([user_id])
+        return self._email[user_id]
+
+    def push_count(self, user_id):
+        """Pushes sent to *user_id* in the last hour."""
+        self.preload([user_id])
+        return self._push[user_id]
+
+    def allow_email(self, user_id):
+        return self.email_count(user_id) < EMAIL_DAILY_LIMIT
+
+    def allow_push(self, user_id):
+        return self.push_count(user_id) < PUSH_HOURLY_LIMIT
+
+    def record(self, user_id, channel):
+        """Count one more *channel* notification sent to *user_id*."""
+        self.preload([user_id])
+        if channel == "email":
+            self._email[user_id] += 1
+        elif channel == "push":
+            self._push[user_id] += 1
@@ -0,0 +1,99 @@
+"""
+Rendering of notification emails in bulk.
+
+The HTML of a notification email is the same for every recipient except
+for the unsubscribe token.  ``EmailRenderer`` therefore renders each
+(template, language, notification content) once, with a placeholder in
+place of the token, and keeps the result as a ``string.Template``; every
+further recipient costs one ``substitute`` call instead of a full
+template render.
+
+Compiled Django templates are cached explicitly by ``get_email_template``
+(bypassed when ``DEBUG`` is on, so template edits show up immediately).
+"""
+
+import functools
+import string
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import translation
+from django.utils.html import strip_tags
+
+SINGLE_TEMPLATE = "notifications/emails/single.html"
+
+# Rendered notifications kept per renderer before the cache is reset
+RENDER_CACHE_SIZE = 256
+
+# Rendered in place of the token, then swapped for ``$unsubscribe_token``
+_TOKEN_PLACEHOLDER = "\x00unsubscribe-token\x00"
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled_template(name):
+    return get_template(name)
+
+
+def get_email_template(name):
+    """Return the compiled template *name*, cached for the process."""
+    if settings.DEBUG:
+        return get_template(name)
+    return _compiled_template(name)
+
+
+def clear_template_cache():
+    """Forget compiled templates (after template changes, in tests)."""
+    _compiled_template.cache_clear()
+
+
+class EmailRenderer:
+    """
+    Render notification emails, sharing the work between recipients of
+    the same notification.
+
+    Create one per batch: rendered bodies are keyed on the notification
+    content, so the template must only use the notification's ``title``,
+    ``body`` and ``url`` and the ``unsubscribe_token``.
+    """
+
+    def __init__(self, template_name=SINGLE_TEMPLATE):
+        self.template_name = template_name
+        self.site_name = getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS")
+        self.base_url = getattr(settings, "WAGTAILADMIN_BASE_URL", "")
+        self._html = {}
+        self._text = {}
+
+    def html(self, notification, unsubscribe_token):
+        """Return the HTML body of *notification* for one recipient."""
+        key = (
+            translation.get_language(),
+            notification.title,
+            notification.body,
+            notification.url,
+        )
+        compiled = self._html.get(key)
+        if compiled is None:
+            if len(self._html) >= RENDER_CACHE_SIZE:
+                self._html.clear()
+            compiled = self._html[key] = self._compile(notification)
+        return compiled.substitute(unsubscribe_token=unsubscribe_token)
+
+    def text(self, notification):
+        """Return the plain-text body of *notification*."""
+        text = self._text.get(notification.body)
+        if text is None:
+            if len(self._text) >= RENDER_CACHE_SIZE:
+                self._text.clear()
+            text = self._text[notification.body] = strip_tags(notification.body)
+        return text
+
+    def _compile(self, notification):
+        html = get_email_template(self.template_name).render({
+            "notification": notification,
+            "unsubscribe_token": _TOKEN_PLACEHOLDER,
+            "site_name": self.site_name,
+            "base_url": self.base_url,
+        })
+        return string.Template(
+            html.replace("$", "$$").replace(_TOKEN_PLACEHOLDER, "${unsubscribe_token}")
+        )
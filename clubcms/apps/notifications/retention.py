@@ -0,0 +1,142 @@
+"""
+Retention for the notification queue.
+
+``NotificationQueue`` grows by recipients x channels for every
+notification, so old entries are purged daily to keep the table (and
+its ``status, scheduled_for`` index) small:
+
+- entries older than the cutoff are walked in primary-key order
+  (keyset pagination: ``WHERE pk > last ORDER BY pk LIMIT n``), which
+  reads the oldest part of the pk index only;
+- each chunk is deleted with an explicit ``DELETE ... WHERE pk IN (...)``
+  in its own short transaction: no rows are loaded and no signals are
+  sent (nothing references the queue, so there is nothing to cascade);
+- optionally, each chunk is first summarized into ``NotificationStat``
+  (one row per day, type, channel and status), so delivery statistics
+  survive the purge.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import NotificationQueue, NotificationStat
+
+logger = logging.getLogger(__name__)
+
+# Days queue entries are kept (notification history shows this window)
+RETENTION_DAYS = 90
+
+# Entries deleted per statement / transaction
+RETENTION_CHUNK_SIZE = 2000
+
+_STAT_KEY = ("day", "notification_type", "channel", "status")
+
+
+# ---------------------------------------------------------------------------
+# 1. Archive
+# ---------------------------------------------------------------------------
+
+
+def archive_entries(entries):
+    """
+    Add the counts of *entries* (a ``NotificationQueue`` queryset) to
+    ``NotificationStat``.
+
+    Returns:
+        int: Number of entries counted.
+    """
+    rows = (
+        entries.order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values(*_STAT_KEY)
+        .annotate(n=Count("pk"))
+    )
+    counts = {tuple(row[k] for k in _STAT_KEY): row["n"] for row in rows}
+    if not counts:
+        return 0
+
+    days = {key[0] for key in counts}
+    existing = {
+        tuple(getattr(stat, k) for k in _STAT_KEY): stat
+        for stat in NotificationStat.objects.filter(day__in=days)
+    }
+    to_update = []
+    to_create = []
+    for key, n in counts.items():
+        stat = existing.get(key)
+        if stat is None:
+            to_create.append(NotificationStat(count=n, **dict(zip(_STAT_KEY, key))))
+        else:
+            stat.count += n
+            to_update.append(stat)
+    NotificationStat.objects.bulk_create(to_create)
+    NotificationStat.objects.bulk_update(to_update, ["count"])
+    return sum(counts.values())
+
+
+# ---------------------------------------------------------------------------
+# 2. Purge
+# ---------------------------------------------------------------------------
+
+
+def _delete_ids(ids):
+    """Delete the queue entries with primary keys *ids*; return the count."""
+    meta = NotificationQueue._meta
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(meta.db_table)} "
+            f"WHERE {quote(meta.pk.column)} IN ({placeholders})",
+            ids,
+        )
+        return cursor.rowcount
+
+
+def purge_notifications(
+    older_than=None, archive=True, chunk_size=RETENTION_CHUNK_SIZE
+):
+    """
+    Delete queue entries created before *older_than* (default:
+    ``RETENTION_DAYS`` ago) in chunks of *chunk_size*.
+
+    With *archive*, each chunk is counted into ``NotificationStat`` in
+    the same transaction as its deletion.
+
+    Returns:
+        dict: ``deleted`` and ``archived`` entry counts.
+    """
+    if older_than is None:
+        older_than = timezone.now() - timedelta(days=RETENTION_DAYS)
+    old = NotificationQueue.objects.filter(created_at__lt=older_than)
+
+    deleted = archived = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            old.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        last_pk = ids[-1]
+        with transaction.atomic():
+            if archive:
+                archived += archive_entries(
+                    NotificationQueue.objects.filter(pk__in=ids)
+                )
+            deleted += _delete_ids(ids)
+        if len(ids) < chunk_size:
+            break
+
+    logger.info(
+        "Purged %d notification(s) created before %s (%d archived)",
+        deleted, older_than.date(), archived,
+    )
+    return {"deleted": deleted, "archived": archived}
@@ -5,29 +5,35 @@ Core functions for creating notifications, sending via email/push,
 managing unsubscribe tokens, and checking user preferences.
 """
 
+import base64
 import hashlib
 import hmac
-import json
 import logging
 from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.db.models import Q, QuerySet
 from django.utils import timezone
-from django.utils.html import strip_tags
+from django.utils.http import base36_to_int, int_to_base36
 from django.utils.translation import gettext_lazy as _
 
 from .models import (
     NOTIFICATION_PREFERENCE_MAP,
+    PRIORITY_URGENT,
     NotificationQueue,
-    PushSubscription,
     UnsubscribeToken,
+    priority_for,
 )
+from .push import PushDispatcher
+from .ratelimit import EMAIL_DAILY_LIMIT, RateLimiter
+from .rendering import EmailRenderer, get_email_template
 
 logger = logging.getLogger(__name__)
 
+DIGEST_TEMPLATE = "notifications/emails/digest.html"
+
 User = get_user_model()
 
 
@@ -58,37 +64,13 @@ def check_user_preference(user, notification_type, channel):
     return True
 
 
-# ---------------------------------------------------------------------------
-# Rate limiting helpers
-# ---------------------------------------------------------------------------
-
-
-def _email_count_today(user):
-    """Number of email notifications sent to *user* in the current day."""
-    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    return NotificationQueue.objects.filter(
-        recipient=user,
-        channel="email",
-        status="sent",
-        sent_at__gte=today_start,
-    ).count()
-
-
-def _push_count_last_hour(user):
-    """Number of push notifications sent to *user* in the last 60 minutes."""
-    one_hour_ago = timezone.now() - timedelta(hours=1)
-    return NotificationQueue.objects.filter(
-        recipient=user,
-        channel="push",
-        status="sent",
-        sent_at__gte=one_hour_ago,
-    ).count()
-
-
 # ---------------------------------------------------------------------------
 # Notification creation
 # ---------------------------------------------------------------------------
 
+# Recipients streamed and entries inserted per batch during fan-out
+FANOUT_CHUNK_SIZE = 1000
+
 
 def create_notification(
     notification_type,
@@ -103,6 +85,11 @@ def create_notification(
     """
     Create ``NotificationQueue`` entries for each recipient x channel pair.
 
+    A queryset of recipients (or the default, all active users) is fanned
+    out in SQL by ``fan_out_notification``; a list of already loaded
+    users goes through ``build_notifications`` and a single
+    ``bulk_create``.
+
     Parameters
     ----------
     notification_type : str
@@ -121,39 +108,94 @@ def create_notification(
     content_object : Model instance, optional
         Triggering content for generic-foreign-key.
     scheduled_for : datetime, optional
-        Delay delivery until this time.
+        Delay delivery until this time.  Otherwise entries follow the
+        recipient's digest preference, except urgent types, which are
+        always sent immediately.
 
     Returns
     -------
-    list[NotificationQueue]
-        The created (but not yet sent) entries.
+    int
+        Number of entries created (not yet sent).
     """
-    from django.contrib.contenttypes.models import ContentType
+    if recipients is None or isinstance(recipients, QuerySet):
+        return fan_out_notification(
+            notification_type,
+            title,
+            body,
+            url=url,
+            recipients=recipients,
+            channels=channels,
+            content_object=content_object,
+            scheduled_for=scheduled_for,
+        )
 
+    created = build_notifications(
+        notification_type,
+        title,
+        body,
+        url=url,
+        recipients=recipients,
+        channels=channels,
+        content_object=content_object,
+        scheduled_for=scheduled_for,
+    )
+
+    save_notifications(created)
+    return len(created)
+
+
+def save_notifications(entries, batch_size=None):
+    """
+    Insert built ``NotificationQueue`` *entries* with one ``bulk_create``.
+
+    Queues the urgent-lane consumer when any entry is urgent (see
+    ``apps.notifications.consumer.enqueue_urgent_drain``).
+    """
+    if not entries:
+        return
+    NotificationQueue.objects.bulk_create(entries, batch_size=batch_size)
+    if any(entry.priority == PRIORITY_URGENT for entry in entries):
+        from .consumer import enqueue_urgent_drain
+
+        enqueue_urgent_drain()
+
+
+def build_notifications(
+    notification_type,
+    title,
+    body,
+    url="",
+    recipients=None,
+    channels=None,
+    content_object=None,
+    scheduled_for=None,
+):
+    """
+    Return unsaved ``NotificationQueue`` entries for each recipient x
+    channel pair the recipients opted in to.
+
+    Takes the same arguments as ``create_notification``.  Callers that
+    notify about several content objects at once collect the entries
+    and save them with one ``bulk_create``.
+    """
     if channels is None:
         channels = ["email", "push"]
 
     if recipients is None:
         recipients = User.objects.filter(is_active=True)
 
-    ct = None
-    obj_id = None
-    if content_object is not None:
-        ct = ContentType.objects.get_for_model(content_object)
-        obj_id = content_object.pk
+    ct, obj_id = _content_reference(content_object)
+    priority = priority_for(notification_type)
+    digest_times = {} if priority == PRIORITY_URGENT else _digest_schedule()
 
     created = []
     for user in recipients:
         # Determine effective scheduling based on digest preference
         effective_scheduled = scheduled_for
-        if effective_scheduled is None and hasattr(user, "digest_frequency"):
-            digest = getattr(user, "digest_frequency", "immediate")
-            if digest == "daily":
-                # Schedule for next digest window (processed by daily digest task)
-                effective_scheduled = _next_digest_time("daily")
-            elif digest == "weekly":
-                effective_scheduled = _next_digest_time("weekly")
-            # "immediate" -> None (send now)
+        if effective_scheduled is None:
+            effective_scheduled = digest_times.get(
+                getattr(user, "digest_frequency", "immediate")
+            )
 
         for channel in channels:
             if not check_user_preference(user, notification_type, channel):
@@ -166,6 +208,7 @@ def create_notification(
                 recipient=user,
                 channel=channel,
                 status="pending",
+                priority=priority,
                 title=title,
                 body=body,
                 url=url,
@@ -173,13 +216,185 @@ def create_notification(
             )
             created.append(notification)
 
-    # Bulk create for efficiency
-    if created:
-        NotificationQueue.objects.bulk_create(created)
+    return created
+
+
+def fan_out_notification(
+    notification_type,
+    title,
+    body,
+    url="",
+    recipients=None,
+    channels=None,
+    content_object=None,
+    scheduled_for=None,
+    chunk_size=FANOUT_CHUNK_SIZE,
+):
+    """
+    Queue a notification for a queryset of users without loading them.
+
+    Preferences are applied as ``WHERE`` clauses per channel (see
+    ``preference_filter``), recipient ids and digest frequencies are
+    streamed with ``values_list`` and entries are inserted with one
+    ``bulk_create`` per *chunk_size* rows, so memory stays bounded for
+    club-wide announcements.
+
+    Takes the same arguments as ``create_notification``.
 
+    Returns
+    -------
+    int
+        Number of entries created.
+    """
+    if channels is None:
+        channels = ["email", "push"]
+
+    if recipients is None:
+        recipients = User.objects.filter(is_active=True)
+
+    ct, obj_id = _content_reference(content_object)
+    priority = priority_for(notification_type)
+    if scheduled_for is not None or priority == PRIORITY_URGENT:
+        digest_times = {}
+    else:
+        digest_times = _digest_schedule()
+
+    created = 0
+    batch = []
+    for channel in channels:
+        rows = (
+            recipients.filter(preference_filter(notification_type, channel))
+            .order_by("pk")
+            .values_list("pk", "digest_frequency")
+        )
+        for user_id, frequency in rows.iterator(chunk_size=chunk_size):
+            batch.append(
+                NotificationQueue(
+                    notification_type=notification_type,
+                    content_type=ct,
+                    object_id=obj_id,
+                    recipient_id=user_id,
+                    channel=channel,
+                    status="pending",
+                    priority=priority,
+                    title=title,
+                    body=body,
+                    url=url,
+                    scheduled_for=scheduled_for or digest_times.get(frequency),
+                )
+            )
+            if len(batch) >= chunk_size:
+                NotificationQueue.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+    if batch:
+        NotificationQueue.objects.bulk_create(batch)
+        created += len(batch)
+
+    logger.info(
+        "Queued %d %s notification(s) on %s.",
+        created, notification_type, ", ".join(channels),
+    )
+    if created and priority == PRIORITY_URGENT:
+        from .consumer import enqueue_urgent_drain
+
+        enqueue_urgent_drain()
     return created
 
 
+def notify_registrants(
+    registrations,
+    notification_type,
+    title,
+    body,
+    url="",
+    channels=None,
+    events=None,
+    batch_size=None,
+):
+    """
+    Queue *notification_type* for the user of each registration with one
+    bulk insert.
+
+    *title* and *body* are format strings filled with the ``event`` title,
+    the payment ``amount`` of each registration and the ``currency``
+    symbol (``EVENT_CURRENCY_SYMBOL``).  *events* maps event
+    ids to already loaded pages (``reg.event`` is used otherwise).
+
+    Failures are logged, never raised: the registrations have already
+    been updated by the caller.
+    """
+    try:
+        currency = getattr(settings, "EVENT_CURRENCY_SYMBOL", "€")
+        entries = []
+        for reg in registrations:
+            if not reg.user:
+                continue
+            event = events[reg.event_id] if events else reg.event
+            fields = {
+                "event": event.title,
+                "amount": reg.payment_amount,
+                "currency": currency,
+            }
+            entries.extend(
+                build_notifications(
+                    notification_type=notification_type,
+                    title=str(title).format(**fields),
+                    body=str(body).format(**fields),
+                    url=url,
+                    recipients=[reg.user],
+                    channels=channels,
+                    content_object=reg,
+                )
+            )
+        save_notifications(entries, batch_size=batch_size)
+    except Exception:
+        logger.exception(
+            "Failed to queue %s notifications for %d registration(s)",
+            notification_type,
+            len(registrations),
+        )
+
+
+def preference_filter(notification_type, channel):
+    """
+    Return a ``Q`` selecting users opted in to *notification_type* via
+    *channel*; the SQL counterpart of ``check_user_preference``.
+    """
+    condition = Q()
+    if channel == "email":
+        condition &= Q(email_notifications=True)
+    elif channel == "push":
+        condition &= Q(push_notifications=True)
+
+    pref_field = NOTIFICATION_PREFERENCE_MAP.get(notification_type)
+    if pref_field:
+        condition &= Q(**{pref_field: True})
+    return condition
+
+
+def _content_reference(content_object):
+    """Return ``(content_type, object_id)`` for the generic relation."""
+    from django.contrib.contenttypes.models import ContentType
+
+    if content_object is None:
+        return None, None
+    return ContentType.objects.get_for_model(content_object), content_object.pk
+
+
+def _digest_schedule():
+    """
+    Map each ``digest_frequency`` to the ``scheduled_for`` of new entries.
+
+    "immediate" is absent (send now).  Computed once per fan-out rather
+    than once per recipient.
+    """
+    return {
+        "daily": _next_digest_time("daily"),
+        "weekly": _next_digest_time("weekly"),
+    }
+
+
 def _next_digest_time(frequency):
     """
     Return the datetime for the next digest window.
@@ -207,25 +422,26 @@ def _next_digest_time(frequency):
 # ---------------------------------------------------------------------------
 
 
-def build_email_html(notification):
+def build_email_html(notification, unsubscribe_token=None, renderer=None):
     """
     Render the HTML version of an email notification.
+
+    Pass the batch's *renderer* (``apps.notifications.rendering``) to
+    render each distinct notification once for all its recipients.
     """
-    unsubscribe_token = generate_unsubscribe_token(
-        notification.recipient, notification.notification_type
-    )
-    context = {
-        "notification": notification,
-        "unsubscribe_token": unsubscribe_token,
-        "site_name": getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS"),
-        "base_url": getattr(settings, "WAGTAILADMIN_BASE_URL", ""),
-    }
-    return render_to_string("notifications/emails/single.html", context)
+    if unsubscribe_token is None:
+        unsubscribe_token = generate_unsubscribe_token(
+            notification.recipient, notification.notification_type
+        )
+    renderer = renderer or EmailRenderer()
+    return renderer.html(notification, unsubscribe_token)
 
 
-def build_digest_html(user, notifications):
+def build_digest_html(user, notifications, template=None):
     """
     Render the HTML for a digest email containing multiple notifications.
+
+    Pass the compiled *template* when rendering many digests in a row.
     """
     # Use a single unsubscribe token for digest (generic type "digest")
     unsubscribe_token = generate_unsubscribe_token(user, "news_published")
@@ -236,57 +452,84 @@ def build_digest_html(user, notifications):
         "site_name": getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS"),
         "base_url": getattr(settings, "WAGTAILADMIN_BASE_URL", ""),
     }
-    return render_to_string("notifications/emails/digest.html", context)
+    if template is None:
+        template = get_email_template(DIGEST_TEMPLATE)
+    return template.render(context)
 
 
-def send_email_notification(notification):
+def email_skip_reason(notification, limiter):
     """
-    Send a single email notification.
+    Return why *notification* must not be emailed, or "" if it can be.
 
-    Respects the rate limit of 5 emails per user per day.
-    On success sets ``status='sent'``; on failure sets ``status='failed'``.
+    Checks the rate limit of 5 emails per user per day and that the
+    recipient has an address.
     """
     user = notification.recipient
+    if not limiter.allow_email(user.pk):
+        return f"Rate limit: max {EMAIL_DAILY_LIMIT} emails/day exceeded"
+    if not user.email:
+        return "User has no email address"
+    return ""
 
-    # Rate limit: max 5 emails/day
-    if _email_count_today(user) >= 5:
-        notification.status = "skipped"
-        notification.error_message = "Rate limit: max 5 emails/day exceeded"
-        notification.save(update_fields=["status", "error_message"])
-        return False
 
-    if not user.email:
+def build_email_message(notification, connection=None, renderer=None):
+    """
+    Return the ``EmailMultiAlternatives`` for *notification* (text and
+    HTML parts, one-click unsubscribe headers), bound to *connection*.
+    """
+    user = notification.recipient
+    renderer = renderer or EmailRenderer()
+    unsubscribe_token = generate_unsubscribe_token(
+        user, notification.notification_type
+    )
+    html_body = build_email_html(notification, unsubscribe_token, renderer)
+    text_body = renderer.text(notification)
+
+    base_url = getattr(settings, "WAGTAILADMIN_BASE_URL", "")
+    unsubscribe_url = f"{base_url}/notifications/unsubscribe/{unsubscribe_token}/"
+
+    msg = EmailMultiAlternatives(
+        subject=notification.title,
+        body=text_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        headers={
+            "List-Unsubscribe": f"<{unsubscribe_url}>",
+            "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+        },
+        connection=connection,
+    )
+    msg.attach_alternative(html_body, "text/html")
+    return msg
+
+
+def send_email_notification(notification, limiter=None):
+    """
+    Send a single email notification over its own connection.
+
+    Respects the rate limit of 5 emails per user per day; pass the
+    batch's *limiter* to avoid a counter query per notification.
+    On success sets ``status='sent'``; on failure sets ``status='failed'``.
+    Batches go through ``apps.notifications.dispatch.EmailDispatcher``.
+    """
+    user = notification.recipient
+    if limiter is None:
+        limiter = RateLimiter()
+
+    reason = email_skip_reason(notification, limiter)
+    if reason:
         notification.status = "skipped"
-        notification.error_message = "User has no email address"
+        notification.error_message = reason
         notification.save(update_fields=["status", "error_message"])
         return False
 
     try:
-        html_body = build_email_html(notification)
-        text_body = strip_tags(notification.body)
-
-        unsubscribe_token = generate_unsubscribe_token(
-            user, notification.notification_type
-        )
-        base_url = getattr(settings, "WAGTAILADMIN_BASE_URL", "")
-        unsubscribe_url = f"{base_url}/notifications/unsubscribe/{unsubscribe_token}/"
-
-        msg = EmailMultiAlternatives(
-            subject=notification.title,
-            body=text_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email],
-            headers={
-                "List-Unsubscribe": f"<{unsubscribe_url}>",
-                "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
-            },
-        )
-        msg.attach_alternative(html_body, "text/html")
-        msg.send(fail_silently=False)
+        build_email_message(notification).send(fail_silently=False)
 
         notification.status = "sent"
         notification.sent_at = timezone.now()
         notification.save(update_fields=["status", "sent_at"])
+        limiter.record(user.pk, "email")
         return True
 
     except Exception as exc:
@@ -302,138 +545,128 @@ def send_email_notification(notification):
 # ---------------------------------------------------------------------------
 
 
-def send_push_notification(notification):
+def send_push_notification(notification, limiter=None):
     """
-    Send a Web Push notification via pywebpush.
+    Send a Web Push notification to all of the recipient's devices.
 
-    Respects the rate limit of 3 pushes per user per hour.
+    Respects the rate limit of 3 pushes per user per hour; pass the
+    batch's *limiter* to avoid a counter query per notification.
+    Batches go through ``apps.notifications.push.PushDispatcher``.
     """
-    user = notification.recipient
-
-    # Rate limit: max 3 push/hour
-    if _push_count_last_hour(user) >= 3:
-        notification.status = "skipped"
-        notification.error_message = "Rate limit: max 3 push/hour exceeded"
-        notification.save(update_fields=["status", "error_message"])
-        return False
-
-    subscriptions = PushSubscription.objects.filter(user=user, is_active=True)
-    if not subscriptions.exists():
-        notification.status = "skipped"
-        notification.error_message = "No active push subscriptions"
-        notification.save(update_fields=["status", "error_message"])
-        return False
+    sent, _not_sent = PushDispatcher(limiter).dispatch([notification])
+    return bool(sent)
 
-    vapid_settings = getattr(settings, "WEBPUSH_SETTINGS", {})
-    vapid_private_key = vapid_settings.get("VAPID_PRIVATE_KEY", "")
-    vapid_admin_email = vapid_settings.get("VAPID_ADMIN_EMAIL", "")
-
-    if not vapid_private_key:
-        notification.status = "failed"
-        notification.error_message = "VAPID private key not configured"
-        notification.save(update_fields=["status", "error_message"])
-        return False
-
-    payload = json.dumps(
-        {
-            "title": notification.title,
-            "body": strip_tags(notification.body),
-            "url": notification.url,
-            "type": notification.notification_type,
-        }
-    )
 
-    vapid_claims = {
-        "sub": f"mailto:{vapid_admin_email}",
-    }
-
-    sent_any = False
-    errors = []
+# ---------------------------------------------------------------------------
+# Unsubscribe tokens (HMAC-SHA256)
+# ---------------------------------------------------------------------------
 
-    for sub in subscriptions:
-        try:
-            from pywebpush import webpush, WebPushException  # noqa: F811
-
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {
-                        "p256dh": sub.p256dh_key,
-                        "auth": sub.auth_key,
-                    },
-                },
-                data=payload,
-                vapid_private_key=vapid_private_key,
-                vapid_claims=vapid_claims,
-            )
-            sub.last_used = timezone.now()
-            sub.save(update_fields=["last_used"])
-            sent_any = True
-
-        except Exception as exc:
-            error_msg = str(exc)
-            errors.append(error_msg)
-            logger.warning(
-                "Push failed for subscription %s: %s", sub.pk, error_msg
-            )
-            # Deactivate subscription on 410 Gone (unsubscribed)
-            if "410" in error_msg or "Gone" in error_msg:
-                sub.is_active = False
-                sub.save(update_fields=["is_active"])
 
-    if sent_any:
-        notification.status = "sent"
-        notification.sent_at = timezone.now()
-        notification.save(update_fields=["status", "sent_at"])
-        return True
-    else:
-        notification.status = "failed"
-        notification.error_message = "; ".join(errors)[:1000]
-        notification.save(update_fields=["status", "error_message"])
-        return False
+def _unsubscribe_signature(user_id, notification_type, issued=""):
+    """Truncated HMAC-SHA256 of the token payload, URL-safe base64."""
+    payload = f"unsubscribe:{user_id}:{notification_type}"
+    if issued:
+        payload = f"{payload}:{issued}"
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode("ascii")
 
 
-# ---------------------------------------------------------------------------
-# Unsubscribe tokens (HMAC-SHA256)
-# ---------------------------------------------------------------------------
+def _legacy_unsubscribe_token(user_id, notification_type):
+    """64-character hex token stored in ``UnsubscribeToken`` by older releases."""
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"{user_id}:{notification_type}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
 
 
 def generate_unsubscribe_token(user, notification_type):
     """
-    Generate or retrieve a deterministic HMAC-SHA256 token for one-click
-    unsubscribe.  Tokens are persisted in ``UnsubscribeToken`` for
-    reverse lookup.
+    Return the signed one-click unsubscribe token for *user* and
+    *notification_type*.
+
+    The token carries both values, its issue time (milliseconds, base
+    36) and their HMAC (``<user id>.<type>.<issued>.<signature>``), so
+    generating it does no I/O and revocation can reject the links
+    issued before a cutoff only.
 
     Returns
     -------
     str
-        64-character hex token.
+        URL-safe token.
     """
-    secret = settings.SECRET_KEY
-    message = f"{user.pk}:{notification_type}"
-    token = hmac.new(
-        secret.encode("utf-8"),
-        message.encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
-
-    UnsubscribeToken.objects.update_or_create(
-        user=user,
-        notification_type=notification_type,
-        defaults={"token": token},
-    )
-    return token
+    issued = int_to_base36(int(timezone.now().timestamp() * 1000))
+    signature = _unsubscribe_signature(user.pk, notification_type, issued)
+    return f"{user.pk}.{notification_type}.{issued}.{signature}"
 
 
 def verify_unsubscribe_token(token):
     """
-    Look up *token* and return ``(user, notification_type)`` or ``None``.
+    Check *token* and return ``(user, notification_type)`` or ``None``.
+
+    Signed tokens are verified by HMAC and rejected if they were issued
+    before the last revocation of the user's links for that type (signed
+    tokens without an issue time count as issued at the epoch);
+    64-character tokens from older emails are looked up in
+    ``UnsubscribeToken``.
     """
-    try:
-        unsub = UnsubscribeToken.objects.select_related("user").get(token=token)
+    parts = token.split(".")
+    if len(parts) == 1:
+        try:
+            unsub = UnsubscribeToken.objects.select_related("user").get(
+                token=token, revoked_at__isnull=True
+            )
+        except UnsubscribeToken.DoesNotExist:
+            return None
         return unsub.user, unsub.notification_type
-    except UnsubscribeToken.DoesNotExist:
+
+    if len(parts) == 3:
+        user_id, notification_type, signature = parts
+        issued = ""
+    elif len(parts) == 4:
+        user_id, notification_type, issued, signature = parts
+    else:
+        return None
+    if not user_id.isdigit() or not hmac.compare_digest(
+        signature, _unsubscribe_signature(user_id, notification_type, issued)
+    ):
         return None
+    revoked_at = (
+        UnsubscribeToken.objects.filter(
+            user_id=user_id,
+            notification_type=notification_type,
+            revoked_at__isnull=False,
+        )
+        .values_list("revoked_at", flat=True)
+        .first()
+    )
+    if revoked_at is not None:
+        issued_ms = base36_to_int(issued) if issued else 0
+        if issued_ms <= int(revoked_at.timestamp() * 1000):
+            return None
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return None
+    return user, notification_type
+
+
+def revoke_unsubscribe_tokens(user, notification_type):
+    """
+    Invalidate every unsubscribe link (signed or legacy) issued to
+    *user* for *notification_type* so far.
+
+    Links generated afterwards are valid again.
+    """
+    UnsubscribeToken.objects.update_or_create(
+        user=user,
+        notification_type=notification_type,
+        defaults={
+            "token": _legacy_unsubscribe_token(user.pk, notification_type),
+            "revoked_at": timezone.now(),
+        },
+    )
 
 
 def mask_email(email):
@@ -12,13 +12,11 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.utils import timezone
 
-from .models import NotificationQueue, PushSubscription
-from .services import (
-    build_digest_html,
-    create_notification,
-    send_email_notification,
-    send_push_notification,
-)
+from .consumer import drain_queue, drain_urgent, start_consumers
+from .digest import send_digests
+from .models import PushSubscription
+from .retention import purge_notifications
+from .services import create_notification
 
 logger = logging.getLogger(__name__)
 
@@ -36,58 +34,26 @@ def process_notification_queue():
 
     Picks up ``NotificationQueue`` entries with ``status='pending'`` that
     either have no ``scheduled_for`` or whose ``scheduled_for`` is in the
-    past.  Dispatches each to the appropriate channel handler.
+    past, claiming them in batches so overlapping runs never send an
+    entry twice (see ``apps.notifications.consumer``).  Large backlogs
+    are shared with extra consumers on the other cluster workers.
 
     Designed to run every 5 minutes via Django-Q2 schedule.
     """
-    now = timezone.now()
-    pending = NotificationQueue.objects.filter(
-        status="pending",
-    ).filter(
-        Q(scheduled_for__isnull=True) | Q(scheduled_for__lte=now),
-    ).select_related("recipient").order_by("created_at")[:200]
-
-    sent_count = 0
-    fail_count = 0
-
-    for notification in pending:
-        try:
-            if notification.channel == "email":
-                ok = send_email_notification(notification)
-            elif notification.channel == "push":
-                ok = send_push_notification(notification)
-            elif notification.channel == "in_app":
-                # In-app notifications are marked sent immediately
-                notification.status = "sent"
-                notification.sent_at = now
-                notification.save(update_fields=["status", "sent_at"])
-                ok = True
-            else:
-                notification.status = "skipped"
-                notification.error_message = f"Unknown channel: {notification.channel}"
-                notification.save(update_fields=["status", "error_message"])
-                ok = False
-
-            if ok:
-                sent_count += 1
-            else:
-                fail_count += 1
-
-        except Exception as exc:
-            logger.exception(
-                "Error processing notification %s: %s", notification.pk, exc
-            )
-            notification.status = "failed"
-            notification.error_message = str(exc)[:1000]
-            notification.save(update_fields=["status", "error_message"])
-            fail_count += 1
+    start_consumers()
+    return drain_queue()
+
 
-    logger.info(
-        "Notification queue processed: %d sent, %d failed/skipped",
-        sent_count,
-        fail_count,
-    )
-    return {"sent": sent_count, "failed": fail_count}
+def process_urgent_notifications():
+    """
+    Deliver pending urgent notifications (aid requests, waitlist
+    promotions, payment instructions) only.
+
+    Creating an urgent entry already queues this lane on the cluster;
+    this task is scheduled every minute as a backstop for entries whose
+    trigger was lost (see ``idea/91-NOTIFICATIONS.md``).
+    """
+    return drain_urgent()
 
 
 # ---------------------------------------------------------------------------
@@ -100,71 +66,10 @@ def send_daily_digest():
     Compile and send daily digest emails for users with
     ``digest_frequency='daily'``.
 
-    Gathers all pending email notifications for these users and sends
-    them as a single digest email.
+    Each user's pending email notifications (the latest 50) are sent as
+    a single digest email; see ``apps.notifications.digest``.
     """
-    from django.core.mail import EmailMultiAlternatives
-    from django.utils.html import strip_tags
-
-    from django.conf import settings as django_settings
-
-    now = timezone.now()
-
-    # Find users with daily digest preference and pending notifications
-    users_with_pending = (
-        NotificationQueue.objects.filter(
-            status="pending",
-            channel="email",
-            recipient__digest_frequency="daily",
-        )
-        .values_list("recipient", flat=True)
-        .distinct()
-    )
-
-    sent_count = 0
-    for user_id in users_with_pending:
-        try:
-            user = User.objects.get(pk=user_id, is_active=True)
-            if not user.email:
-                continue
-
-            notifications = list(
-                NotificationQueue.objects.filter(
-                    recipient=user,
-                    channel="email",
-                    status="pending",
-                ).order_by("-created_at")[:50]
-            )
-
-            if not notifications:
-                continue
-
-            html_body = build_digest_html(user, notifications)
-            text_lines = [f"- {n.title}: {n.body}" for n in notifications]
-            text_body = "\n".join(text_lines)
-
-            site_name = getattr(
-                django_settings, "WAGTAIL_SITE_NAME", "Club CMS"
-            )
-            msg = EmailMultiAlternatives(
-                subject=f"[{site_name}] Daily digest - {now.strftime('%d/%m/%Y')}",
-                body=text_body,
-                from_email=django_settings.DEFAULT_FROM_EMAIL,
-                to=[user.email],
-            )
-            msg.attach_alternative(html_body, "text/html")
-            msg.send(fail_silently=False)
-
-            # Mark all as sent
-            NotificationQueue.objects.filter(
-                pk__in=[n.pk for n in notifications]
-            ).update(status="sent", sent_at=now)
-
-            sent_count += 1
-
-        except Exception as exc:
-            logger.exception("Failed to send daily digest for user %s: %s", user_id, exc)
-
+    sent_count = send_digests("daily")
     logger.info("Daily digests sent: %d", sent_count)
     return {"digests_sent": sent_count}
 
@@ -177,69 +82,9 @@ def send_daily_digest():
 def send_weekly_digest():
     """
     Compile and send weekly digest emails for users with
-    ``digest_frequency='weekly'``.
+    ``digest_frequency='weekly'`` (the latest 100 notifications each).
     """
-    from django.core.mail import EmailMultiAlternatives
-
-    from django.conf import settings as django_settings
-
-    now = timezone.now()
-
-    users_with_pending = (
-        NotificationQueue.objects.filter(
-            status="pending",
-            channel="email",
-            recipient__digest_frequency="weekly",
-        )
-        .values_list("recipient", flat=True)
-        .distinct()
-    )
-
-    sent_count = 0
-    for user_id in users_with_pending:
-        try:
-            user = User.objects.get(pk=user_id, is_active=True)
-            if not user.email:
-                continue
-
-            notifications = list(
-                NotificationQueue.objects.filter(
-                    recipient=user,
-                    channel="email",
-                    status="pending",
-                ).order_by("-created_at")[:100]
-            )
-
-            if not notifications:
-                continue
-
-            html_body = build_digest_html(user, notifications)
-            text_lines = [f"- {n.title}: {n.body}" for n in notifications]
-            text_body = "\n".join(text_lines)
-
-            site_name = getattr(
-                django_settings, "WAGTAIL_SITE_NAME", "Club CMS"
-            )
-            msg = EmailMultiAlternatives(
-                subject=f"[{site_name}] Weekly digest - {now.strftime('%d/%m/%Y')}",
-                body=text_body,
-                from_email=django_settings.DEFAULT_FROM_EMAIL,
-                to=[user.email],
-            )
-            msg.attach_alternative(html_body, "text/html")
-            msg.send(fail_silently=False)
-
-            NotificationQueue.objects.filter(
-                pk__in=[n.pk for n in notifications]
-            ).update(status="sent", sent_at=now)
-
-            sent_count += 1
-
-        except Exception as exc:
-            logger.exception(
-                "Failed to send weekly digest for user %s: %s", user_id, exc
-            )
-
+    sent_count = send_digests("weekly")
     logger.info("Weekly digests sent: %d", sent_count)
     return {"digests_sent": sent_count}
 
@@ -299,15 +144,14 @@ def check_expiring_memberships():
 
 def cleanup_old_notifications():
     """
-    Delete notifications older than 90 days.  Runs daily.
-    """
-    cutoff = timezone.now() - timedelta(days=90)
-    deleted_count, _ = NotificationQueue.objects.filter(
-        created_at__lt=cutoff,
-    ).delete()
+    Delete notifications older than 90 days, keeping their daily counts
+    in ``NotificationStat``.  Runs daily.
 
-    logger.info("Cleaned up %d old notifications", deleted_count)
-    return {"deleted": deleted_count}
+    Deletes in bounded chunks; see ``apps.notifications.retention``.
+    """
+    result = purge_notifications()
+    logger.info("Cleaned up %d old notifications", result["deleted"])
+    return {"deleted": result["deleted"]}
 
 
 def cleanup_inactive_subscriptions():
@@ -0,0 +1,85 @@
+"""
+Test and benchmark helpers for notification delivery.
+
+``LocalSMTPServer`` is a minimal in-process SMTP stand-in used by the
+tests and the ``benchmark_email_dispatch`` command.  Not used at
+runtime.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts every message; just enough SMTP for ``smtplib``."""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        # Stands in for the TLS handshake and AUTH of a real relay
+        time.sleep(server.handshake_delay)
+        self._reply("220 localhost ESMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                    drop = (
+                        server.drop_every
+                        and server.messages % server.drop_every == 0
+                    )
+                self._reply("250 OK")
+                if drop:
+                    return
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP sink on 127.0.0.1.
+
+    *handshake_delay* (seconds) is spent on every new connection;
+    *drop_every* closes the connection after every N-th message to
+    exercise reconnects.  ``connections`` and ``messages`` count what
+    was received.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay=0.0, drop_every=0):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.drop_every = drop_every
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,209 @@
+"""
+Tests for apps/notifications/consumer.py
+
+Tests batch claims, lease expiry, priority lanes and that draining the
+queue sends every entry exactly once.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from apps.notifications.consumer import (
+    CLAIM_LEASE,
+    claim_batch,
+    drain_queue,
+    drain_urgent,
+    mark_claimed,
+    release_expired_claims,
+    start_consumers,
+)
+from apps.notifications.models import (
+    PRIORITY_BULK,
+    PRIORITY_NORMAL,
+    PRIORITY_URGENT,
+    NotificationQueue,
+)
+from apps.notifications.services import (
+    build_notifications,
+    create_notification,
+    save_notifications,
+)
+
+
+def _queue(user, count=1, channel="in_app", **kwargs):
+    NotificationQueue.objects.bulk_create(
+        [
+            NotificationQueue(
+                notification_type="news_published",
+                recipient=user,
+                channel=channel,
+                title=f"News {index}",
+                body="Body",
+                **kwargs,
+            )
+            for index in range(count)
+        ]
+    )
+
+
+@pytest.mark.django_db
+class TestClaims:
+    """A batch is claimed by exactly one worker."""
+
+    def test_claims_are_disjoint(self, user_factory):
+        _queue(user_factory(), count=5)
+
+        first = claim_batch(limit=3)
+        second = claim_batch(limit=3)
+
+        assert len(first) == 3
+        assert len(second) == 2
+        assert not {n.pk for n in first} & {n.pk for n in second}
+        assert all(n.status == "processing" and n.claim_token for n in first + second)
+        assert claim_batch() == []
+
+    def test_claim_skips_rows_taken_meanwhile(self, user_factory):
+        _queue(user_factory(), count=2)
+        ids = list(NotificationQueue.objects.values_list("pk", flat=True))
+        mark_claimed(ids[:1], timezone.now())  # another worker wins the race
+
+        token = mark_claimed(ids, timezone.now())
+
+        claimed = NotificationQueue.objects.filter(claim_token=token)
+        assert list(claimed.values_list("pk", flat=True)) == ids[1:]
+
+    def test_scheduled_entries_wait(self, user_factory):
+        _queue(user_factory(), scheduled_for=timezone.now() + timedelta(hours=1))
+
+        assert claim_batch() == []
+
+    def test_expired_leases_released(self, user_factory):
+        _queue(user_factory(), count=2)
+        stale, fresh = claim_batch()
+        NotificationQueue.objects.filter(pk=stale.pk).update(
+            claimed_at=timezone.now() - CLAIM_LEASE - timedelta(seconds=1)
+        )
+
+        assert release_expired_claims() == 1
+        assert [n.pk for n in claim_batch()] == [stale.pk]
+        fresh.refresh_from_db()
+        assert fresh.status == "processing"
+
+
+@pytest.mark.django_db
+class TestDrainQueue:
+    """Draining sends every due entry once, batch by batch."""
+
+    def test_drains_in_batches(self, user_factory):
+        _queue(user_factory(), count=5)
+
+        with patch(
+            "apps.notifications.consumer.claim_batch", wraps=claim_batch
+        ) as claims:
+            result = drain_queue(batch_size=2)
+
+        assert result == {"sent": 5, "failed": 0}
+        assert claims.call_count == 3
+        statuses = NotificationQueue.objects.values_list("status", flat=True)
+        assert set(statuses) == {"sent"}
+
+    def test_overlapping_runs_do_not_resend(self, user_factory, mailoutbox):
+        _queue(user_factory(), count=3, channel="email")
+        claimed_elsewhere = claim_batch(limit=2)
+
+        drain_queue()
+
+        assert len(mailoutbox) == 1
+        assert NotificationQueue.objects.filter(status="processing").count() == len(
+            claimed_elsewhere
+        )
+
+    def test_mixed_channels(self, user_factory, mailoutbox):
+        user = user_factory()
+        _queue(user, channel="email")
+        _queue(user, channel="push")
+        _queue(user, channel="in_app")
+        _queue(user, channel="fax")
+
+        result = drain_queue()
+
+        assert result == {"sent": 2, "failed": 2}
+        statuses = dict(NotificationQueue.objects.values_list("channel", "status"))
+        assert statuses == {
+            "email": "sent",
+            "push": "failed",  # no VAPID key configured
+            "in_app": "sent",
+            "fax": "skipped",
+        }
+
+    def test_no_extra_consumers_without_django_q(self, user_factory):
+        _queue(user_factory(), count=3)
+
+        assert start_consumers(workers=4) == 0
+
+
+@pytest.mark.django_db
+class TestPriorityLanes:
+    """Urgent entries overtake bulk traffic."""
+
+    def test_priority_derived_from_type(self, user_factory):
+        user = user_factory(push_notifications=True)
+        for notification_type in (
+            "mutual_aid_request",
+            "news_published",
+            "event_registered",
+        ):
+            create_notification(notification_type, "Title", "Body", recipients=[user])
+
+        priorities = dict(
+            NotificationQueue.objects.values_list("notification_type", "priority")
+        )
+        assert priorities == {
+            "mutual_aid_request": PRIORITY_URGENT,
+            "news_published": PRIORITY_BULK,
+            "event_registered": PRIORITY_NORMAL,
+        }
+
+    def test_urgent_types_skip_digests(self, user_factory):
+        user_factory(digest_frequency="daily", aid_requests=True)
+
+        create_notification("aid_request", "Help", "Body", channels=["email"])
+
+        assert NotificationQueue.objects.get().scheduled_for is None
+
+    def test_urgent_claimed_before_older_bulk(self, user_factory):
+        user = user_factory()
+        _queue(user, count=3, priority=PRIORITY_BULK)
+        _queue(user, priority=PRIORITY_URGENT)
+
+        batch = claim_batch(limit=2)
+
+        assert [n.priority for n in batch] == [PRIORITY_URGENT, PRIORITY_BULK]
+
+    def test_drain_urgent_leaves_bulk_lanes(self, user_factory):
+        user = user_factory()
+        _queue(user, count=3, priority=PRIORITY_BULK)
+        _queue(user, count=2, priority=PRIORITY_URGENT)
+
+        assert drain_urgent() == {"sent": 2, "failed": 0}
+        assert set(
+            NotificationQueue.objects.filter(status="pending").values_list(
+                "priority", flat=True
+            )
+        ) == {PRIORITY_BULK}
+
+    def test_urgent_entries_trigger_fast_path(self, user_factory):
+        user = user_factory()
+
+        with patch("apps.notifications.consumer.enqueue_urgent_drain") as enqueue:
+            save_notifications(
+                build_notifications("news_published", "N", "B", recipients=[user])
+            )
+            assert not enqueue.called
+            save_notifications(
+                build_notifications("waitlist_promoted", "W", "B", recipients=[user])
+            )
+            assert enqueue.call_count == 1
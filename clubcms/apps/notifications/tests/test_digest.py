@@ -0,0 +1,162 @@
+"""
+Tests for apps/notifications/digest.py
+
+Checks grouping, per-digest limits, the single SMTP session and that
+the query count does not grow with the number of recipients.
+"""
+
+import pytest
+from django.core.mail import get_connection
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.notifications import tasks
+from apps.notifications.digest import iter_digests, pending_digest_entries, send_digests
+from apps.notifications.models import NotificationQueue
+from apps.notifications.testing import LocalSMTPServer
+
+
+def _queue(user, count=1, channel="email", title="News"):
+    for i in range(count):
+        NotificationQueue.objects.create(
+            notification_type="news_published",
+            recipient=user,
+            channel=channel,
+            title=f"{title} {i}",
+            body="<p>Body</p>",
+        )
+
+
+@pytest.mark.django_db
+class TestGrouping:
+    """Entries are streamed once and grouped per recipient."""
+
+    def test_groups_by_recipient_with_limit(self, user_factory):
+        alice = user_factory(digest_frequency="daily")
+        bob = user_factory(digest_frequency="daily")
+        _queue(alice, 3)
+        _queue(bob, 1)
+
+        digests = list(iter_digests(pending_digest_entries("daily"), limit=2))
+
+        assert [(user.pk, len(items)) for user, items in digests] == [
+            (alice.pk, 2),
+            (bob.pk, 1),
+        ]
+        # The most recent entries are kept
+        assert [n.title for n in digests[0][1]] == ["News 2", "News 1"]
+
+    def test_excludes_other_frequencies_and_unreachable_users(self, user_factory):
+        _queue(user_factory(digest_frequency="weekly"))
+        no_email = user_factory(digest_frequency="daily")
+        type(no_email).objects.filter(pk=no_email.pk).update(email="")
+        _queue(no_email)
+        _queue(user_factory(digest_frequency="daily", is_active=False))
+        _queue(user_factory(digest_frequency="daily"), channel="push")
+
+        assert not pending_digest_entries("daily").exists()
+
+
+@pytest.mark.django_db
+class TestSendDigests:
+    """One digest per recipient, over one connection."""
+
+    def test_daily_digest(self, user_factory, mailoutbox):
+        alice = user_factory(digest_frequency="daily")
+        _queue(alice, 2)
+        _queue(user_factory(digest_frequency="weekly"))
+
+        assert tasks.send_daily_digest() == {"digests_sent": 1}
+
+        assert len(mailoutbox) == 1
+        message = mailoutbox[0]
+        assert message.to == [alice.email]
+        assert "Daily digest" in message.subject
+        assert "- News 0: <p>Body</p>" in message.body
+        sent = NotificationQueue.objects.filter(recipient=alice, status="sent")
+        assert sent.count() == 2
+        assert NotificationQueue.objects.filter(status="pending").count() == 1
+
+    def test_weekly_digest(self, user_factory, mailoutbox):
+        _queue(user_factory(digest_frequency="weekly"), 3)
+
+        assert tasks.send_weekly_digest() == {"digests_sent": 1}
+        assert "Weekly digest" in mailoutbox[0].subject
+
+    def test_entries_over_limit_stay_pending(self, user_factory, mailoutbox):
+        _queue(user_factory(digest_frequency="daily"), 3)
+
+        assert send_digests("daily", limit=2) == 1
+        assert NotificationQueue.objects.filter(status="pending").count() == 1
+
+    def test_one_smtp_session(self, user_factory):
+        for _ in range(4):
+            _queue(user_factory(digest_frequency="daily"), 2)
+
+        with LocalSMTPServer() as server:
+            smtp = get_connection(
+                "django.core.mail.backends.smtp.EmailBackend",
+                host="127.0.0.1",
+                port=server.port,
+                use_tls=False,
+                username="",
+                password="",
+            )
+            assert send_digests("daily", connection=smtp) == 4
+
+        assert server.connections == 1
+        assert server.messages == 4
+        assert not NotificationQueue.objects.filter(status="pending").exists()
+
+    def test_failed_digest_stays_pending(self, user_factory, mailoutbox, monkeypatch):
+        from apps.notifications import digest
+
+        failing = user_factory(digest_frequency="daily")
+        _queue(failing)
+        _queue(user_factory(digest_frequency="daily"))
+        real_send = digest.send_message
+
+        def send_message(conn, message):
+            if message.to == [failing.email]:
+                raise OSError("boom")
+            return real_send(conn, message)
+
+        monkeypatch.setattr(digest, "send_message", send_message)
+
+        assert send_digests("daily") == 1
+        assert NotificationQueue.objects.get(recipient=failing).status == "pending"
+
+    def test_entries_marked_sent_per_chunk(self, user_factory, mailoutbox, monkeypatch):
+        from apps.notifications import digest
+
+        for _ in range(3):
+            _queue(user_factory(digest_frequency="daily"), 2)
+        flushed = []
+        real_mark_sent = digest.mark_sent
+
+        def mark_sent(ids, now, *args):
+            # Entries of every earlier chunk are already saved
+            flushed.append(
+                (len(ids), NotificationQueue.objects.filter(status="sent").count())
+            )
+            real_mark_sent(ids, now, *args)
+
+        monkeypatch.setattr(digest, "mark_sent", mark_sent)
+
+        assert send_digests("daily", chunk_size=2) == 3
+        assert flushed[:2] == [(4, 0), (2, 4)]
+        assert not NotificationQueue.objects.filter(status="pending").exists()
+
+    def test_queries_do_not_grow_with_recipients(self, user_factory, mailoutbox):
+        def run(users):
+            for _ in range(users):
+                _queue(user_factory(digest_frequency="daily"), 2)
+            with CaptureQueriesContext(connection) as ctx:
+                send_digests("daily")
+            return len(ctx.captured_queries)
+
+        few = run(2)
+        many = run(10)
+
+        assert many == few
+        assert len(mailoutbox) == 12
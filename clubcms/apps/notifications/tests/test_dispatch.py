@@ -0,0 +1,134 @@
+"""
+Tests for apps/notifications/dispatch.py
+
+Runs the dispatcher against the local SMTP stand-in to check session
+reuse, reconnects and bulk status updates.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.notifications.dispatch import EmailDispatcher
+from apps.notifications.models import NotificationQueue
+from apps.notifications.testing import LocalSMTPServer
+
+
+def _smtp_connection(server):
+    return get_connection(
+        "django.core.mail.backends.smtp.EmailBackend",
+        host="127.0.0.1",
+        port=server.port,
+        use_tls=False,
+        username="",
+        password="",
+    )
+
+
+def _queue(users):
+    for user in users:
+        NotificationQueue.objects.create(
+            notification_type="news_published",
+            recipient=user,
+            channel="email",
+            title="News",
+            body="<p>Body</p>",
+        )
+    return list(NotificationQueue.objects.select_related("recipient").order_by("pk"))
+
+
+@pytest.mark.django_db
+class TestEmailDispatcher:
+    """A batch is sent over one SMTP session."""
+
+    def test_one_session_per_batch(self, user_factory):
+        notifications = _queue([user_factory() for _ in range(5)])
+
+        with LocalSMTPServer() as server:
+            dispatcher = EmailDispatcher(connection=_smtp_connection(server))
+            sent, not_sent = dispatcher.dispatch(notifications)
+
+        assert (sent, not_sent) == (5, 0)
+        assert server.connections == 1
+        assert server.messages == 5
+        statuses = NotificationQueue.objects.values_list("status", flat=True)
+        assert set(statuses) == {"sent"}
+
+    def test_reconnects_after_drop(self, user_factory):
+        notifications = _queue([user_factory() for _ in range(5)])
+
+        with LocalSMTPServer(drop_every=2) as server:
+            dispatcher = EmailDispatcher(connection=_smtp_connection(server))
+            sent, _not_sent = dispatcher.dispatch(notifications)
+
+        assert sent == 5
+        assert server.messages == 5
+        assert server.connections == 3
+
+    def test_statuses_saved_in_bulk(self, user_factory, mailoutbox):
+        users = [user_factory() for _ in range(3)]
+        users[1].email = ""
+        users[1].save()
+        notifications = _queue(users)
+
+        with CaptureQueriesContext(connection) as queries:
+            sent, not_sent = EmailDispatcher().dispatch(notifications)
+
+        assert (sent, not_sent) == (2, 1)
+        updates = [
+            q for q in queries.captured_queries
+            if q["sql"].startswith('UPDATE "notifications_notificationqueue"')
+        ]
+        assert len(updates) == 1
+        assert len(mailoutbox) == 2
+        skipped = NotificationQueue.objects.get(recipient=users[1])
+        assert skipped.status == "skipped"
+        assert skipped.error_message == "User has no email address"
+
+    def test_connection_failure_marks_batch_failed(self, user_factory):
+        notifications = _queue([user_factory()])
+        server = LocalSMTPServer()
+        port = server.port
+        server.server_close()
+        connection = get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1", port=port, use_tls=False, timeout=1,
+        )
+
+        assert EmailDispatcher(connection=connection).dispatch(notifications) == (0, 1)
+        assert NotificationQueue.objects.get().status == "failed"
+
+    def test_connection_failure_keeps_skipped_entries(self, user_factory):
+        users = [user_factory() for _ in range(2)]
+        users[1].email = ""
+        users[1].save()
+        notifications = _queue(users)
+        server = LocalSMTPServer()
+        port = server.port
+        server.server_close()
+        connection = get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1", port=port, use_tls=False, timeout=1,
+        )
+
+        assert EmailDispatcher(connection=connection).dispatch(notifications) == (0, 2)
+        assert NotificationQueue.objects.get(recipient=users[0]).status == "failed"
+        assert NotificationQueue.objects.get(recipient=users[1]).status == "skipped"
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """The benchmark delivers every message through both paths."""
+
+    def test_reports_speed_up(self):
+        out = StringIO()
+
+        call_command("benchmark_email_dispatch", emails=5, handshake_ms=5, stdout=out)
+
+        assert "Speed-up" in out.getvalue()
+        assert "5 SMTP session(s)" in out.getvalue()
+        assert "1 SMTP session(s)" in out.getvalue()
@@ -0,0 +1,137 @@
+"""
+Tests for notification fan-out in apps/notifications/services.py
+
+Tests SQL-side preference filtering, digest scheduling, chunked
+inserts and that the list and queryset paths agree.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.notifications import services
+from apps.notifications.models import NotificationQueue
+from apps.notifications.services import (
+    build_notifications,
+    create_notification,
+    fan_out_notification,
+)
+
+User = get_user_model()
+
+
+def _entries():
+    return set(
+        NotificationQueue.objects.values_list("recipient__username", "channel")
+    )
+
+
+@pytest.mark.django_db
+class TestFanOutPreferences:
+    """Preferences are applied in SQL per channel."""
+
+    def test_master_switches_and_type_preference(self, user_factory):
+        user_factory(username="both", push_notifications=True)
+        user_factory(username="email_only")
+        user_factory(username="muted", email_notifications=False)
+        user_factory(username="no_news", news_updates=False, push_notifications=True)
+        user_factory(username="inactive", is_active=False)
+
+        count = create_notification("news_published", "News", "Body")
+
+        assert count == 3
+        assert _entries() == {
+            ("both", "email"),
+            ("both", "push"),
+            ("email_only", "email"),
+        }
+
+    def test_in_app_ignores_master_switches(self, user_factory):
+        user_factory(username="muted", email_notifications=False)
+
+        create_notification("event_reminder", "Ride", "Body", channels=["in_app"])
+
+        assert _entries() == {("muted", "in_app")}
+
+    def test_matches_list_path(self, user_factory):
+        user_factory(push_notifications=True, digest_frequency="immediate")
+        user_factory(event_updates=False, push_notifications=True)
+        user_factory(email_notifications=False, digest_frequency="weekly")
+        users = User.objects.order_by("pk")
+
+        built = build_notifications("event_published", "T", "B", recipients=list(users))
+        expected = {(n.recipient.pk, n.channel, n.scheduled_for) for n in built}
+        fan_out_notification("event_published", "T", "B", recipients=users)
+
+        queued = NotificationQueue.objects.values_list(
+            "recipient_id", "channel", "scheduled_for"
+        )
+        assert set(queued) == expected
+
+
+@pytest.mark.django_db
+class TestFanOutScheduling:
+    """Digest windows are computed once and applied per frequency."""
+
+    def test_digest_frequency(self, user_factory):
+        now = user_factory(username="now", digest_frequency="immediate")
+        daily = user_factory(username="daily", digest_frequency="daily")
+        weekly = user_factory(username="weekly", digest_frequency="weekly")
+
+        with patch.object(
+            services, "_next_digest_time", wraps=services._next_digest_time
+        ) as next_time:
+            create_notification("news_published", "N", "B", channels=["email"])
+
+        assert next_time.call_count == 2
+        scheduled = dict(
+            NotificationQueue.objects.values_list("recipient_id", "scheduled_for")
+        )
+        assert scheduled[now.pk] is None
+        assert scheduled[daily.pk] > timezone.now()
+        assert scheduled[weekly.pk] > timezone.now()
+
+    def test_explicit_schedule_wins(self, user_factory):
+        user_factory(digest_frequency="weekly")
+        when = timezone.now() + timedelta(hours=2)
+
+        create_notification(
+            "news_published", "N", "B", channels=["email"], scheduled_for=when
+        )
+
+        assert NotificationQueue.objects.get().scheduled_for == when
+
+
+@pytest.mark.django_db
+class TestFanOutChunking:
+    """Entries are inserted in bounded batches."""
+
+    def test_bulk_create_per_chunk(self, user_factory):
+        for _ in range(5):
+            user_factory()
+
+        with patch.object(
+            NotificationQueue.objects, "bulk_create",
+            wraps=NotificationQueue.objects.bulk_create,
+        ) as bulk_create:
+            count = fan_out_notification(
+                "news_published", "N", "B", channels=["email"], chunk_size=2
+            )
+
+        assert count == 5
+        assert [len(call.args[0]) for call in bulk_create.call_args_list] == [2, 2, 1]
+        assert NotificationQueue.objects.count() == 5
+
+    def test_queries_do_not_grow_with_recipients(
+        self, user_factory, django_assert_max_num_queries
+    ):
+        for _ in range(30):
+            user_factory(push_notifications=True)
+
+        with django_assert_max_num_queries(6):
+            count = create_notification("news_published", "N", "B")
+
+        assert count == 60
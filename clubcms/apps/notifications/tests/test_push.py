@@ -0,0 +1,214 @@
+"""
+Tests for apps/notifications/push.py
+
+Runs the push dispatcher against a local stub push service to check
+VAPID signature reuse, pooled connections, concurrency and bulk
+subscription updates.
+"""
+
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from django.test import override_settings
+from django.utils import timezone
+from py_vapid import Vapid
+
+from apps.notifications import push
+from apps.notifications.models import NotificationQueue, PushSubscription
+from apps.notifications.tasks import process_notification_queue
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _vapid_private_key():
+    key = ec.generate_private_key(ec.SECP256R1())
+    return _b64(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def _browser_keys():
+    key = ec.generate_private_key(ec.SECP256R1())
+    public = key.public_key().public_bytes(
+        Encoding.X962, PublicFormat.UncompressedPoint
+    )
+    return _b64(public), _b64(b"0123456789abcdef")
+
+
+class _StubPushService(BaseHTTPRequestHandler):
+    """Accepts pushes; endpoints under /gone/ answer 410."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.stats["requests"] += 1
+            self.server.authorizations.add(self.headers.get("Authorization"))
+        status = 410 if self.path.startswith("/gone/") else 201
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture()
+def push_service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPushService)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.stats = {"connections": 0, "requests": 0}
+    server.authorizations = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with override_settings(WEBPUSH_SETTINGS={
+        "VAPID_PRIVATE_KEY": _vapid_private_key(),
+        "VAPID_ADMIN_EMAIL": "admin@example.com",
+    }):
+        push.reset_push_client()
+        yield server
+        push.reset_push_client()
+    server.shutdown()
+    server.server_close()
+
+
+def _subscribe(user, endpoint):
+    p256dh, auth = _browser_keys()
+    return PushSubscription.objects.create(
+        user=user, endpoint=endpoint, p256dh_key=p256dh, auth_key=auth
+    )
+
+
+def _queue(user):
+    return NotificationQueue.objects.create(
+        notification_type="aid_request",
+        recipient=user,
+        channel="push",
+        title="Help needed",
+        body="<p>Flat tyre near Bologna</p>",
+    )
+
+
+@pytest.mark.django_db
+class TestPushDispatcher:
+    """A batch is signed once and sent over pooled connections."""
+
+    def test_batch_delivery(self, push_service, user_factory):
+        users = [user_factory() for _ in range(6)]
+        for index, user in enumerate(users):
+            _subscribe(user, f"{push_service.url}/push/{index}")
+            _queue(user)
+
+        with patch.object(Vapid, "sign", autospec=True, side_effect=Vapid.sign) as sign:
+            result = process_notification_queue()
+
+        assert result == {"sent": 6, "failed": 0}
+        assert sign.call_count == 1
+        assert push_service.stats["requests"] == 6
+        assert push_service.stats["connections"] <= push.PUSH_MAX_WORKERS
+        assert len(push_service.authorizations) == 1
+        assert not PushSubscription.objects.filter(last_used__isnull=True).exists()
+
+    def test_gone_subscription_deactivated(self, push_service, user_factory):
+        user = user_factory()
+        live = _subscribe(user, f"{push_service.url}/push/live")
+        gone = _subscribe(user, f"{push_service.url}/gone/old-phone")
+        notification = _queue(user)
+
+        sent, not_sent = push.PushDispatcher().dispatch(
+            NotificationQueue.objects.filter(pk=notification.pk)
+        )
+
+        assert (sent, not_sent) == (1, 0)
+        live.refresh_from_db()
+        gone.refresh_from_db()
+        assert live.is_active and live.last_used is not None
+        assert not gone.is_active and gone.last_used is None
+
+    def test_all_subscriptions_gone(self, push_service, user_factory):
+        user = user_factory()
+        _subscribe(user, f"{push_service.url}/gone/1")
+        notification = _queue(user)
+
+        push.PushDispatcher().dispatch([notification])
+
+        notification.refresh_from_db()
+        assert notification.status == "failed"
+        assert "410" in notification.error_message
+
+    def test_rate_limit_and_missing_subscriptions(self, push_service, user_factory):
+        busy = user_factory()
+        _subscribe(busy, f"{push_service.url}/push/busy")
+        for _ in range(3):
+            NotificationQueue.objects.create(
+                notification_type="aid_request", recipient=busy, channel="push",
+                title="Earlier", body="", status="sent", sent_at=timezone.now(),
+            )
+        unsubscribed = user_factory()
+        pending = [_queue(busy), _queue(unsubscribed)]
+
+        assert push.PushDispatcher().dispatch(pending) == (0, 2)
+        assert [n.error_message for n in NotificationQueue.objects.filter(
+            pk__in=[n.pk for n in pending]).order_by("pk")] == [
+            "Rate limit: max 3 push/hour exceeded",
+            "No active push subscriptions",
+        ]
+        assert push_service.stats["requests"] == 0
+
+    def test_only_sent_pushes_count_toward_limit(self, push_service, user_factory):
+        user = user_factory()
+        _subscribe(user, f"{push_service.url}/gone/1")
+        limiter = push.RateLimiter()
+
+        push.PushDispatcher(limiter).dispatch([_queue(user) for _ in range(2)])
+
+        assert limiter.push_count(user.pk) == 0
+
+    def test_batch_capped_at_limit(self, push_service, user_factory):
+        user = user_factory()
+        _subscribe(user, f"{push_service.url}/push/1")
+        limiter = push.RateLimiter()
+
+        result = push.PushDispatcher(limiter).dispatch([_queue(user) for _ in range(5)])
+
+        assert result == (3, 2)
+        assert limiter.push_count(user.pk) == 3
+        assert push_service.stats["requests"] == 3
+
+
+class TestVapidSigning:
+    """VAPID JWTs are reused per origin until close to expiry."""
+
+    def test_signed_once_per_origin(self):
+        client = push.PushClient(_vapid_private_key(), "admin@example.com")
+
+        first = client.vapid_headers("https://fcm.googleapis.com/fcm/send/a")
+        again = client.vapid_headers("https://fcm.googleapis.com/fcm/send/b")
+        other = client.vapid_headers("https://updates.push.services.mozilla.com/wpush/v2/c")
+
+        assert first == again
+        assert other != first
+
+    def test_resigned_near_expiry(self):
+        client = push.PushClient(_vapid_private_key(), "admin@example.com")
+        endpoint = "https://fcm.googleapis.com/fcm/send/a"
+        first = client.vapid_headers(endpoint)
+
+        later = push.VAPID_EXPIRY - push.VAPID_REFRESH_MARGIN + 1
+        with patch(
+            "apps.notifications.push.time.time", return_value=push.time.time() + later
+        ):
+            assert client.vapid_headers(endpoint) != first
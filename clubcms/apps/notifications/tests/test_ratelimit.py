@@ -0,0 +1,116 @@
+"""
+Tests for apps/notifications/ratelimit.py
+
+Tests counter preloading and that batch processing applies the same
+limits as counting the queue before every send.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.notifications.consumer import claim_batch
+from apps.notifications.models import NotificationQueue
+from apps.notifications.ratelimit import RateLimiter
+from apps.notifications.tasks import process_notification_queue
+
+
+def _queue(user, channel, status="pending", sent_at=None, **kwargs):
+    return NotificationQueue.objects.create(
+        notification_type="news_published",
+        recipient=user,
+        channel=channel,
+        status=status,
+        sent_at=sent_at,
+        title="News",
+        body="Body",
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+class TestRateLimiterCounters:
+    """Counters come from sent queue entries in the limit windows."""
+
+    def test_preload_counts_windows(self, user_factory, django_assert_num_queries):
+        now = timezone.now().replace(hour=12)
+        busy = user_factory()
+        idle = user_factory()
+        for _ in range(3):
+            _queue(busy, "email", "sent", now - timedelta(hours=1))
+        _queue(busy, "email", "sent", now - timedelta(days=1))
+        _queue(busy, "email", "pending")
+        _queue(busy, "push", "sent", now - timedelta(minutes=30))
+        _queue(busy, "push", "sent", now - timedelta(minutes=61))
+
+        limiter = RateLimiter(now)
+        with django_assert_num_queries(1):
+            limiter.preload([busy.pk, idle.pk])
+            assert limiter.email_count(busy.pk) == 3
+            assert limiter.push_count(busy.pk) == 1
+            assert limiter.email_count(idle.pk) == 0
+
+    def test_record_updates_decisions(self, user_factory):
+        user = user_factory()
+        limiter = RateLimiter()
+        for _ in range(3):
+            assert limiter.allow_push(user.pk)
+            limiter.record(user.pk, "push")
+
+        assert not limiter.allow_push(user.pk)
+        assert limiter.allow_email(user.pk)
+
+    def test_earlier_claims_count_as_sent(self, user_factory):
+        user = user_factory()
+        for _ in range(6):
+            _queue(user, "email")
+        first = claim_batch(limit=3)
+        second = claim_batch(limit=3)
+
+        def limiter_for(batch):
+            return RateLimiter(claim=(batch[0].claimed_at, batch[0].claim_token))
+
+        # Both consumers load their counters before either has sent
+        assert limiter_for(first).email_count(user.pk) == 0
+        assert limiter_for(second).email_count(user.pk) == 3
+
+
+@pytest.mark.django_db
+class TestQueueProcessingLimits:
+    """The batch enforces the limits without a COUNT per notification."""
+
+    def test_email_limit_reached_mid_batch(self, user_factory, mailoutbox):
+        user = user_factory()
+        other = user_factory()
+        for _ in range(4):
+            _queue(user, "email", "sent", timezone.now())
+        for _ in range(3):
+            _queue(user, "email")
+        _queue(other, "email")
+
+        result = process_notification_queue()
+
+        assert result == {"sent": 2, "failed": 2}
+        assert len(mailoutbox) == 2
+        skipped = NotificationQueue.objects.filter(recipient=user, status="skipped")
+        assert skipped.count() == 2
+        assert all("5 emails/day" in n.error_message for n in skipped)
+
+    def test_counter_queries_do_not_grow(self, user_factory, mailoutbox):
+        users = [user_factory() for _ in range(3)]
+
+        def count_queries(per_user):
+            NotificationQueue.objects.all().delete()
+            for user in users:
+                for _ in range(per_user):
+                    _queue(user, "email")
+            with CaptureQueriesContext(connection) as queries:
+                process_notification_queue()
+            # Rate-limit counters only, not the backlog size (COUNT(*))
+            counter = 'COUNT("notifications_notificationqueue"."id")'
+            return sum(counter in q["sql"] for q in queries.captured_queries)
+
+        assert count_queries(1) == count_queries(3) == 1
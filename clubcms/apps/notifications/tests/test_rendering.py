@@ -0,0 +1,155 @@
+"""
+Tests for apps/notifications/rendering.py
+
+Shared rendering must produce the same HTML as a full render per
+recipient, while rendering each distinct notification only once.
+"""
+
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from apps.notifications import rendering
+from apps.notifications.dispatch import EmailDispatcher
+from apps.notifications.models import NotificationQueue
+from apps.notifications.rendering import SINGLE_TEMPLATE, EmailRenderer
+from apps.notifications.services import build_email_message, generate_unsubscribe_token
+
+User = get_user_model()
+
+
+def _notification(pk, body="<p>Ride on Sunday</p>", title="News", url="/news/1/"):
+    return NotificationQueue(
+        pk=pk,
+        notification_type="news_published",
+        recipient=User(pk=pk, username=f"u{pk}", email=f"u{pk}@example.com"),
+        channel="email",
+        title=title,
+        body=body,
+        url=url,
+    )
+
+
+def _token(notification):
+    return generate_unsubscribe_token(
+        notification.recipient, notification.notification_type
+    )
+
+
+def _full_render(notification, token):
+    return render_to_string(
+        SINGLE_TEMPLATE,
+        {
+            "notification": notification,
+            "unsubscribe_token": token,
+            "site_name": getattr(settings, "WAGTAIL_SITE_NAME", "Club CMS"),
+            "base_url": getattr(settings, "WAGTAILADMIN_BASE_URL", ""),
+        },
+    )
+
+
+def _render(renderer, notification, token=None):
+    return renderer.html(notification, token or _token(notification))
+
+
+class TestEmailRenderer:
+    """Per-recipient output matches a full render."""
+
+    def test_matches_full_render(self):
+        renderer = EmailRenderer()
+        for pk in (1, 2, 3):
+            notification = _notification(pk)
+            token = _token(notification)
+            html = _render(renderer, notification, token)
+            assert html == _full_render(notification, token)
+            assert f"/notifications/unsubscribe/{pk}.news_published." in html
+
+    def test_renders_each_content_once(self):
+        renderer = EmailRenderer()
+        with patch.object(
+            rendering, "get_email_template", wraps=rendering.get_email_template
+        ) as get_template:
+            for pk in range(1, 6):
+                _render(renderer, _notification(pk))
+            _render(renderer, _notification(6, title="Other"))
+
+        assert get_template.call_count == 2
+
+    def test_dollar_signs_and_escaping_survive(self):
+        body = "Fee: $5 <b>${unsubscribe_token}</b> & more"
+        notification = _notification(1, body=body)
+
+        token = _token(notification)
+        assert _render(EmailRenderer(), notification, token) == _full_render(
+            notification, token
+        )
+
+    def test_language_is_part_of_the_key(self):
+        renderer = EmailRenderer()
+        with patch.object(
+            rendering, "get_email_template", wraps=rendering.get_email_template
+        ) as get_template:
+            with translation.override("en"):
+                _render(renderer, _notification(1))
+            with translation.override("it"):
+                _render(renderer, _notification(2))
+
+        assert get_template.call_count == 2
+
+    def test_text_body(self):
+        assert EmailRenderer().text(_notification(1)) == "Ride on Sunday"
+
+
+@pytest.mark.django_db
+class TestRendererInDelivery:
+    """Single sends and batches use the shared renderer."""
+
+    def test_message_parts(self, user_factory):
+        notification = NotificationQueue.objects.create(
+            notification_type="news_published",
+            recipient=user_factory(),
+            channel="email",
+            title="News",
+            body="<p>Body</p>",
+        )
+
+        message = build_email_message(notification)
+
+        token = message.extra_headers["List-Unsubscribe"].split("/")[-2]
+        assert message.body == "Body"
+        assert message.alternatives[0][0] == _full_render(notification, token)
+
+    def test_dispatcher_renders_once_per_batch(self, user_factory, mailoutbox):
+        for user in [user_factory() for _ in range(4)]:
+            NotificationQueue.objects.create(
+                notification_type="news_published",
+                recipient=user,
+                channel="email",
+                title="News",
+                body="<p>Body</p>",
+            )
+        notifications = list(NotificationQueue.objects.select_related("recipient"))
+
+        with patch.object(
+            rendering, "get_email_template", wraps=rendering.get_email_template
+        ) as get_template:
+            assert EmailDispatcher().dispatch(notifications) == (4, 0)
+
+        assert get_template.call_count == 1
+        assert len({m.alternatives[0][0] for m in mailoutbox}) == 4
+
+
+class TestBenchmarkCommand:
+    """The benchmark renders identical HTML both ways."""
+
+    def test_reports_speed_up(self):
+        out = StringIO()
+        call_command("benchmark_email_render", emails=50, distinct=2, stdout=out)
+
+        assert "identical HTML" in out.getvalue()
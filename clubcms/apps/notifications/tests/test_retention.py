@@ -0,0 +1,105 @@
+"""
+Tests for apps/notifications/retention.py
+
+Checks chunked purging, archival into NotificationStat and that the
+cleanup task keeps its return format.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.notifications.models import NotificationQueue, NotificationStat
+from apps.notifications.retention import RETENTION_DAYS, purge_notifications
+from apps.notifications.tasks import cleanup_old_notifications
+
+
+def _queue(user, count=1, age_days=0, **kwargs):
+    fields = {
+        "notification_type": "news_published",
+        "channel": "email",
+        "status": "sent",
+        **kwargs,
+    }
+    NotificationQueue.objects.bulk_create(
+        [
+            NotificationQueue(recipient=user, title="News", body="Body", **fields)
+            for _ in range(count)
+        ]
+    )
+    # created_at is auto_now_add: age the new rows afterwards
+    created = timezone.now() - timedelta(days=age_days)
+    NotificationQueue.objects.filter(
+        recipient=user, created_at__gt=timezone.now() - timedelta(minutes=1)
+    ).update(created_at=created)
+    return created
+
+
+@pytest.mark.django_db
+class TestPurge:
+    """Old entries are deleted in chunks; recent ones stay."""
+
+    def test_deletes_only_old_entries(self, user_factory):
+        _queue(user_factory(), count=5, age_days=RETENTION_DAYS + 1)
+        recent = user_factory()
+        _queue(recent, count=2, age_days=1)
+
+        result = purge_notifications(chunk_size=2)
+
+        assert result == {"deleted": 5, "archived": 5}
+        assert list(
+            NotificationQueue.objects.values_list("recipient_id", flat=True).distinct()
+        ) == [recent.pk]
+
+    def test_one_delete_per_chunk(self, user_factory):
+        _queue(user_factory(), count=7, age_days=RETENTION_DAYS + 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = purge_notifications(chunk_size=2, archive=False)
+
+        deletes = [q for q in ctx.captured_queries if q["sql"].startswith("DELETE")]
+        selects = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        assert len(deletes) == 4
+        # Only the keyset pages are read: the deletes load no rows
+        assert len(selects) == 4
+        assert result["deleted"] == 7
+        assert not NotificationStat.objects.exists()
+
+    def test_archive_counts_per_day_type_channel_status(self, user_factory):
+        user = user_factory()
+        old = _queue(user, count=3, age_days=RETENTION_DAYS + 2)
+        _queue(user, count=1, age_days=RETENTION_DAYS + 2, status="failed")
+        _queue(user, count=2, age_days=RETENTION_DAYS + 2, channel="push")
+
+        purge_notifications(chunk_size=4)
+
+        stats = {
+            (s.notification_type, s.channel, s.status): s.count
+            for s in NotificationStat.objects.all()
+        }
+        assert stats == {
+            ("news_published", "email", "sent"): 3,
+            ("news_published", "email", "failed"): 1,
+            ("news_published", "push", "sent"): 2,
+        }
+        assert {s.day for s in NotificationStat.objects.all()} == {
+            timezone.localdate(old)
+        }
+
+    def test_archive_accumulates_across_runs(self, user_factory):
+        user = user_factory()
+        _queue(user, count=2, age_days=RETENTION_DAYS + 1)
+        purge_notifications()
+        _queue(user, count=3, age_days=RETENTION_DAYS + 1)
+        purge_notifications()
+
+        assert NotificationStat.objects.get().count == 5
+
+    def test_cleanup_task(self, user_factory):
+        _queue(user_factory(), count=2, age_days=RETENTION_DAYS + 1)
+
+        assert cleanup_old_notifications() == {"deleted": 2}
+        assert NotificationStat.objects.get().count == 2
@@ -0,0 +1,156 @@
+"""
+Tests for unsubscribe tokens in apps/notifications/services.py
+
+Signed tokens are generated without database access, verified by HMAC,
+revocable, and legacy stored tokens keep working.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.notifications.models import NotificationQueue, UnsubscribeToken
+from apps.notifications.services import (
+    _legacy_unsubscribe_token,
+    build_email_message,
+    generate_unsubscribe_token,
+    revoke_unsubscribe_tokens,
+    verify_unsubscribe_token,
+)
+
+
+@pytest.mark.django_db
+class TestSignedTokens:
+    """Tokens encode the user and type and are checked by HMAC."""
+
+    def test_generation_does_no_queries(self, user_factory, django_assert_num_queries):
+        user = user_factory()
+        with django_assert_num_queries(0):
+            token = generate_unsubscribe_token(user, "news_published")
+
+        assert token.startswith(f"{user.pk}.news_published.")
+        assert not UnsubscribeToken.objects.exists()
+
+    def test_email_message_does_no_token_queries(
+        self, user_factory, django_assert_num_queries
+    ):
+        notification = NotificationQueue.objects.create(
+            notification_type="news_published",
+            recipient=user_factory(),
+            channel="email",
+            title="News",
+            body="<p>Body</p>",
+        )
+        with django_assert_num_queries(0):
+            message = build_email_message(notification)
+
+        token = message.extra_headers["List-Unsubscribe"].split("/")[-2]
+        assert token in message.alternatives[0][0]
+        assert verify_unsubscribe_token(token) == (
+            notification.recipient,
+            "news_published",
+        )
+
+    def test_verify_round_trip(self, user_factory):
+        user = user_factory()
+        token = generate_unsubscribe_token(user, "event_published")
+
+        assert verify_unsubscribe_token(token) == (user, "event_published")
+
+    @pytest.mark.parametrize("tamper", ["type", "user", "issued", "signature"])
+    def test_tampered_token_rejected(self, user_factory, tamper):
+        user = user_factory()
+        other = user_factory()
+        user_id, notification_type, issued, signature = generate_unsubscribe_token(
+            user, "news_published"
+        ).split(".")
+        if tamper == "type":
+            notification_type = "event_published"
+        elif tamper == "user":
+            user_id = str(other.pk)
+        elif tamper == "issued":
+            issued = "zzzzzzzz"
+        else:
+            signature = signature[::-1]
+
+        token = f"{user_id}.{notification_type}.{issued}.{signature}"
+        assert verify_unsubscribe_token(token) is None
+
+    def test_unknown_user_rejected(self, user_factory):
+        user = user_factory()
+        token = generate_unsubscribe_token(user, "news_published")
+        user.delete()
+
+        assert verify_unsubscribe_token(token) is None
+
+    def test_revoked_token_rejected(self, user_factory):
+        user = user_factory()
+        token = generate_unsubscribe_token(user, "news_published")
+        legacy = _legacy_unsubscribe_token(user.pk, "news_published")
+        UnsubscribeToken.objects.create(
+            user=user, notification_type="news_published", token=legacy
+        )
+
+        revoke_unsubscribe_tokens(user, "news_published")
+
+        assert verify_unsubscribe_token(token) is None
+        assert verify_unsubscribe_token(legacy) is None
+        assert verify_unsubscribe_token(
+            generate_unsubscribe_token(user, "event_published")
+        ) == (user, "event_published")
+
+    def test_links_issued_after_revocation_valid(self, user_factory):
+        user = user_factory()
+        revoke_unsubscribe_tokens(user, "news_published")
+        UnsubscribeToken.objects.update(
+            revoked_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        token = generate_unsubscribe_token(user, "news_published")
+
+        assert verify_unsubscribe_token(token) == (user, "news_published")
+
+    def test_tokens_without_issue_time_revocable(self, user_factory):
+        from apps.notifications.services import _unsubscribe_signature
+
+        user = user_factory()
+        signature = _unsubscribe_signature(user.pk, "news_published")
+        token = f"{user.pk}.news_published.{signature}"
+        assert verify_unsubscribe_token(token) == (user, "news_published")
+
+        revoke_unsubscribe_tokens(user, "news_published")
+
+        assert verify_unsubscribe_token(token) is None
+
+    def test_legacy_token_still_valid(self, user_factory):
+        user = user_factory()
+        legacy = _legacy_unsubscribe_token(user.pk, "news_published")
+        UnsubscribeToken.objects.create(
+            user=user, notification_type="news_published", token=legacy
+        )
+
+        assert verify_unsubscribe_token(legacy) == (user, "news_published")
+
+
+@pytest.mark.django_db
+class TestUnsubscribeView:
+    """The one-click view accepts signed tokens."""
+
+    def test_post_unsubscribes(self, client, user_factory):
+        user = user_factory(news_updates=True)
+        token = generate_unsubscribe_token(user, "news_published")
+
+        response = client.post(reverse("notifications:unsubscribe", args=[token]))
+
+        assert response.status_code == 302
+        user.refresh_from_db()
+        assert user.news_updates is False
+
+    def test_invalid_token_page(self, client):
+        url = reverse("notifications:unsubscribe", args=["1.news_published.x"])
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.context["valid"] is False
@@ -532,6 +532,7 @@ class EventsPage(Page):
         events_qs = (
             EventDetailPage.objects.live()
             .descendant_of(self)
+            .select_related("capacity")
         )
 
         # Determine which view: upcoming (default) or past
@@ -561,6 +562,14 @@ class EventsPage(Page):
         except EmptyPage:
             events = paginator.page(paginator.num_pages)
 
+        # Price the whole page at once (tiers + entitlements, O(1) queries)
+        from apps.events.utils import price_events
+
+        events.object_list = list(events.object_list)
+        prices = price_events(events.object_list, user=getattr(request, "user", None))
+        for event in events.object_list:
+            event.pricing = prices[event.pk]
+
         # Categories for filter UI
         from apps.website.models.snippets import EventCategory
         categories = EventCategory.objects.all()
@@ -845,17 +854,10 @@ class EventDetailPage(Page):
     @property
     def computed_deadline(self):
         """Deadline from PricingTier with is_deadline=True, or fallback to registration_deadline."""
-        from datetime import timedelta
-
-        deadline_tier = self.pricing_tiers.filter(is_deadline=True).first()
-        if deadline_tier and self.start_date:
-            offset = timedelta(
-                days=deadline_tier.days_before,
-                hours=deadline_tier.hours_before,
-                minutes=deadline_tier.minutes_before,
-            )
-            return self.start_date - offset
-        return self.registration_deadline
+        from apps.events.pricing import get_pricing_schedule
+
+        schedule = get_pricing_schedule(self)
+        return schedule.registration_deadline or self.registration_deadline
 
     @property
     def is_registration_open(self) -> bool:
@@ -872,17 +874,39 @@ class EventDetailPage(Page):
         return True
 
     @cached_property
+    def capacity_counts(self):
+        """Denormalized ``EventCapacity`` row for this event, or None.
+
+        Read in O(1) (or free with ``select_related("capacity")``)
+        instead of counting registrations.
+        """
+        try:
+            from apps.events.capacity import get_capacity
+
+            return get_capacity(self)
+        except Exception:
+            return None
+
+    @property
     def confirmed_count(self) -> int:
         """Number of confirmed registrations.
 
         Returns 0 if the registration model has not been created yet.
         """
-        try:
-            return self.registrations.filter(
-                status__in=["registered", "confirmed"]
-            ).count()
-        except Exception:
-            return 0
+        capacity = self.capacity_counts
+        return capacity.confirmed_count if capacity else 0
+
+    @property
+    def waitlist_count(self) -> int:
+        """Number of waitlisted registrations."""
+        capacity = self.capacity_counts
+        return capacity.waitlist_count if capacity else 0
+
+    @property
+    def passenger_count(self) -> int:
+        """Number of passengers riding with confirmed registrations."""
+        capacity = self.capacity_counts
+        return capacity.passenger_count if capacity else 0
 
     @property
     def spots_remaining(self) -> int | None:
@@ -892,30 +916,43 @@ class EventDetailPage(Page):
         remaining = self.max_attendees - self.confirmed_count
         return max(0, remaining)
 
+    @cached_property
+    def public_pricing(self) -> dict:
+        """Non-member ``calculate_price`` result (active pricing tier)."""
+        from apps.events.utils import calculate_price
+
+        return calculate_price(self)
+
     @property
-    def current_price(self) -> "models.Decimal":
-        """Return current price considering early-bird discount."""
-        from decimal import Decimal
+    def current_tier(self):
+        """Active ``TierBoundary`` of the pricing schedule, or None."""
+        return self.public_pricing["tier"]
 
-        price = self.base_fee
-        if (
-            self.early_bird_discount
-            and self.early_bird_deadline
-            and timezone.now() < self.early_bird_deadline
-        ):
-            discount = Decimal(self.early_bird_discount) / Decimal(100)
-            price = price * (1 - discount)
-        return price
+    @property
+    def currency_symbol(self) -> str:
+        """Symbol shown next to the event's prices."""
+        return getattr(settings, "EVENT_CURRENCY_SYMBOL", "€")
+
+    @property
+    def current_price(self) -> "models.Decimal":
+        """Return the current non-member price (active tier applied)."""
+        return self.public_pricing["final_price"]
 
     def member_price(self) -> "models.Decimal":
-        """Return price with member discount applied on top of current price."""
+        """Return the current price with the event's member discount.
+
+        Tier and member discounts add up, capped at 100%, as in
+        ``calculate_price``.
+        """
         from decimal import Decimal
 
-        price = self.current_price
-        if self.member_discount_percent:
-            discount = Decimal(self.member_discount_percent) / Decimal(100)
-            price = price * (1 - discount)
-        return price
+        pricing = self.public_pricing
+        discount = min(
+            pricing["tier_discount_percent"] + (self.member_discount_percent or 0),
+            100,
+        )
+        base_fee = pricing["base_fee"]
+        return max(base_fee - base_fee * Decimal(discount) / 100, Decimal("0.00"))
 
 
 # ═══════════════════════════════════════════════════════════════════════════
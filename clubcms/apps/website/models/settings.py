@@ -3,11 +3,24 @@ Wagtail Site Settings for the Club CMS.
 
 Uses ``BaseSiteSetting`` so each Wagtail Site can have its own configuration.
 Access in templates via ``{{ settings.website.SiteSettings }}``.
+
+Both models are served from a settings cache: ``for_site`` and
+``for_request`` return a copy of a per-process snapshot, backed by the
+shared cache and keyed by a version token that is bumped whenever a
+setting, a colour scheme or a Site is saved.  A process re-reads the
+version at most every ``SETTINGS_LOCAL_TTL`` seconds, so a warm process
+answers most settings lookups without touching the cache or database
+and other processes see a save within that window.
 """
 
+import copy
+import time
+import uuid
+
+from django.core.cache import cache
 from django.db import models
+from django.http.request import split_domain_port
 from django.utils.translation import gettext_lazy as _
-
 from wagtail.admin.panels import (
     FieldPanel,
     MultiFieldPanel,
@@ -16,7 +29,7 @@ from wagtail.admin.panels import (
 )
 from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 from wagtail.fields import RichTextField
-
+from wagtail.models import Site
 
 THEME_CHOICES = [
     ("velocity", _("Velocity")),
@@ -40,8 +53,180 @@ MAP_ROUTING_CHOICES = [
 ]
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# Settings cache
+# ═══════════════════════════════════════════════════════════════════════════
+
+SETTINGS_VERSION_KEY = "website_settings_version"
+
+SETTINGS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds a process trusts its snapshots before re-reading the version
+SETTINGS_LOCAL_TTL = 5
+
+# cache key -> (version, checked_at, object); objects are never handed out
+# directly
+_local_snapshots = {}
+
+
+def settings_version():
+    """Return the current settings version token (creating one if missing)."""
+    version = cache.get(SETTINGS_VERSION_KEY)
+    if version is None:
+        cache.add(SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SETTINGS_VERSION_KEY)
+    return version
+
+
+def bump_settings_version():
+    """
+    Invalidate every cached settings snapshot: at once in this process,
+    within ``SETTINGS_LOCAL_TTL`` seconds in the others.
+    """
+    cache.set(SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+    clear_local_snapshots()
+
+
+def clear_local_snapshots():
+    """Forget this process's snapshots (after a cache clear, in tests)."""
+    _local_snapshots.clear()
+
+
+def _snapshot(key, load):
+    """
+    Return the object cached under *key* for the current version.
+
+    Looks in process memory first (trusted for ``SETTINGS_LOCAL_TTL``
+    seconds), then in the shared cache, and calls *load* only when both
+    miss.
+    """
+    now = time.monotonic()
+    local = _local_snapshots.get(key)
+    if local is not None and now - local[1] < SETTINGS_LOCAL_TTL:
+        return local[2]
+    version = settings_version()
+    if local is not None and local[0] == version:
+        _local_snapshots[key] = (version, now, local[2])
+        return local[2]
+    shared_key = f"{key}:{version}"
+    value = cache.get(shared_key)
+    if value is None:
+        value = load()
+        if settings_version() != version:
+            # Something was saved while loading (e.g. the settings row was
+            # just created): don't cache what may already be stale.
+            return value
+        cache.set(shared_key, value, SETTINGS_CACHE_TIMEOUT)
+    _local_snapshots[key] = (version, now, value)
+    return value
+
+
+def _site_table():
+    """``(pk, hostname, port, is_default_site)`` of every Site."""
+    return _snapshot(
+        "website_settings_sites",
+        lambda: tuple(
+            Site.objects.values_list("pk", "hostname", "port", "is_default_site")
+        ),
+    )
+
+
+def find_site_id(hostname, port):
+    """
+    Return the pk of the Site serving *hostname*:*port*, or None.
+
+    Same precedence as ``Site.find_for_request``: hostname and port,
+    hostname on the default site, then the default site unless exactly
+    one other site has the hostname.
+    """
+    ranked = []
+    for pk, site_hostname, site_port, is_default in _site_table():
+        same_host = site_hostname.lower() == hostname
+        if same_host and site_port == port:
+            rank = 0
+        elif same_host and is_default:
+            rank = 1
+        elif is_default:
+            rank = 2
+        elif same_host:
+            rank = 3
+        else:
+            continue
+        ranked.append((rank, site_hostname.lower(), pk))
+    if not ranked:
+        return None
+    ranked.sort()
+    if len(ranked) == 1 or ranked[0][0] in (0, 1):
+        return ranked[0][2]
+    if ranked[0][0] == 2:
+        return ranked[len(ranked) == 2][2]
+    return None
+
+
+def default_site_id():
+    """Return the pk of the default Site, or None."""
+    for pk, _hostname, _port, is_default in _site_table():
+        if is_default:
+            return pk
+    return None
+
+
+class CachedSiteSetting(BaseSiteSetting):
+    """
+    ``BaseSiteSetting`` served from the settings cache.
+
+    Callers get their own deep copy of the snapshot, so setting
+    attributes on it or on its related objects (or saving it) never
+    leaks into other requests.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def for_request(cls, request):
+        """Settings for the site serving *request*, cached on the request."""
+        attr_name = cls.get_cache_attr_name()
+        if hasattr(request, attr_name):
+            return getattr(request, attr_name)
+        site = getattr(request, "_wagtail_site", None)
+        if site is not None:
+            site_id = site.pk
+        else:
+            site_id = find_site_id(
+                split_domain_port(request._get_raw_host())[0], request.get_port()
+            )
+        instance = cls.for_site_id(site_id)
+        instance._request = request
+        setattr(request, attr_name, instance)
+        return instance
+
+    @classmethod
+    def for_site(cls, site):
+        """Settings for *site* (created with defaults if missing)."""
+        return cls.for_site_id(site.pk if site is not None else None)
+
+    @classmethod
+    def for_default_site(cls):
+        """Settings for the default site."""
+        return cls.for_site_id(default_site_id())
+
+    @classmethod
+    def for_site_id(cls, site_id):
+        if site_id is None:
+            raise cls.DoesNotExist(f"{cls.__name__} does not exist for site None.")
+        snapshot = _snapshot(
+            f"website_settings:{cls._meta.label_lower}:{site_id}",
+            lambda: cls.base_queryset().get_or_create(site_id=site_id)[0],
+        )
+        # A deep copy: related objects (``_state.fields_cache``) included
+        instance = copy.deepcopy(snapshot)
+        instance._page_url_cache = {}
+        return instance
+
+
 @register_setting
-class SiteSettings(BaseSiteSetting):
+class SiteSettings(CachedSiteSetting):
     """
     Per-site configuration panel available under Settings -> Site Settings
     in the Wagtail admin.
@@ -50,6 +235,9 @@ class SiteSettings(BaseSiteSetting):
     Navigation, PWA, Forms, Map.
     """
 
+    # Cached with the settings so get_colors() needs no query
+    select_related = ["color_scheme"]
+
     # -- General tab --------------------------------------------------------
     site_name = models.CharField(
         max_length=200, blank=True, verbose_name=_("Site name"),
@@ -428,7 +616,7 @@ PAYMENT_MODE_CHOICES = [
 
 
 @register_setting
-class PaymentSettings(BaseSiteSetting):
+class PaymentSettings(CachedSiteSetting):
     """
     Per-site payment configuration.
 
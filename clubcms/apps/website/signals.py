@@ -0,0 +1,33 @@
+"""
+Signal handlers for the website app.
+
+Bump the settings cache version whenever site settings, payment
+settings, a colour scheme or a Site change, so every process drops its
+settings snapshots.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.website.models.settings import (
+    PaymentSettings,
+    SiteSettings,
+    bump_settings_version,
+)
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+@receiver(post_save, sender=PaymentSettings)
+@receiver(post_delete, sender=PaymentSettings)
+@receiver(post_save, sender="website.ColorScheme")
+@receiver(post_delete, sender="website.ColorScheme")
+@receiver(post_save, sender="wagtailcore.Site")
+@receiver(post_delete, sender="wagtailcore.Site")
+def invalidate_settings_cache(sender, **kwargs):
+    """Drop cached settings now and again once the transaction commits."""
+    # The second bump discards snapshots other processes may have cached
+    # from the old rows before the commit.
+    bump_settings_version()
+    transaction.on_commit(bump_settings_version)
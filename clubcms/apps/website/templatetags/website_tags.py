@@ -8,13 +8,25 @@ from django.utils import timezone
 register = template.Library()
 
 
-@register.simple_tag
-def upcoming_events(count=3):
-    """Return up to `count` upcoming (future) events, ordered by start_date."""
+@register.simple_tag(takes_context=True)
+def upcoming_events(context, count=3):
+    """
+    Return up to `count` upcoming (future) events, ordered by start_date.
+
+    Each event carries a ``pricing`` dict for the current viewer
+    (see ``apps.events.utils.price_events``).
+    """
+    from apps.events.utils import price_events
     from apps.website.models import EventDetailPage
 
-    return list(
+    events = list(
         EventDetailPage.objects.live()
         .filter(start_date__gte=timezone.now())
+        .select_related("capacity")
         .order_by("start_date")[:count]
     )
+    request = context.get("request")
+    prices = price_events(events, user=getattr(request, "user", None))
+    for event in events:
+        event.pricing = prices[event.pk]
+    return events
@@ -0,0 +1,195 @@
+"""
+Tests for the settings cache in apps/website/models/settings.py
+
+Tests snapshot reuse, invalidation on save and that views issue no
+settings queries once the cache is warm.
+"""
+
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from wagtail.models import Site
+
+from apps.website.models import settings as settings_module
+from apps.website.models.settings import (
+    SETTINGS_VERSION_KEY,
+    PaymentSettings,
+    SiteSettings,
+    find_site_id,
+)
+from apps.website.models.snippets import ColorScheme
+
+SETTINGS_TABLES = (
+    '"website_sitesettings"',
+    '"website_paymentsettings"',
+    '"website_colorscheme"',
+    '"wagtailcore_site"',
+)
+
+
+def _settings_queries(queries):
+    return [
+        query["sql"]
+        for query in queries.captured_queries
+        if any(table in query["sql"] for table in SETTINGS_TABLES)
+    ]
+
+
+@pytest.mark.django_db
+class TestSettingsSnapshot:
+    """Settings are loaded once and reloaded after a save."""
+
+    def test_created_settings_not_cached(self, django_assert_num_queries):
+        SiteSettings.for_default_site()  # creates the row
+
+        with django_assert_num_queries(2):  # sites and settings
+            SiteSettings.for_default_site()
+        with django_assert_num_queries(0):
+            SiteSettings.for_default_site()
+
+    def test_warm_lookup_issues_no_query(self, django_assert_num_queries):
+        site = Site.objects.get(is_default_site=True)
+        SiteSettings.for_site(site)
+        PaymentSettings.for_site(site)
+        SiteSettings.for_site(site)
+        PaymentSettings.for_default_site()
+
+        with django_assert_num_queries(0):
+            SiteSettings.for_site(site)
+            PaymentSettings.for_default_site()
+
+    def test_callers_get_their_own_copy(self):
+        first = SiteSettings.for_default_site()
+        first.site_name = "Changed in memory"
+
+        assert SiteSettings.for_default_site().site_name != "Changed in memory"
+
+    def test_related_objects_are_copied(self):
+        scheme = ColorScheme.objects.create(name="Red", primary="#ff0000")
+        settings = SiteSettings.for_default_site()
+        settings.color_scheme = scheme
+        settings.save()
+
+        SiteSettings.for_default_site().color_scheme.primary = "#000000"
+
+        assert SiteSettings.for_default_site().color_scheme.primary == "#ff0000"
+
+    def test_other_process_bump_seen_after_local_ttl(self, monkeypatch):
+        SiteSettings.for_default_site()  # creates the row
+        SiteSettings.for_default_site()
+        SiteSettings.objects.update(site_name="Saved elsewhere")
+        cache.set(SETTINGS_VERSION_KEY, "bumped-by-another-process", None)
+
+        assert SiteSettings.for_default_site().site_name != "Saved elsewhere"
+        monkeypatch.setattr(settings_module, "SETTINGS_LOCAL_TTL", 0)
+        assert SiteSettings.for_default_site().site_name == "Saved elsewhere"
+
+    def test_save_invalidates(self):
+        settings = SiteSettings.for_default_site()
+        settings.site_name = "Moto Club"
+        settings.save()
+
+        assert SiteSettings.for_default_site().site_name == "Moto Club"
+
+    def test_color_scheme_cached_and_invalidated(self, django_assert_num_queries):
+        scheme = ColorScheme.objects.create(name="Red", primary="#ff0000")
+        settings = SiteSettings.for_default_site()
+        settings.color_scheme = scheme
+        settings.save()
+
+        with django_assert_num_queries(2):  # sites and settings
+            SiteSettings.for_default_site().get_colors()
+        with django_assert_num_queries(0):
+            colors = SiteSettings.for_default_site().get_colors()
+        assert "#ff0000" in colors.values()
+
+        scheme.primary = "#00ff00"
+        scheme.save()
+        assert "#00ff00" in SiteSettings.for_default_site().get_colors().values()
+
+    def test_for_request_resolves_site(self, django_assert_num_queries):
+        site = Site.objects.get(is_default_site=True)
+        SiteSettings.for_default_site()
+        SiteSettings.for_default_site()
+        request = RequestFactory().get("/", HTTP_HOST="unknown.example.com")
+
+        with django_assert_num_queries(0):
+            settings = SiteSettings.for_request(request)
+
+        assert settings.site_id == site.pk
+        assert SiteSettings.for_request(request) is settings
+
+    def test_find_site_id_precedence(self):
+        default = Site.objects.get(is_default_site=True)
+        other = Site.objects.create(
+            hostname="other.example.com", port=80, root_page=default.root_page
+        )
+
+        assert find_site_id("other.example.com", 80) == other.pk
+        assert find_site_id("nowhere.example.com", 80) == default.pk
+
+        other.delete()
+        assert find_site_id("other.example.com", 80) == default.pk
+
+
+@pytest.mark.django_db
+class TestViewsWarmCache:
+    """Each view reads settings without touching the database when warm."""
+
+    @pytest.fixture(autouse=True)
+    def _settings_rows(self, db):
+        SiteSettings.for_default_site()
+        PaymentSettings.for_default_site()
+
+    def _assert_warm(self, request):
+        request()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        assert _settings_queries(queries) == []
+        return response
+
+    def test_template_render(self, user_factory):
+        client = Client()
+        client.force_login(user_factory())
+        url = reverse("events:my_registrations")
+
+        assert self._assert_warm(lambda: client.get(url)).status_code == 200
+
+    def test_payment_choice(self, user_factory):
+        from apps.events.tests.test_capacity import _create_event_page, _register
+
+        user = user_factory()
+        registration = _register(
+            _create_event_page(),
+            user=user,
+            payment_amount=Decimal("50.00"),
+            payment_status="pending",
+        )
+        settings = PaymentSettings.for_default_site()
+        settings.bank_transfer_enabled = True
+        settings.save()
+        client = Client()
+        client.force_login(user)
+        url = reverse("events:payment_choice", args=[registration.pk])
+
+        assert self._assert_warm(lambda: client.get(url)).status_code == 200
+
+    def test_stripe_webhook(self):
+        settings = PaymentSettings.for_default_site()
+        settings.stripe_test_webhook_secret = "whsec_test"
+        settings.save()
+        client = Client()
+        url = reverse("events:stripe_webhook")
+
+        response = self._assert_warm(
+            lambda: client.post(
+                url, data=b"{}", content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=1,v1=bad",
+            )
+        )
+        assert response.status_code == 400
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     # Utilities
     "taggit",
     "modelcluster",
+    "django_q",
     # Project apps
     "apps.core",
     "apps.website",
@@ -129,6 +130,30 @@ else:
         }
     }
 
+# --------------------------------------------------------------------------
+# Cache
+# --------------------------------------------------------------------------
+
+# Shared by every web and task-worker process, so invalidations (settings,
+# pricing schedules, entitlements) and task debounce keys reach them all.
+# The table is created by ``createcachetable`` (see entrypoint.sh).
+#
+# Entries are one per member (entitlements), per event (pricing schedule,
+# ICS fragment, check-in roster) and per site (settings): MAX_ENTRIES must
+# stay well above members + 3 x published events, or every write culls a
+# share of the table and the caches keep missing.  Larger deployments
+# should point CACHES at Redis or Memcached instead.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "clubcms_cache",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "20000")),
+            "CULL_FREQUENCY": 10,
+        },
+    }
+}
+
 # --------------------------------------------------------------------------
 # Custom user model
 # --------------------------------------------------------------------------
@@ -254,6 +279,15 @@ DEFAULT_FROM_EMAIL = os.environ.get(
     "DEFAULT_FROM_EMAIL", "noreply@example.com"
 )
 
+# --------------------------------------------------------------------------
+# Events
+# --------------------------------------------------------------------------
+
+# ISO 4217 code of event fees, shown in feeds and structured data
+EVENT_CURRENCY = os.environ.get("EVENT_CURRENCY", "EUR")
+# Symbol shown next to prices on pages and in notifications
+EVENT_CURRENCY_SYMBOL = os.environ.get("EVENT_CURRENCY_SYMBOL", "€")
+
 # --------------------------------------------------------------------------
 # Federation settings
 # --------------------------------------------------------------------------
@@ -278,6 +312,8 @@ FEDERATION_SETTINGS = {
 # --------------------------------------------------------------------------
 # Background tasks (django-q2)
 # --------------------------------------------------------------------------
+# Run the cluster with ``python manage.py qcluster``; scheduled tasks are
+# listed in idea/91-NOTIFICATIONS.md.
 
 Q_CLUSTER = {
     "name": "clubcms",
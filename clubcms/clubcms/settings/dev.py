@@ -21,6 +21,14 @@ if not os.environ.get("DATABASE_URL", "").startswith("postgres"):
         }
     }
 
+# Single runserver process: a local cache needs no cache table (and keeps
+# query counts in tests free of cache lookups)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 # Console email in development
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 